@@ -0,0 +1,146 @@
+import os
+import json
+import queue
+import pickle
+import shutil
+import datetime
+import threading
+from typing import Callable
+
+from GeneralVerifier import verifier
+
+class AutosavePolicy():
+    #decides when the game saves on its own. The loop thread only takes a snapshot of the world, the BackgroundSaveWriter writes it.
+    REASON_TO_SETTING_MAPPING = {
+        "interval" : "real_time_interval",
+        "world_interval" : "world_time_interval",
+        "map_transition" : "on_map_transition",
+        "before_combat" : "before_combat",
+        "quest_complete" : "on_quest_complete"
+    }
+
+    def __init__(self, enabled : bool = True, real_time_interval : int | float = 300, world_time_interval : int = 0, on_map_transition : bool = True, before_combat : bool = True, on_quest_complete : bool = True, min_interval : int | float = 30, max_autosaves : int = 5):
+        self.enabled = verifier.verify_type(enabled, bool, "enabled")
+        self.real_time_interval = verifier.verify_non_negative(real_time_interval, "real_time_interval") #seconds, 0 disables.
+        self.world_time_interval = verifier.verify_non_negative(world_time_interval, "world_time_interval") #world ticks, 0 disables.
+        self.on_map_transition = verifier.verify_type(on_map_transition, bool, "on_map_transition")
+        self.before_combat = verifier.verify_type(before_combat, bool, "before_combat")
+        self.on_quest_complete = verifier.verify_type(on_quest_complete, bool, "on_quest_complete")
+        self.min_interval = verifier.verify_non_negative(min_interval, "min_interval") #seconds between two autosaves, no matter the trigger.
+        self.max_autosaves = verifier.verify_positive(max_autosaves, "max_autosaves")
+
+    def allows(self, reason : str) -> bool:
+        if not reason in self.REASON_TO_SETTING_MAPPING:
+            raise KeyError(f"Unknown autosave reason \"{reason}\". Expected one of {list(self.REASON_TO_SETTING_MAPPING.keys())}.")
+        return self.enabled and bool(getattr(self, self.REASON_TO_SETTING_MAPPING[reason]))
+
+    def to_dict(self) -> dict:
+        return {"enabled" : self.enabled, "real_time_interval" : self.real_time_interval, "world_time_interval" : self.world_time_interval, "on_map_transition" : self.on_map_transition, "before_combat" : self.before_combat, "on_quest_complete" : self.on_quest_complete, "min_interval" : self.min_interval, "max_autosaves" : self.max_autosaves}
+
+class BackgroundSaveWriter():
+    def __init__(self):
+        self.jobs : queue.Queue[Callable[[], None] | None] = queue.Queue()
+        self._busy = threading.Event()
+        self.thread = threading.Thread(target = self._run, name = "BackgroundSaveWriter", daemon = True)
+        self.thread.start()
+
+    @property
+    def busy(self) -> bool:
+        return self._busy.is_set() or not self.jobs.empty()
+
+    def submit(self, job : Callable[[], None]) -> None:
+        if not callable(job):
+            raise TypeError(f"job must be callable, not \"{type(job).__name__}\".")
+        self.jobs.put(job)
+
+    def _run(self) -> None:
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            self._busy.set()
+            try:
+                job()
+            except Exception as e:
+                print(f"[System] Background save failed : {e}")
+            finally:
+                self._busy.clear()
+
+    def stop(self, wait : bool = True) -> None:
+        #pending jobs are still written before the thread exits.
+        self.jobs.put(None)
+        if wait:
+            self.thread.join()
+
+class AutosaveManager():
+    FOLDER_PREFIX = "autosave_"
+
+    def __init__(self, policy : AutosavePolicy, writer : BackgroundSaveWriter):
+        self.policy = verifier.verify_type(policy, AutosavePolicy, "policy")
+        self.writer = verifier.verify_type(writer, BackgroundSaveWriter, "writer")
+        self.pending_reasons : set[str] = set()
+        self.last_autosave_time : datetime.datetime | None = None
+        self.last_autosave_world_ticks : int | None = None
+
+    def request(self, reason : str) -> None:
+        #requests are only recorded here, several triggers firing close together end up in a single save.
+        if self.policy.allows(reason):
+            self.pending_reasons.add(reason)
+
+    def discard(self, reason : str) -> None:
+        self.pending_reasons.discard(reason)
+
+    def reset(self, world_ticks : int | None = None) -> None:
+        self.pending_reasons.clear()
+        self.last_autosave_time = datetime.datetime.now()
+        self.last_autosave_world_ticks = world_ticks
+
+    def check_intervals(self, world_ticks : int) -> None:
+        now = datetime.datetime.now()
+        if self.last_autosave_time is None:
+            self.last_autosave_time = now
+        if self.last_autosave_world_ticks is None:
+            self.last_autosave_world_ticks = world_ticks
+        if self.policy.real_time_interval and (now - self.last_autosave_time).total_seconds() >= self.policy.real_time_interval:
+            self.request("interval")
+        if self.policy.world_time_interval and world_ticks - self.last_autosave_world_ticks >= self.policy.world_time_interval:
+            self.request("world_interval")
+
+    def is_due(self, last_save_time : datetime.datetime | None) -> bool:
+        if not self.pending_reasons or not self.policy.enabled:
+            return False
+        if last_save_time is not None and (datetime.datetime.now() - last_save_time).total_seconds() < self.policy.min_interval:
+            return False
+        #a save still being written absorbs the new request, it is retried once the writer is free.
+        return not self.writer.busy
+
+    def take_reasons(self, world_ticks : int) -> set[str]:
+        reasons = self.pending_reasons
+        self.pending_reasons = set()
+        self.last_autosave_time = datetime.datetime.now()
+        self.last_autosave_world_ticks = world_ticks
+        return reasons
+
+    def new_folder_name(self) -> str:
+        return f"{self.FOLDER_PREFIX}{datetime.datetime.today().strftime("%Y%m%d%H%M%S%f")}"
+
+    def open_temp_folder(self, path : str, folder_name : str) -> str:
+        #an autosave is streamed into a temporary folder first so an interrupted autosave never leaves a half written save behind.
+        temp_folder_path = f"{path}/.{folder_name}.tmp"
+        os.makedirs(f"{temp_folder_path}/maps", exist_ok = False)
+        return temp_folder_path
+
+    def write_snapshot(self, temp_folder_path : str, snapshot : dict[str, bytes]) -> None:
+        #every file is unpickled right before it is written and dropped right after, so only one file of the snapshot is ever held as dicts.
+        while snapshot:
+            relative_path, data = snapshot.popitem()
+            with open(f"{temp_folder_path}/{relative_path}", "w", encoding = "utf-8") as save_file:
+                json.dump(pickle.loads(data), save_file)
+
+    def finish_temp_folder(self, path : str, folder_name : str) -> None:
+        os.rename(f"{path}/.{folder_name}.tmp", f"{path}/{folder_name}")
+
+    def rotate(self, path : str) -> None:
+        autosave_folders = sorted(folder for folder in os.listdir(path) if folder.startswith(self.FOLDER_PREFIX) and os.path.isdir(f"{path}/{folder}"))
+        for folder in autosave_folders[:-self.policy.max_autosaves]:
+            shutil.rmtree(f"{path}/{folder}", ignore_errors = True)
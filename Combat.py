@@ -5,6 +5,8 @@ import random
 from typing import TYPE_CHECKING
 from queue import Queue
 
+import numpy as np
+
 from Entities import Entity, Player
 from Techniques import PhysicalPhase, QiPhase, SoulPhase, Technique
 from Stats import BasicStatCalculator
@@ -18,6 +20,8 @@ if TYPE_CHECKING:
     from Engine import GameEngine
 
 class Vector():
+    __slots__ = ("x", "y")
+    
     def __init__(self, x : int | float, y : int | float):
         self.x = x
         self.y = y
@@ -59,6 +63,30 @@ class Vector():
         cos_limit = math.cos(math.radians(angle/2))
         return direction.dot(to_self) > cos_limit
 
+class PositionView(Vector):
+    #a participant's position kept as one row of the combat context's positions array, moving the participant writes straight into it.
+    __slots__ = ("array", "row")
+
+    def __init__(self, array : np.ndarray, row : int):
+        self.array = array
+        self.row = row
+
+    @property
+    def x(self) -> float:
+        return float(self.array[self.row, 0])
+
+    @x.setter
+    def x(self, x : int | float) -> None:
+        self.array[self.row, 0] = x
+
+    @property
+    def y(self) -> float:
+        return float(self.array[self.row, 1])
+
+    @y.setter
+    def y(self, y : int | float) -> None:
+        self.array[self.row, 1] = y
+
 class EffectPool():
     def __init__(self):
         self.effects_pool : list[EffectPacket] = []
@@ -90,6 +118,8 @@ class CombatState():
         self.modifier_pool = ModifierPacketPool()
         self.defense_techniques : list[DefensePacket] = []
         self.effects = EffectPool()
+        self.row : int | None = None #row in the combat context's arrays.
+        self.alive_flags : np.ndarray | None = None #the combat context's alive array, kept in step by take_damage.
     
     def take_damage(self, damage : DamagePacket) -> None:
         if len(self.defense_techniques) == 0:
@@ -104,6 +134,8 @@ class CombatState():
             if defense.strength == 0:
                 self.defense_techniques.pop(last_technique_index)
         self.entity.take_damage(damage)
+        if self.alive_flags is not None:
+            self.alive_flags[self.row] = self.entity.is_alive
     
     def get_stat(self, stat : str) -> int | float:
         if not stat in self.ALL_STATS:
@@ -132,19 +164,15 @@ class CombatStarter():
         return size
     
     def group_by_tags(self, tags_to_team_mapping : dict[tuple[tuple[str, ...], ...], str]) -> CombatContext:
-        teams_to_entities = {}
-        for entity in self.sublocation.entities.values():
-            for grouping_tags in tags_to_team_mapping.keys():
-                team = tags_to_team_mapping[grouping_tags]
-                for tags in grouping_tags:
-                    for tag in tags:
-                        if not tag in entity.tags:
-                            break
-                    else:
-                        if not team in teams_to_entities:
-                            teams_to_entities[team] = []
-                        teams_to_entities[team].append(entity)
-                        break
+        #an entity joins every team it has all the tags of any one group of. Teams and their members follow the order of the sublocation's entities.
+        entities = self.sublocation.entities
+        team_ids = {}
+        for grouping_tags, team in tags_to_team_mapping.items():
+            ids = team_ids.setdefault(team, set())
+            for tags in grouping_tags:
+                ids.update(entities.get_ids_with_tags(tags))
+        ordered_team_ids = {team : sorted(ids, key = entities.order.__getitem__) for team, ids in team_ids.items() if ids}
+        teams_to_entities = {team : [entities[entity_id] for entity_id in ids] for team, ids in sorted(ordered_team_ids.items(), key = lambda team_ids_pair : entities.order[team_ids_pair[1][0]])}
         combat_context = CombatContext(teams = teams_to_entities, field_size = self.field_size)
         return combat_context
     
@@ -164,19 +192,39 @@ class CombatStarter():
         tags_to_team_mapping[tuple([tuple(["Player", ]), ])] = "__player__"
         return self.group_by_tags(tags_to_team_mapping = tags_to_team_mapping)
     
-    def start_combat(self, combat_context : CombatContext, game_engine : GameEngine, cultivation_calculator : CultivationCalculator) -> CombatResolver:
-        combat_resolver = CombatResolver(combat_context = combat_context, game_engine = game_engine, cultivation_calculator = cultivation_calculator)
+    def start_combat(self, combat_context : CombatContext, game_engine : GameEngine, cultivation_calculator : CultivationCalculator, rng : random.Random | None = None, targeting_rng : random.Random | None = None) -> CombatResolver:
+        combat_resolver = CombatResolver(combat_context = combat_context, game_engine = game_engine, cultivation_calculator = cultivation_calculator, rng = rng, targeting_rng = targeting_rng)
         return combat_resolver
     
 class CombatContext():
     def __init__(self, teams : dict[str, list[Entity]], field_size : int):
-        self.initialize_combat_vectors(teams = teams, field_size = field_size)
+        self.initialize_combat_states(teams = teams, field_size = field_size)
+        self.initialize_arrays()
+    
+    def initialize_arrays(self) -> None:
+        #one row per participant in the order of all_positions. Positions are written through PositionView, alive flags by CombatState.take_damage and agility by refresh_agility.
+        self.participants : list[CombatState] = list(self.all_positions.values())
+        self.positions = np.array([(participant.position.x, participant.position.y) for participant in self.participants], dtype = np.float64).reshape(-1, 2)
+        self.teams = np.array([self.team_name_to_position_format[participant.team] for participant in self.participants], dtype = np.int64)
+        self.alive = np.array([participant.entity.is_alive for participant in self.participants], dtype = bool)
+        self.agility = np.zeros(len(self.participants), dtype = np.float64)
+        for row, participant in enumerate(self.participants):
+            participant.row = row
+            participant.alive_flags = self.alive
+            participant.position = PositionView(self.positions, row)
+        self.refresh_agility()
+    
+    def refresh_agility(self, participant : CombatState | None = None) -> None:
+        #agility goes through the modifier pool, it is read again whenever modifiers change.
+        if participant is not None:
+            self.agility[participant.row] = participant.get_stat("agility")
+            return
+        for row, participant in enumerate(self.participants):
+            self.agility[row] = participant.get_stat("agility")
     
-    def point_line_distance(point, line_origin, line_dir):
-        to_point = point - line_origin
-        projection = to_point.dot(line_dir.normalized())
-        closest = line_origin + (line_dir.normalized() * projection)
-        return point.distance_from(closest), projection
+    def get_enemy_rows(self, origin : CombatState) -> np.ndarray:
+        #rows of living participants of every team but origin's.
+        return np.flatnonzero((self.teams != self.team_name_to_position_format[origin.team]) & self.alive)
     
     def get_initial_modifiers(self, entity : Entity) -> ModifierPacketPool:
         modifier_packet_pool = ModifierPacketPool()
@@ -246,9 +294,9 @@ class CombatContext():
                 team_name_to_position_format[team_name] = 4
             else:
                 team_order[counter] = teams[team_name]
-                counter += 1
                 position_format_to_team_name[counter] = team_name
                 team_name_to_position_format[team_name] = counter
+                counter += 1
         
         self.max_power_level = 0
         
@@ -284,8 +332,11 @@ class CombatContext():
 class CombatResolver():
     ALLOWED_ACTIONS = {"attack", "technique", "add_modifier"}
     TECHNIQUE_EXECUTION_ORDER = ["physical", "qi", "soul"]
-    def __init__(self, combat_context : CombatContext, game_engine : GameEngine, cultivation_calculator : CultivationCalculator):
+    def __init__(self, combat_context : CombatContext, game_engine : GameEngine, cultivation_calculator : CultivationCalculator, rng : random.Random | None = None, targeting_rng : random.Random | None = None):
         self.combat_context = combat_context
+        self.rng = random.Random() if rng is None else rng #hits, crits, effects and retreats.
+        self.targeting_rng = random.Random() if targeting_rng is None else targeting_rng #AI target choices, kept apart so a change in targeting does not shift every later hit roll.
+        self.area_rng = np.random.Generator(np.random.PCG64(self.rng.getrandbits(64))) #hit and crit rolls of area techniques in batches, seeded from rng so a seeded combat stays reproducible.
         self.stats_calculator = BasicStatCalculator()
         self.game_engine = game_engine
         self.cultivation_calculator = cultivation_calculator
@@ -300,13 +351,13 @@ class CombatResolver():
         agility_factor = (origin.get_stat("agility") + (phase.speed_points * resource_used)) / max(1, target.get_stat("agility")) #can be more than one.
         luck_factor = ((origin.get_stat("luck") / max(1, target.get_stat("luck"))) / 100)
         chance = agility_factor + luck_factor
-        if (chance < 1) and (random.random() >= chance):
+        if (chance < 1) and (self.rng.random() >= chance):
             return False
         dominance = max(1, chance)
         damage = (phase.damage_points * resource_used)
         crit_chance = (phase.crit_points / 100) + (dominance - 1)
         crit_chance_overflow = max(0, (crit_chance - 1))
-        damage = (damage * (1 + (phase.precision_points / 100))) if random.random() < crit_chance else damage
+        damage = (damage * (1 + (phase.precision_points / 100))) if self.rng.random() < crit_chance else damage
         damage += (damage * crit_chance_overflow)
         damage_packet = DamagePacket()
         setattr(damage_packet, phase.damage_type, damage)
@@ -320,7 +371,7 @@ class CombatResolver():
         elif phase.effect_class == "melee":
             damage = DamagePacket()
             setattr(damage, phase.effect_config["damage_type"], (phase.effect_config["damage_points"] / 100) * resource_used)
-            if random.random() < (phase.effect_config["crit_points"] / 100):
+            if self.rng.random() < (phase.effect_config["crit_points"] / 100):
                 setattr(damage, phase.effect_config["damage_type"], (getattr(damage, phase.effect_config["damage_type"]) * (1 + (1 - (phase.effect_config["crit_points"] / 100)))))
             target.take_damage(damage = damage)
             return True
@@ -331,7 +382,7 @@ class CombatResolver():
                 return False
             if area_type == "bullet":
                 chance = ((phase.effect_config["speed_points"] / 100) * resource_used) / target.get_stat("agility")
-                if not random.random() < chance:
+                if not self.rng.random() < chance:
                     return False
                 dominance = max(1, chance)
                 max_dropoff = 0.1
@@ -340,122 +391,75 @@ class CombatResolver():
                 damage = (max_damage - (max_damage * drop_off))
                 crit_chance = (phase.effect_config["crit_points"] / 100) + (dominance - 1)
                 crit_chance_overflow = max(0, (crit_chance - 1))
-                damage = (damage * (1 + (phase.effect_config["precision_points"] / 100))) if random.random() < crit_chance else damage
+                damage = (damage * (1 + (phase.effect_config["precision_points"] / 100))) if self.rng.random() < crit_chance else damage
                 damage += damage * crit_chance_overflow
                 damage_packet = DamagePacket()
                 setattr(damage_packet, phase.effect_config["damage_type"], damage)
                 target.take_damage(damage = damage_packet)
-            elif area_type == "cone":
-                in_cone : list[CombatState] = []
-                for team in self.combat_context.combat_positions.keys():
-                    if self.combat_context.position_format_to_team_name[team] == origin.team:
-                        continue
-                    for entity in self.combat_context.combat_positions[team].values():
-                        if entity.position.in_cone(origin = origin.position, direction = (target.position - origin.position), max_range = spell_range, angle = phase.effect_config["area_of_effect_points"]) and entity.entity.is_alive:
-                            in_cone.append(entity)
-                for enemy in in_cone:
-                    chance = (((phase.effect_config["speed_points"] / 100) * resource_used) + (phase.effect_config["area_of_effect_points"] / 100)) / enemy.get_stat("agility")
-                    if random.random() > chance:
-                        continue
-                    dominance = max(1, chance)
-                    max_dropoff = 0.5
-                    drop_off = (origin.position.distance_from(target.position) / spell_range) * max_dropoff
-                    max_damage = ((phase.effect_config["damage_points"] / 100) * resource_used)
-                    damage = (max_damage - (max_damage * drop_off))
-                    crit_chance = (phase.effect_config["crit_points"] / 100) + (dominance - 1)
-                    crit_chance_overflow = max(0, (crit_chance - 1))
-                    damage = (damage * (1 + (phase.effect_config["precision_points"] / 100))) if random.random() < crit_chance else damage
-                    damage += damage * crit_chance_overflow * (1 - (phase.effect_config["area_of_effect_points"] / 100))
-                    damage_packet = DamagePacket()
-                    setattr(damage_packet, phase.effect_config["damage_type"], damage)
-                    enemy.take_damage(damage = damage_packet)
-                if in_cone:
-                    return True
-                return False
-                
-            elif area_type == "surround":
-                in_area : list[CombatState] = []
-                for team in self.combat_context.combat_positions.keys():
-                    if self.combat_context.position_format_to_team_name[team] == origin.team:
-                        continue
-                    for entity in self.combat_context.combat_positions[team].values():
-                        if entity.position.distance_from(origin.position) <= ((phase.effect_config["area_of_effect_points"] / 100) * resource_used):
-                            in_area.append(entity)
-                for enemy in in_area:
-                    chance = (((phase.effect_config["speed_points"] / 100) * resource_used) + 0.2) / enemy.get_stat("agility")
-                    if random.random() > chance:
-                        continue
-                    dominance = max(1, chance)
-                    max_dropoff = 0.2
-                    drop_off = (origin.position.distance_from(enemy.position) / spell_range) * max_dropoff
-                    max_damage = ((phase.effect_config["damage_points"] / 100) * resource_used)
-                    damage = (max_damage - (max_damage * drop_off))
-                    crit_chance = (phase.effect_config["crit_points"] / 100) + (dominance - 1)
-                    crit_chance_overflow = max(0, (crit_chance - 1))
-                    damage = (damage * (1 + (phase.effect_config["precision_points"] / 100))) if random.random() < crit_chance else damage
-                    damage += damage * crit_chance_overflow * 0.8
-                    damage_packet = DamagePacket()
-                    setattr(damage_packet, phase.effect_config["damage_type"], damage)
-                    enemy.take_damage(damage = damage_packet)
-                if in_area:
-                    return True
+            else:
+                return self.handle_area(area_type = area_type, phase = phase, resource_used = resource_used, spell_range = spell_range, origin = origin, target = target)
+    
+    def handle_area(self, area_type : str, phase : QiPhase, resource_used : int | float, spell_range : float, origin : CombatState, target : CombatState) -> bool:
+        #every enemy is tested against the area at once, Python only runs for the enemies actually hit.
+        config = phase.effect_config
+        context = self.combat_context
+        rows = context.get_enemy_rows(origin)
+        origin_position = context.positions[origin.row]
+        offsets = context.positions[rows] - origin_position
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        speed = (config["speed_points"] / 100) * resource_used
+        if area_type == "cone":
+            direction = context.positions[target.row] - origin_position
+            direction_length = math.hypot(direction[0], direction[1])
+            if direction_length == 0:
                 return False
-                
-            elif area_type == "burst":
-                in_area : list[CombatState] = []
-                for team in self.combat_context.combat_positions.keys():
-                    if self.combat_context.position_format_to_team_name[team] == origin.team:
-                        continue
-                    for entity in self.combat_context.combat_positions[team].values():
-                        if entity.position.distance_from(origin.position) <= ((phase.effect_config["area_of_effect_points"] / 100) * resource_used):
-                            in_area.append(entity)
-                for enemy in in_area:
-                    chance = (((phase.effect_config["speed_points"] / 100) * resource_used) + 0.2) / enemy.get_stat("agility")
-                    if random.random() > chance:
-                        continue
-                    dominance = max(1, chance)
-                    max_dropoff = 0.3
-                    drop_off = (target.position.distance_from(enemy.position) / spell_range) * max_dropoff
-                    max_damage = ((phase.effect_config["damage_points"] / 100) * resource_used)
-                    damage = (max_damage - (max_damage * drop_off))
-                    crit_chance = (phase.effect_config["crit_points"] / 100) + (dominance - 1)
-                    crit_chance_overflow = max(0, (crit_chance - 1))
-                    damage = (damage * (1 + (phase.effect_config["precision_points"] / 100))) if random.random() < crit_chance else damage
-                    damage += damage * crit_chance_overflow * 0.8
-                    damage_packet = DamagePacket()
-                    setattr(damage_packet, phase.effect_config["damage_type"], damage)
-                    enemy.take_damage(damage = damage_packet)
-                if in_area:
-                    return True
+            cos_limit = math.cos(math.radians(config["area_of_effect_points"] / 2))
+            with np.errstate(invalid = "ignore", divide = "ignore"):
+                cosines = (offsets @ direction) / (distances * direction_length)
+            mask = (distances <= spell_range) & (distances > 0) & (cosines > cos_limit)
+            chance_bonus, max_dropoff, overflow_weight = config["area_of_effect_points"] / 100, 0.5, 1 - (config["area_of_effect_points"] / 100)
+            drop_off_distances = np.full(len(rows), origin.position.distance_from(target.position))
+        elif area_type in ("surround", "burst"):
+            mask = distances <= ((config["area_of_effect_points"] / 100) * resource_used)
+            chance_bonus, overflow_weight = 0.2, 0.8
+            if area_type == "surround":
+                max_dropoff, drop_off_distances = 0.2, distances
+            else:
+                target_offsets = context.positions[rows] - context.positions[target.row]
+                max_dropoff, drop_off_distances = 0.3, np.hypot(target_offsets[:, 0], target_offsets[:, 1])
+        elif area_type == "beam":
+            direction = context.positions[target.row] - origin_position
+            direction_length = math.hypot(direction[0], direction[1])
+            if direction_length == 0:
                 return False
-            elif area_type == "beam":
-                beam_dir = (target.position - origin.position).normalized()
-                beam_range = (phase.effect_config["range_points"] / 100) * resource_used
-                beam_width = (phase.effect_config["area_of_effect_points"] / 100) * resource_used
-                hit_any = False
-                for team in self.combat_context.combat_positions:
-                    if self.combat_context.position_format_to_team_name[team] == origin.team:
-                        continue
-                    for enemy in self.combat_context.combat_positions[team].values():
-                        dist, proj = self.point_line_distance(enemy.position, origin.position, beam_dir)
-                        if proj < 0 or proj > beam_range:
-                            continue
-                        if dist > beam_width:
-                            continue
-                        chance = ((phase.effect_config["speed_points"] / 100) * resource_used) / enemy.get_stat("agility")
-                        if random.random() > chance:
-                            continue
-                        dominance = max(1, chance)
-                        base_damage = ((phase.effect_config["damage_points"] / 100) * resource_used)
-                        damage = base_damage * (1 - (proj / beam_range) * 0.2)
-                        crit_chance = (phase.effect_config["crit_points"] / 100) + (dominance - 1)
-                        if random.random() < crit_chance:
-                            damage *= (1 + phase.effect_config["precision_points"] / 100)
-                        packet = DamagePacket()
-                        setattr(packet, phase.effect_config["damage_type"], damage)
-                        enemy.take_damage(packet)
-                        hit_any = True
-                return hit_any
+            beam_range = spell_range
+            beam_width = (config["area_of_effect_points"] / 100) * resource_used
+            projections = (offsets @ direction) / direction_length
+            widths = np.sqrt(np.maximum(distances ** 2 - projections ** 2, 0))
+            mask = (projections >= 0) & (projections <= beam_range) & (widths <= beam_width)
+            chance_bonus, max_dropoff, overflow_weight = 0, 0.2, 0
+            drop_off_distances = projections
+        else:
+            raise ValueError(f"\"{area_type}\" is not a valid area type.")
+        rows = rows[mask]
+        if len(rows) == 0:
+            return False
+        agility = context.agility[rows]
+        chances = (speed + chance_bonus) / np.where(agility == 0, 1, agility) #raw agility like the single target rolls, 0 would divide by zero.
+        hits = self.area_rng.random(len(rows)) <= chances
+        max_damage = (config["damage_points"] / 100) * resource_used
+        damage = max_damage - (max_damage * (drop_off_distances[mask] / spell_range) * max_dropoff)
+        crit_chances = (config["crit_points"] / 100) + (np.maximum(chances, 1) - 1)
+        crits = self.area_rng.random(len(rows)) < crit_chances
+        damage = np.where(crits, damage * (1 + (config["precision_points"] / 100)), damage)
+        damage += damage * np.maximum(crit_chances - 1, 0) * overflow_weight
+        for row, amount in zip(rows[hits].tolist(), damage[hits].tolist()):
+            damage_packet = DamagePacket()
+            setattr(damage_packet, config["damage_type"], amount)
+            context.participants[row].take_damage(damage = damage_packet)
+        if area_type == "beam": #a beam only counts if it hit someone, the other areas if anyone was inside them.
+            return bool(hits.any())
+        return True
         
     def handle_soul_phase(self, phase : SoulPhase, resource_used : int | float, origin : CombatState, target : CombatState) -> bool:
         effect_class = phase.effect_class
@@ -474,6 +478,7 @@ class CombatResolver():
         origin.effects.append(item = effect_packet)
         if effect_class != "utility":
             origin.effects.effects_pool[-1].apply(modifier_packet_pool = origin.modifier_pool)
+            self.combat_context.refresh_agility(origin)
         return True
     
     def resolve_action(self, action : ActionPacket) -> None:
@@ -554,7 +559,7 @@ class CombatResolver():
         player_input = player_input.split(" ")
         first_arg = player_input[0]
         if first_arg == "retreat":
-            if random.random() < ((player.power_level / self.combat_context.max_power_level) * 0.8): #later replace 0.8 with difficultly based constant instead.
+            if self.rng.random() < ((player.power_level / self.combat_context.max_power_level) * 0.8): #later replace 0.8 with difficultly based constant instead.
                 output("You managed to escape.", "success")
                 output("I'm kind of impressed, you shouldn't have been able to escape unless you are one of the strongest on the field. Nice.", "narrator")
                 self.game_engine.game_actions.end_combat("defeat")
@@ -619,7 +624,7 @@ class CombatResolver():
                     return
             elif second_arg in {"away", "opposite"}:
                 if distance == 0:
-                    direction = Vector(random.uniform(-1, 1), random.uniform(-1, 1)).normalized()
+                    direction = Vector(self.rng.uniform(-1, 1), self.rng.uniform(-1, 1)).normalized()
                     distance = 1
                 else:
                     direction = player.position - target.position
@@ -827,7 +832,10 @@ class CombatResolver():
         
         for team, members in self.combat_context.combat_positions.items():
             for participant_id, participant in members.items():
+                effect_count = len(participant.effects.effects_pool)
                 participant.effects.refresh(participant.modifier_pool, self.game_engine.game_actions.world_state.world_time.to_world_timestamp())
+                if len(participant.effects.effects_pool) != effect_count:
+                    self.combat_context.refresh_agility(participant)
                 for effect in participant.effects.effects_pool:
                     if effect.effect_class == "utility":
                         self.handle_utility(origin = effect.origin, target = participant, utility = effect)
@@ -839,13 +847,13 @@ class CombatResolver():
                         seen = set()
                         while not target_choices:
                             target_team_choices = [target_team for target_team in self.combat_context.combat_positions.keys() if target_team != team]
-                            target_team = random.choice(target_team_choices)
+                            target_team = self.targeting_rng.choice(target_team_choices)
                             if target_team in seen:
                                 continue
                             else:
                                 seen.add(target_team)
                             target_choices = [target for target in self.combat_context.combat_positions[target_team].values() if target.entity.is_alive]
-                        new_target = random.choice(target_choices)
+                        new_target = self.targeting_rng.choice(target_choices)
                         participant.target = new_target
                 #an entity will only do things based on how high the entity's power level is.
                 power_factor = (participant.power_level / self.combat_context.max_power_level)
@@ -50,6 +50,21 @@ class TimedScheduler():
             self._next_id = 0
         return commands
     
+    def discard(self, command_type : str) -> None:
+        #drops every command made only of actions of the given type.
+        verifier.verify_type(command_type, str, "command_type")
+        for time_id in list(self.time_buckets.keys()):
+            kept = [command_id for command_id in self.time_buckets[time_id] if not all(action["type"] == command_type for action in self.actions[command_id])]
+            for command_id in self.time_buckets[time_id]:
+                if not command_id in kept:
+                    self.actions.pop(command_id)
+            if len(kept) == 0:
+                self.time_buckets.pop(time_id)
+            else:
+                self.time_buckets[time_id] = kept
+        if len(self) == 0:
+            self._next_id = 0
+    
     def pending(self, time_stamp : WorldTimeStamp) -> bool:
         sorted_order = self._sorted_order
         if len(sorted_order) == 0:
@@ -68,9 +83,10 @@ class TimedScheduler():
     
     def load(self, data : dict):
         verifier.verify_type(data, dict, "data")
-        self.time_buckets = data["time_buckets"]
-        self.actions = data["actions"]
-        self._next_id = data["_next_id"]
+        #json turns the int keys into strings, they are turned back so they sort and match the ids held in the buckets.
+        self.time_buckets = {int(time_id) : [int(command_id) for command_id in command_ids] for time_id, command_ids in verifier.verify_type(data["time_buckets"], dict, "time_buckets").items()}
+        self.actions = {int(command_id) : actions for command_id, actions in verifier.verify_type(data["actions"], dict, "actions").items()}
+        self._next_id = max([verifier.verify_type(data["_next_id"], int, "_next_id"), *self.actions.keys()])
     
     def __len__(self) -> int:
         return len(self.actions)
@@ -1,43 +1,52 @@
 from GeneralVerifier import verifier
+from Schema import Schema, VALUE
 import os
 import json
 import pprint
 
 class BaseCultivation():
+    __slots__ = ()
+    SCHEMA = Schema(())
+    
     def to_dict(self) -> dict:
-        item_data = {}
-        for item_attribute in vars(self):
-            item_data[item_attribute] = getattr(self, item_attribute)
-        return item_data
+        return self.SCHEMA.encode(self, {})
 
 class PhysicalCultivation(BaseCultivation):
+    __slots__ = ("stage", "stat_points", "reinforcement")
+    SCHEMA = Schema(tuple((field_name, VALUE) for field_name in __slots__))
+    
     def __init__(self, stage : str, stat_points : int, reinforcement : int):
         self.stage : str = verifier.verify_type(stage, str, "stage")
         self.stat_points : int = verifier.verify_non_negative(stat_points, "stat_points")
         self.reinforcement : int = verifier.verify_non_negative(reinforcement, "reinforcement")
-    
-    def to_dict(self) -> dict:
-        item_data = {}
-        for item_attribute in vars(self):
-            item_data[item_attribute] = getattr(self, item_attribute)
-        return item_data
         
 class QiCultivation(BaseCultivation):
+    __slots__ = ("stage", "current")
+    SCHEMA = Schema(tuple((field_name, VALUE) for field_name in __slots__))
+    
     def __init__(self, stage : str, current : dict[str, int]):
         self.stage = verifier.verify_type(stage, str, "stage")
         self.current : dict[str, int] = verifier.verify_type(current, dict, "current")
         
 class SoulCultivation(BaseCultivation):
+    __slots__ = ("stage", "current")
+    SCHEMA = Schema(tuple((field_name, VALUE) for field_name in __slots__))
+    
     def __init__(self, stage : str, current : int):
         self.stage = verifier.verify_type(stage, str, "stage")
         self.current = verifier.verify_non_negative(current, "current")
 
 class EssenceCultivation(BaseCultivation):
+    __slots__ = ("stage", "current")
+    SCHEMA = Schema(tuple((field_name, VALUE) for field_name in __slots__))
+    
     def __init__(self, stage : str, current : int):
         self.stage = verifier.verify_type(stage, str, "stage")
         self.current = verifier.verify_non_negative(current, "current")
 
 class Cultivation(object):
+    __slots__ = ("_physical", "_qi", "_soul", "_essence")
+    
     def __init__(self, physical_cultivation : PhysicalCultivation = None, qi_cultivation : QiCultivation = None, soul_cultivation : SoulCultivation = None, essence_cultivation : EssenceCultivation = None):
         self._physical = verifier.verify_type(physical_cultivation, PhysicalCultivation, "physical", True) 
         self._qi = verifier.verify_type(qi_cultivation, QiCultivation, "qi", True)
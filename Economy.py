@@ -0,0 +1,104 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from GeneralVerifier import verifier
+from Items import Item
+
+if TYPE_CHECKING:
+    from Entities import Entity
+
+class MerchantEconomy():
+    #stock, restocked stock and demand of every merchant for every item type live in arrays with one row per merchant. update moves the price multipliers of all merchants at once.
+    DEMAND_DECAY_PER_HOUR = 0.9 #fraction of demand still remembered after a world hour.
+    DEMAND_WEIGHT = 0.5
+    SCARCITY_ELASTICITY = 0.5
+    MIN_MULTIPLIER = 0.5 #relative to the merchant's own price multiplier.
+    MAX_MULTIPLIER = 3.0
+
+    def __init__(self, item_types : list[str], capacity : int = 64):
+        verifier.verify_type(item_types, list, "item_types")
+        capacity = int(verifier.verify_positive(capacity, "capacity"))
+        self.item_types = list(item_types)
+        self.type_index = {item_type : index for index, item_type in enumerate(self.item_types)}
+        self.rows : dict[str, int] = {} #merchant id -> row.
+        self.base_multipliers = np.ones(capacity, dtype = np.float64)
+        self.stock = np.zeros((capacity, len(self.item_types)), dtype = np.float64)
+        self.baseline = np.ones((capacity, len(self.item_types)), dtype = np.float64) #stock right after the last restock, never below 1.
+        self.demand = np.zeros((capacity, len(self.item_types)), dtype = np.float64) #units bought from the merchant minus units sold to it, fading every hour.
+        self.multipliers = np.ones((capacity, len(self.item_types)), dtype = np.float64)
+        self.version = 0 #bumped by every update so listings know when their prices are stale.
+        self.last_update : int | None = None #world ticks.
+        self.next_update : int | None = None #time id of the scheduled update.
+
+    def _grow(self) -> None:
+        capacity = len(self.base_multipliers) * 2
+        self.base_multipliers = np.concatenate((self.base_multipliers, np.ones(capacity - len(self.base_multipliers), dtype = np.float64)))
+        for name, fill in (("stock", 0.0), ("baseline", 1.0), ("demand", 0.0), ("multipliers", 1.0)):
+            old = getattr(self, name)
+            new = np.full((capacity, len(self.item_types)), fill, dtype = np.float64)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def register(self, merchant : Entity) -> int:
+        if merchant.id in self.rows:
+            return self.rows[merchant.id]
+        row = len(self.rows)
+        if row >= len(self.base_multipliers):
+            self._grow()
+        self.rows[merchant.id] = row
+        self.base_multipliers[row] = merchant.trader_profile.price_multiplier
+        self.multipliers[row] = merchant.trader_profile.price_multiplier
+        return row
+
+    def restocked(self, merchant : Entity) -> None:
+        #stock counts come from the inventory's class index, no item is visited.
+        row = self.register(merchant)
+        inventory = merchant.inventory
+        self.stock[row] = 0
+        for item_class, items in inventory.instanced_by_class.items():
+            if item_class.__name__ in self.type_index:
+                self.stock[row, self.type_index[item_class.__name__]] += len(items)
+        for item_class, stacks in inventory.stacked_by_class.items():
+            if item_class.__name__ in self.type_index:
+                self.stock[row, self.type_index[item_class.__name__]] += sum(stack.amount for stack in stacks.values())
+        self.baseline[row] = np.maximum(self.stock[row], 1)
+
+    def record_trade(self, merchant : Entity, item : Item, amount : int) -> None:
+        #positive amounts were bought from the merchant, negative ones sold to it. Prices follow at the next update.
+        row = self.register(merchant)
+        item_type = type(item).__name__
+        if not item_type in self.type_index:
+            return
+        column = self.type_index[item_type]
+        self.stock[row, column] = max(self.stock[row, column] - amount, 0)
+        self.demand[row, column] += amount
+
+    def update(self, hours : int = 1) -> None:
+        hours = verifier.verify_non_negative(hours, "hours")
+        count = len(self.rows)
+        if hours == 0 or count == 0:
+            return
+        demand = self.demand[:count]
+        demand *= MerchantEconomy.DEMAND_DECAY_PER_HOUR ** hours
+        baseline = self.baseline[:count]
+        scarcity = (baseline / np.maximum(self.stock[:count], 1)) ** MerchantEconomy.SCARCITY_ELASTICITY
+        pressure = 1 + MerchantEconomy.DEMAND_WEIGHT * demand / baseline
+        self.multipliers[:count] = self.base_multipliers[:count, None] * np.clip(scarcity * pressure, MerchantEconomy.MIN_MULTIPLIER, MerchantEconomy.MAX_MULTIPLIER)
+        self.version += 1
+
+    def get_multiplier(self, merchant : Entity, item : Item) -> float:
+        #what the merchant asks for item relative to its trade price.
+        row = self.rows.get(merchant.id)
+        item_type = type(item).__name__
+        if row is None or not item_type in self.type_index:
+            return merchant.trader_profile.price_multiplier
+        return float(self.multipliers[row, self.type_index[item_type]])
+
+    def get_relative_multiplier(self, merchant : Entity, item : Item) -> float:
+        #how far the merchant's price for item moved away from its static price multiplier, used to scale what it pays.
+        row = self.rows.get(merchant.id)
+        item_type = type(item).__name__
+        if row is None or not item_type in self.type_index or self.base_multipliers[row] == 0:
+            return 1.0
+        return float(self.multipliers[row, self.type_index[item_type]] / self.base_multipliers[row])
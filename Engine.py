@@ -1,5 +1,6 @@
 import os
 import json
+import pickle
 import threading
 import time
 import datetime
@@ -18,9 +19,11 @@ from Stats import BasicStatCalculator
 from Dialogue import Dialogue, Interaction, InteractionContext, DialogueLoader, InteractionLoader
 from TableLoader import TablesLoader, TableResolver
 from Entities import Entity, Player, EntityLoader, EntityRegistry
-from Trade import TraderProfile, TradeSession
+from Randomness import RandomStreams
+from Trade import TraderProfile, TradeSession, TradeLedger, InventoryListing
 from Inventory import Inventory
-from Map import Map, Location, SubLocation, MapLoader
+from Map import Map, Location, SubLocation, MapLoader, WorldIndex
+from Routes import ExitGraph
 from Quests import Quest, QuestLoader, QuestManager, QuestStage, QuestState
 from WorldTime import WorldTime, WorldTimeStamp
 from CommandSchedulers import CommandQueue, TimedScheduler, TimeScheduledCommand
@@ -29,12 +32,32 @@ from Skills import SkillState, SkillsLoader
 from WorldState import WorldState
 from Techniques import TechniqueLoader
 from Combat import CombatContext, CombatResolver, CombatStarter
+from JSONStream import JSONStreamWriter, JSONStreamReader
+from Autosave import AutosavePolicy, AutosaveManager, BackgroundSaveWriter
+from StatTable import StatTable
+from Residency import ResidencyPolicy, SubLocationResidency
+from Simulation import SimulationPolicy, SimulationScheduler, RecoveryPolicy, RecoverySystem
+from Partitions import PartitionPolicy, PartitionManager
+from Identifiers import IdAllocator
+from Economy import MerchantEconomy
 
 class GameActions():
+    RESTOCK_PERIOD = 1440 #world ticks between two restocks of a merchant.
+    ECONOMY_UPDATE_PERIOD = 60 #world ticks between two updates of merchant prices.
+    TRAVEL_TICKS_PER_EXIT = 10 #world ticks spent walking through one exit with "travel".
+    
     def __init__(self, ui_engine : UIEngine):
         verifier.verify_type(ui_engine, UIEngine, "ui_engine")
         self.ui_engine = ui_engine
         self._game_engine = None #MUST be set by the engine to self.
+        self.settings_lock = threading.Lock() #the last save is recorded into settings.json by the background save writer while the loop thread reads the settings.
+        self.world_index = WorldIndex() #rebuilt by start_world_index for every game.
+        self.exit_graph = ExitGraph(world_index = self.world_index)
+        self.residency : SubLocationResidency | None = None
+        self.simulation : SimulationScheduler | None = None
+        self.pending_restocks : set[str] = set() #sublocation paths whose merchants may be due a restock, checked on their next access.
+        self.economy : MerchantEconomy | None = None
+        self.partitions : PartitionManager | None = None
         self.available_functions_mapping = {
             "has_item" : self.player_has_item,
             "has_money" : self.player_has_money,
@@ -91,7 +114,9 @@ class GameActions():
             "remove_exit_from_sublocation" : self.remove_exit_from_sublocation,
             "move_time_forward_by_ticks" : self.move_time_forward_by_ticks,
             "transport_player_to_sublocation" : self.transport_player_to_sublocation,
-            "set_current_entity_interaction_with_id" : self.set_current_entity_interaction_with_id
+            "set_current_entity_interaction_with_id" : self.set_current_entity_interaction_with_id,
+            "restock_merchants" : self.queue_restock,
+            "update_economy" : self.update_economy
         }
         self.command_queue = CommandQueue()
     
@@ -106,9 +131,32 @@ class GameActions():
         self._game_engine = game_engine
     
     def transport_player_to_sublocation(self, sublocation_path : str) -> None:
+        if self.world_index.get_map_name(sublocation_path) != self.world_index.get_map_name(self.world_state.player.location):
+            self.request_autosave("map_transition")
         self.world_state.player.location = sublocation_path
         self.sync_engine_location_to_player_location()
     
+    def handle_travel(self, destination : str) -> None:
+        #the whole route comes from the exit graph, time passes for every exit taken but only the destination is visited.
+        matches = self.exit_graph.find(name = destination, visited = self.world_state.visited)
+        if not matches:
+            self.output(f"You have never heard of a place called \"{destination}\".", "info")
+            return
+        if len(matches) > 1:
+            self.output(f"\"{destination}\" could be any of {matches}. Try the full path instead.", "info")
+            return
+        route = self.exit_graph.get_route(origin = self.world_state.player.location, destination = matches[0])
+        if route is None:
+            self.output(f"There is no way to get to \"{matches[0]}\" from here.", "warning")
+            return
+        if not route:
+            self.output("You are already there.", "info")
+            return
+        self.move_time_forward_by_ticks(ticks = self.TRAVEL_TICKS_PER_EXIT * len(route))
+        self.transport_player_to_sublocation(route[-1])
+        self.game_engine.temp_entity_id_to_entity_mapping = None
+        self.output(f"You travel through {len(route)} places and arrive at \"{route[-1]}\".", "info")
+    
     def move_time_forward_by_ticks(self, ticks : int) -> None:
         verifier.verify_non_negative(ticks, "ticks")
         self.world_state.world_time.update_tick(tick = int(ticks))
@@ -147,14 +195,26 @@ class GameActions():
         return (self.world_state.player.location == location)
     
     def remove_exit_from_sublocation(self, sublocation : str, exit_name : str) -> None:
+        sublocation_path = sublocation
+        if self.is_partitioned(sublocation_path):
+            self.partitions.send(self.world_index.get_map_name(sublocation_path), "set_exit", sublocation = sublocation_path, exit_name = exit_name)
+            self.exit_graph.remove_exit(path = sublocation_path, exit_name = exit_name)
+            return
         sublocation : SubLocation = self.get_sublocation_from_path(sublocation_path = sublocation)
         if exit_name in sublocation.exits:
             sublocation.exits.pop(exit_name)
+            self.exit_graph.remove_exit(path = sublocation_path, exit_name = exit_name)
     
     def add_exit_to_sublocation(self, sublocation : str, exit_name : str, exit_path : str) -> None:
+        sublocation_path = sublocation
+        if self.is_partitioned(sublocation_path):
+            self.partitions.send(self.world_index.get_map_name(sublocation_path), "set_exit", sublocation = sublocation_path, exit_name = exit_name, exit_path = exit_path)
+            self.exit_graph.add_exit(path = sublocation_path, exit_name = exit_name, exit_path = exit_path)
+            return
         sublocation : SubLocation = self.get_sublocation_from_path(sublocation_path = sublocation)
         if not exit_name in sublocation.exits:
             sublocation.exits[exit_name] = exit_path
+            self.exit_graph.add_exit(path = sublocation_path, exit_name = exit_name, exit_path = exit_path)
     
     def schedule_results_by_engine_tick(self, tick_offset : int, results : list[dict]) -> None:
         for result in results:
@@ -171,11 +231,24 @@ class GameActions():
         self.game_engine.current_location.location_events.append(event)
     
     def get_sublocation_from_path(self, sublocation_path : str) -> SubLocation:
-        verifier.verify_type(sublocation_path, str, "sub_location_path")
-        sublocation_path = sublocation_path.split("/")
-        if not sublocation_path[0].strip() in self.world_state.maps:
-            self.resolve_map(sublocation_path[0].strip())
-        return self.world_state.maps[sublocation_path[0]].locations[sublocation_path[1]].sub_locations[sublocation_path[2]]
+        sublocation_path = self.world_index.normalize(sublocation_path)
+        sublocation = self.world_index.get_sub_location(sublocation_path)
+        if sublocation is None: #map not resolved yet, evicted or no such sublocation.
+            map_name, location_name, sub_location_name = self.world_index.split(sublocation_path)
+            if not map_name in self.world_state.maps: #also takes the map back from its partition worker.
+                self.resolve_map(map_name)
+            sublocation = self.world_state.maps[map_name].locations[location_name].sub_locations[sub_location_name]
+        if self.residency is not None:
+            self.residency.touch(sublocation_path)
+        if self.simulation is not None: #sublocations away from the player are caught up on access.
+            self.simulation.simulate(sublocation_path, sublocation, self.world_state.world_time.get_total_ticks())
+        if sublocation_path in self.pending_restocks:
+            self.restock_merchants(sublocation_path = sublocation_path, sublocation = sublocation)
+        return sublocation
+    
+    def get_loaded_sublocation(self, sublocation_path : str) -> SubLocation | None:
+        #unlike get_sublocation_from_path this never loads a map or restores an evicted sublocation.
+        return self.world_index.get_sub_location(sublocation_path)
     
     def set_current_entity_interaction_with_id(self, interaction_id : str) -> None:
         if self.game_engine.state == "interaction":
@@ -185,6 +258,9 @@ class GameActions():
         verifier.verify_type(entity_location, str, "entity_location")
         verifier.verify_type(entity_id, str, "entity_id")
         verifier.verify_type(interaction_id, str, "interaction_id")
+        if self.is_partitioned(entity_location):
+            self.partitions.send(self.world_index.get_map_name(entity_location), "set_interaction", sublocation = entity_location, entity_id = entity_id, interaction_id = interaction_id)
+            return
         sub_location = self.get_sublocation_from_path(sublocation_path = entity_location)
         sub_location.entities[entity_id].interaction = interaction_id
     
@@ -207,13 +283,44 @@ class GameActions():
         self.display_interaction(interaction = self.game_engine.current_interaction.interaction)
     
     def move_entity_from_to(self, entity_id : str, location_from : str, location_to : str) -> None:
+        map_to_name = self.world_index.get_map_name(location_to)
+        location_to_path = location_to
+        if entity_id != self.world_state.player.id and (self.is_partitioned(location_from) or self.is_partitioned(location_to)):
+            self.move_partitioned_entity(entity_id = entity_id, location_from = location_from, location_to = location_to)
+            return
         location_from : SubLocation= self.get_sublocation_from_path(sublocation_path = location_from)
         location_to : SubLocation = self.get_sublocation_from_path(sublocation_path = location_to)
         entity_to_move : Entity = location_from.entities.pop(entity_id)
         location_to.add_entity(entity = entity_to_move)
+        self.sync_entity_stat_table(entity = entity_to_move, map_name = map_to_name)
+        self.queue_restock_if_merchant(entity = entity_to_move, sublocation_path = location_to_path)
         if isinstance(entity_to_move, Player):
             self.sync_engine_location_to_player_location()
 
+    def move_partitioned_entity(self, entity_id : str, location_from : str, location_to : str) -> None:
+        #NPCs cross between the engine and the workers as entity data, moves within one worker stay there.
+        map_from_name = self.world_index.get_map_name(location_from)
+        map_to_name = self.world_index.get_map_name(location_to)
+        if self.is_partitioned(location_from) and self.is_partitioned(location_to) and self.partitions.owners[map_from_name] is self.partitions.owners[map_to_name]:
+            self.partitions.send(map_from_name, "move_entity", entity_id = entity_id, location_from = location_from, location_to = location_to)
+            return
+        if self.is_partitioned(location_from):
+            entity_data = self.partitions.request(map_from_name, "take_entity", sublocation = location_from, entity_id = entity_id)
+        else:
+            entity_to_move : Entity = self.get_sublocation_from_path(sublocation_path = location_from).entities.pop(entity_id)
+            if entity_to_move._stat_table is not None:
+                entity_to_move._stat_table.detach(entity_to_move)
+            entity_data = entity_to_move.to_dict()
+        if self.is_partitioned(location_to):
+            self.partitions.send(map_to_name, "add_entities", sublocation = location_to, entities = [entity_data, ])
+            if "Merchant" in entity_data.get("tags", []):
+                self.pending_restocks.add(location_to.strip()) #checked once the map is back in the engine.
+        else:
+            entity_to_move = self.entity_loader.load_entity(entity_data = entity_data)
+            self.get_sublocation_from_path(sublocation_path = location_to).add_entity(entity = entity_to_move)
+            self.sync_entity_stat_table(entity = entity_to_move, map_name = map_to_name)
+            self.queue_restock_if_merchant(entity = entity_to_move, sublocation_path = location_to)
+
     def output_with_pauses(self, output : list[dict], pause : int | float, tick_based : bool = False) -> None:
         if not tick_based:
             current_time = self.world_state.world_time.to_world_timestamp()
@@ -242,22 +349,42 @@ class GameActions():
     def spawn_entity_with_id(self, entity_type : str, entity_template_name : str, entity_id : str, sublocation : str) -> None:
         entity = self.entity_loader.spawn_entity(entity_type = entity_type, entity_template_name = entity_template_name)
         entity.id = entity_id
+        sublocation_path = sublocation
+        if self.is_partitioned(sublocation_path):
+            self.add_entities_to_partition(entities = [entity, ], sublocation = sublocation_path)
+            return
         sublocation : SubLocation = self.get_sublocation_from_path(sublocation)
         sublocation.add_entity(entity = entity)
+        self.sync_entity_stat_table(entity = entity, map_name = self.world_index.get_map_name(sublocation_path))
+        self.queue_restock_if_merchant(entity = entity, sublocation_path = sublocation_path)
     
     def spawn_entity_at_sublocation(self, entity_type : str, entity_template_name : str, sublocation : str) -> None:
         entity =  self.entity_loader.spawn_entity(entity_type = entity_type, entity_template_name = entity_template_name)
-        sublocation = sublocation.split("/")
-        if not sublocation[0] in self.world_state.maps:
-            self.resolve_map(sublocation[0])
-        game_map = self.world_state.maps[sublocation[0].strip()]
-        sub_location : SubLocation = game_map.locations[sublocation[1].strip()].sub_locations[sublocation[2].strip()]
+        if self.is_partitioned(sublocation):
+            self.add_entities_to_partition(entities = [entity, ], sublocation = sublocation)
+            return
+        sub_location : SubLocation = self.get_sublocation_from_path(sublocation)
         sub_location.add_entity(entity)
+        self.sync_entity_stat_table(entity = entity, map_name = self.world_index.get_map_name(sublocation))
+        self.queue_restock_if_merchant(entity = entity, sublocation_path = sublocation)
         
     def spawn_entities_at_sublocation(self, entity_type : str, entity_template_name : str, amount : int, sublocation : str) -> None:
         verifier.verify_non_negative(amount, "amount")
-        for _ in range(amount):
-            self.spawn_entity_at_sublocation(entity_type = entity_type, entity_template_name = entity_template_name, sublocation = sublocation)
+        map_name = self.world_index.get_map_name(sublocation)
+        if self.is_partitioned(sublocation):
+            self.add_entities_to_partition(entities = self.entity_loader.spawn_many(entity_type = entity_type, entity_template_name = entity_template_name, amount = amount), sublocation = sublocation)
+            return
+        sub_location : SubLocation = self.get_sublocation_from_path(sublocation)
+        for entity in self.entity_loader.spawn_many(entity_type = entity_type, entity_template_name = entity_template_name, amount = amount):
+            sub_location.add_entity(entity)
+            self.sync_entity_stat_table(entity = entity, map_name = map_name)
+            self.queue_restock_if_merchant(entity = entity, sublocation_path = sublocation)
+    
+    def add_entities_to_partition(self, entities : list[Entity], sublocation : str) -> None:
+        #spawned here so ids and rolls stay with the engine, the worker only rebuilds them from their data.
+        self.partitions.send(self.world_index.get_map_name(sublocation), "add_entities", sublocation = sublocation, entities = [entity.to_dict() for entity in entities])
+        for entity in entities:
+            self.queue_restock_if_merchant(entity = entity, sublocation_path = sublocation)
     
     def get_interaction(self, id : str) -> None:
         return self.interaction_loader.get(interaction_id = id)
@@ -411,22 +538,178 @@ class GameActions():
             self.handle_results(results = other_wise)
     
     def resolve_map(self, map_name : str) -> None:
-        if not map_name in self.world_state.maps:
-            self.world_state.maps[map_name] = self.map_loader.resolve_map(map_name = map_name)
+        if self.partitions is not None and self.partitions.owns(map_name):
+            self.take_back_partitioned_map(map_name)
+        elif not map_name in self.world_state.maps:
+            self.add_loaded_map(self.map_loader.resolve_map(map_name = map_name))
+    
+    def add_loaded_map(self, game_map : Map) -> None:
+        self.world_state.maps[game_map.name] = game_map
+        self.enable_stat_table(game_map)
+        self.queue_map_restocks(game_map)
+        if self.residency is not None:
+            self.residency.register_map(game_map)
+        self.world_index.add_map(game_map)
+        self.exit_graph.add_map(game_map)
+        game_map.on_sub_location_parsed = self.add_parsed_sub_location
+    
+    def add_parsed_sub_location(self, sublocation_path : str, sublocation : SubLocation) -> None:
+        #a sublocation of a resolved map parsed on its first lookup, the map already has its stat table.
+        for entity in sublocation.entities.with_tag("Merchant"):
+            self.queue_restock_if_merchant(entity = entity, sublocation_path = sublocation_path)
+        if self.residency is not None:
+            self.residency.add_resident(sublocation_path)
+        self.world_index.add_sub_location(sublocation_path, sublocation)
+    
+    def start_world_index(self) -> None:
+        #maps that are not resolved yet still take part in routing through their data.
+        self.world_index = WorldIndex()
+        self.exit_graph = ExitGraph(world_index = self.world_index)
+        for map_name, map_index in self.map_loader.map_indexes.items():
+            if not map_name in self.world_state.maps:
+                self.exit_graph.add_map_index(map_index)
+        for game_map in self.world_state.maps.values():
+            self.world_index.add_map(game_map)
+            self.exit_graph.add_map(game_map)
+    
+    def start_residency(self) -> None:
+        #every session evicts into a cache folder of its own inside save_path/.residency, saves always carry the full maps.
+        self.stop_residency()
+        if not self.residency_policy.enabled:
+            return
+        cache_path = f"{self.save_path}/.residency/{datetime.datetime.today().strftime("%Y%m%d%H%M%S%f")}_{os.getpid()}"
+        self.residency = SubLocationResidency(policy = self.residency_policy, cache_path = cache_path, maps = self.world_state.maps, load_sub_location = self.map_loader.load_sub_location, world_index = self.world_index)
+        for game_map in self.world_state.maps.values():
+            self.residency.register_map(game_map)
+    
+    def stop_residency(self) -> None:
+        #the world the residency evicted from is being dropped, so are its cache files.
+        if self.residency is not None:
+            self.residency.close()
+            self.residency = None
+    
+    def start_simulation(self) -> None:
+        self.simulation = SimulationScheduler(policy = self.simulation_policy, get_loaded_sub_location = self.get_loaded_sublocation, last_simulated = self.world_state.last_simulated)
+        self.simulation.add_system(RecoverySystem(policy = self.recovery_policy))
+        self.pending_restocks = set()
+        for game_map in self.world_state.maps.values():
+            self.queue_map_restocks(game_map)
+        self.start_economy()
+    
+    def start_partitions(self) -> None:
+        #workers of the previous game are stopped, a loaded game starts out with every map in the engine.
+        self.stop_partitions()
+        self.world_state.partitioned_maps = set()
+        if self.partition_policy.enabled:
+            self.partitions = PartitionManager(policy = self.partition_policy, data_path = self.data_path, seed = self.random_streams.seed, allocator = self.id_allocator, recovery_policy = self.recovery_policy, use_stat_tables = self.use_stat_tables)
+            print(f"[PartitionSystem] Started {self.partition_policy.workers} partition workers.")
+    
+    def stop_partitions(self) -> None:
+        if self.partitions is not None:
+            self.partitions.stop()
+            self.partitions = None
+    
+    def is_partitioned(self, path : str) -> bool:
+        #whether the map of a map, location or sublocation path is owned by a worker.
+        return self.partitions is not None and self.partitions.owns(self.world_index.get_map_name(path))
+    
+    def hand_off_map(self, map_name : str) -> None:
+        game_map = self.world_state.maps[map_name]
+        last_simulated = {}
+        if self.simulation is not None:
+            prefix = f"{map_name}/"
+            last_simulated = {path : ticks for path, ticks in self.simulation.last_simulated.items() if path.startswith(prefix)} #left in the world state too, saves and take backs bring them up to date.
+        self.partitions.hand_off(game_map = game_map, last_simulated = last_simulated) #evicted sublocations are read back from the residency cache here.
+        if self.residency is not None:
+            self.residency.unregister_map(game_map)
+        self.world_index.remove_map(map_name)
+        self.world_state.maps.pop(map_name)
+        self.world_state.partitioned_maps.add(map_name)
+        print(f"[PartitionSystem] Handed map \"{map_name}\" to a partition worker.")
+    
+    def take_back_partitioned_map(self, map_name : str) -> None:
+        released = self.partitions.take_back(map_name)
+        self.world_state.partitioned_maps.discard(map_name.strip())
+        self.add_loaded_map(self.map_loader.load_map_state(config = released["map_data"]))
+        if self.simulation is not None:
+            self.simulation.last_simulated.update(released["last_simulated"])
+        print(f"[PartitionSystem] Took map \"{map_name}\" back from its partition worker.")
+    
+    def update_partitions(self) -> None:
+        #maps the player moved away from are handed off, the ones around the player come back on their first access.
+        if self.partitions is None:
+            return
+        for map_name, error in self.partitions.take_failures().items():
+            print(f"[PartitionSystem] Partition worker failed on map \"{map_name}\" ({error}), taking it back.")
+            self.take_back_partitioned_map(map_name)
+        if self.game_engine.state == "game":
+            near_maps = self.exit_graph.get_maps_within(map_name = self.world_index.get_map_name(self.world_state.player.location), distance = self.partition_policy.keep_distance)
+            for map_name in [map_name for map_name in self.world_state.maps if not map_name in near_maps]:
+                self.hand_off_map(map_name)
+        self.partitions.advance(world_ticks = self.world_state.world_time.get_total_ticks())
+    
+    def start_economy(self) -> None:
+        #supply and demand are rebuilt as merchants restock, they are not part of saves. Updates a save still holds belong to the economy of its session and are replaced by a fresh chain.
+        self.economy = MerchantEconomy(item_types = list(ItemsLoader.MAPPING.keys()))
+        self.economy.last_update = self.world_state.world_time.get_total_ticks()
+        self.world_state.timed_scheduler.discard(command_type = "update_economy")
+        self.schedule_economy_update()
+    
+    def schedule_economy_update(self) -> None:
+        update_time = self.world_state.world_time.to_world_timestamp() + self.ECONOMY_UPDATE_PERIOD
+        self.economy.next_update = update_time.get_time_id()
+        self.world_state.timed_scheduler.schedule(command = TimeScheduledCommand(execution_time = update_time, actions = [{"type" : "update_economy", "args" : {"scheduled_for" : self.economy.next_update}}, ]))
+    
+    def update_economy(self, scheduled_for : int) -> None:
+        #updates scheduled by an earlier session or economy are left to lapse, so there is only ever one chain of updates.
+        if self.economy is None or scheduled_for != self.economy.next_update:
+            return
+        world_ticks = self.world_state.world_time.get_total_ticks()
+        self.economy.update(hours = max(1, (world_ticks - self.economy.last_update) // self.ECONOMY_UPDATE_PERIOD))
+        self.economy.last_update = world_ticks
+        self.schedule_economy_update()
+    
+    def update_simulation(self) -> None:
+        if self.simulation is not None:
+            self.simulation.update(current_path = self.world_state.player.location, world_ticks = self.world_state.world_time.get_total_ticks())
+    
+    def update_residency(self) -> None:
+        if self.residency is not None:
+            self.residency.enforce(current_path = self.world_state.player.location)
+    
+    def enable_stat_table(self, game_map : Map) -> None:
+        if self.use_stat_tables:
+            game_map.attach_stat_table(StatTable())
+    
+    def sync_entity_stat_table(self, entity : Entity, map_name : str) -> None:
+        #entities follow the stat table of the map they are in.
+        stat_table = self.world_state.maps[map_name.strip()].stat_table
+        if isinstance(entity, Player) or entity._stat_table is stat_table:
+            return
+        if entity._stat_table is not None:
+            entity._stat_table.detach(entity)
+        if stat_table is not None:
+            stat_table.attach(entity)
+    
+    def update_stat_tables(self) -> None:
+        current_ticks = self.world_state.world_time.get_total_ticks()
+        if self.stat_tables_last_update_ticks is None:
+            self.stat_tables_last_update_ticks = current_ticks
+            return
+        elapsed_ticks = current_ticks - self.stat_tables_last_update_ticks
+        if elapsed_ticks <= 0:
+            return
+        self.stat_tables_last_update_ticks = current_ticks
+        for game_map in self.world_state.maps.values():
+            if game_map.stat_table is not None:
+                game_map.stat_table.regenerate(ticks = elapsed_ticks, hp_per_tick = self.recovery_policy.hp_per_tick, stamina_per_tick = self.recovery_policy.stamina_per_tick)
     
     def give_item_to_inventory(self, item_type : str, item_name : str, amount : int, inventory : Inventory) -> None:
         default_item = self.item_loader.get_default(item_type = item_type, item_name = item_name)
         if default_item.stackable:
-            items = [self.item_spawner.spawn_new_stack(item_type = item_type, item_name = item_name, amount = amount),]
+            inventory.add_stack(self.item_spawner.spawn_new_stack(item_type = item_type, item_name = item_name, amount = amount))
         else:
-            items = []
-            for _ in range(amount):
-                items.append(self.item_spawner.spawn_new_item(item_type = item_type, item_name = item_name))
-        for item in items:
-            if isinstance(item, Item):
-                inventory.add_item(item)
-            else:
-                inventory.add_stack(item)
+            inventory.add_items(self.item_spawner.spawn_many(item_type = item_type, item_name = item_name, amount = amount))
     
     def remove_item_from_inventory(self, item_type : str, item_name : str, amount : int, inventory : Inventory, give_error : bool = True) -> bool:
         try:
@@ -436,8 +719,7 @@ class GameActions():
             else:
                 item_type = "instanced"
             if item_type == "instanced":
-                for _ in range(amount):
-                    inventory.remove_item(item_name = item_name)
+                inventory.remove_items(item_name = item_name, amount = amount)
             else:
                 inventory.remove_stack(stack_name = item_name, amount = amount)
             return True
@@ -449,17 +731,7 @@ class GameActions():
     
     def inventory_contains_item(self, inventory : Inventory, item_type : str, item_name : str, amount : int) -> bool:
         default_item = self.item_loader.get_default(item_type = item_type, item_name = item_name)
-        if default_item.stackable:
-            if not default_item.name in inventory.stacked:
-                return False
-            if inventory.stacked[default_item.name].amount < amount:
-                return False
-            return True
-        if not default_item.name in inventory.instanced:
-            return False
-        if len(inventory.instanced[default_item.name]) < amount:
-            return False
-        return True
+        return inventory.count(default_item.name) >= amount
     
     def player_has_item(self, item_type : str, item_name : str, amount : int) -> bool:
         player_inventory = self.world_state.player.inventory
@@ -522,6 +794,7 @@ class GameActions():
     def set_quest_complete(self, quest_id : str) -> None:
         self.set_quest_flag(quest_id = quest_id, flag = "completed", value = True)
         self.output(text = f"Quest Completed : {self.get_quest(quest_id).name}", tag = "reward")
+        self.request_autosave("quest_complete")
     
     def set_quest_failed(self, quest_id : str) -> None:
         self.set_quest_flag(quest_id = quest_id, flag = "failed", value = True)
@@ -548,27 +821,56 @@ class GameActions():
     
     def add_tag_to_location(self, location : str, tag : str) -> None:
         tag = tag.strip()
+        location_path = location
+        if self.is_partitioned(location_path):
+            self.set_partitioned_tag(path = location_path, tag = tag, present = True)
+            return
         location = self.get_location_from_path(location_path = location)
         if not tag in location.tags:
             location.tags.append(tag)
+            if tag == "locked":
+                self.exit_graph.set_locked(path = location_path, locked = True)
     
     def remove_tag_from_location(self, location : str, tag : str) -> None:
         tag = tag.strip()
+        location_path = location
+        if self.is_partitioned(location_path):
+            self.set_partitioned_tag(path = location_path, tag = tag, present = False)
+            return
         location = self.get_location_from_path(location_path = location)
         if tag in location.tags:
             location.tags.remove(tag)
+            if tag == "locked":
+                self.exit_graph.set_locked(path = location_path, locked = False)
     
     def add_tag_to_sublocation(self, sublocation : str, tag : str) -> None:
         tag = tag.strip()
+        sublocation_path = sublocation
+        if self.is_partitioned(sublocation_path):
+            self.set_partitioned_tag(path = sublocation_path, tag = tag, present = True)
+            return
         sublocation = self.get_sublocation_from_path(sublocation_path = sublocation)
         if not tag in sublocation.tags:
             sublocation.tags.append(tag)
+            if tag == "locked":
+                self.exit_graph.set_locked(path = sublocation_path, locked = True)
     
     def remove_tag_from_sublocation(self, sublocation : str, tag : str) -> None:
         tag = tag.strip()
+        sublocation_path = sublocation
+        if self.is_partitioned(sublocation_path):
+            self.set_partitioned_tag(path = sublocation_path, tag = tag, present = False)
+            return
         sublocation = self.get_sublocation_from_path(sublocation_path = sublocation)
         if tag in sublocation.tags:
             sublocation.tags.remove(tag)
+            if tag == "locked":
+                self.exit_graph.set_locked(path = sublocation_path, locked = False)
+    
+    def set_partitioned_tag(self, path : str, tag : str, present : bool) -> None:
+        self.partitions.send(self.world_index.get_map_name(path), "set_tag", path = path, tag = tag, present = present)
+        if tag == "locked":
+            self.exit_graph.set_locked(path = path, locked = present)
     
     def lock_location(self, location : str) -> None:
         self.add_tag_to_location(location = location, tag = "locked")
@@ -583,11 +885,14 @@ class GameActions():
         self.remove_tag_from_location(location = location, tag = "locked")
     
     def get_location_from_path(self, location_path : str) -> Location:
-        location_list = location_path.split("/")
-        map_name = location_list[0].strip()
-        if not map_name in self.world_state.maps:
-            self.resolve_map(map_name)
-        return self.world_state.maps[map_name].locations[location_list[1].strip()]
+        #sublocation paths resolve to the location holding them.
+        map_name, location_name = self.world_index.split(location_path)[:2]
+        location = self.world_index.get_location(f"{map_name}/{location_name}")
+        if location is None:
+            if not map_name in self.world_state.maps:
+                self.resolve_map(map_name)
+            location = self.world_state.maps[map_name].locations[location_name]
+        return location
     
     def location_has_tag(self, tag : str, location : str) -> bool:
         location : Location = self.get_location_from_path(location_path = location)
@@ -612,6 +917,7 @@ class GameActions():
         self.ui_engine.update_box_signal.emit("effects", data)
         
     def set_state_to_game(self) -> None:
+        self.game_engine.autosave_manager.reset(world_ticks = self.world_state.world_time.get_total_ticks())
         self.clear_game_output()
         self.game_engine.state = "game"
         self.ui_engine.switch_page.emit("game")
@@ -628,8 +934,16 @@ class GameActions():
             self.data_path = self.settings["data_path"]
             self.save_path = self.settings["save_path"]
             self.macros = self.settings["user_macros"]
-    
-    def initialize_game(self, item_registry : ItemRegistry | None = None, entity_registry : EntityRegistry | None = None) -> None:
+            self.autosave_policy = AutosavePolicy(**self.settings.get("autosave", {}))
+            self.use_stat_tables = verifier.verify_type(self.settings.get("stat_tables", False), bool, "stat_tables")
+            self.residency_policy = ResidencyPolicy(**self.settings.get("residency", {}))
+            self.simulation_policy = SimulationPolicy(**self.settings.get("simulation", {}))
+            self.recovery_policy = RecoveryPolicy(**self.settings.get("recovery", {}))
+            self.random_seed = verifier.verify_type(self.settings.get("seed"), int, "seed", True) #new games use a random seed unless one is set.
+            self.partition_policy = PartitionPolicy(**self.settings.get("partitions", {}))
+    
+    def initialize_game(self, item_registry : ItemRegistry | None = None, entity_registry : EntityRegistry | None = None, random_streams : RandomStreams | None = None) -> None:
+        self.stat_tables_last_update_ticks : int | None = None
         self.NAMES_PATH = f"{self.data_path}/names.txt"
         self.ITEMS_PATH = f"{self.data_path}/Items"
         self.CURRENCY_PATH = f"{self.data_path}/Currency"
@@ -643,13 +957,19 @@ class GameActions():
         self.SKILLS_PATH = f"{self.data_path}/Skills"
         self.TECHNIQUES_PATH = f"{self.data_path}/Techniques"
         
-        self.name_loader = NamesLoader(path = self.NAMES_PATH)
+        if random_streams is None:
+            self.random_streams = RandomStreams(seed = self.random_seed)
+        else:
+            self.random_streams : RandomStreams = verifier.verify_type(random_streams, RandomStreams, "random_streams")
+        print(f"[System] Random seed is {self.random_streams.seed}.")
+        self.name_loader = NamesLoader(path = self.NAMES_PATH, rng = self.random_streams.get("names"))
         if item_registry is None:
             self.item_registry = ItemRegistry()
         else:
             self.item_registry : ItemRegistry = verifier.verify_type(item_registry, ItemRegistry, "item_registry")
+        self.id_allocator : IdAllocator = self.item_registry.allocator
         if entity_registry is None:
-            self.entity_registry = EntityRegistry()
+            self.entity_registry = EntityRegistry(allocator = self.id_allocator)
         else:
             self.entity_registry : EntityRegistry = verifier.verify_type(entity_registry, EntityRegistry, "entity_registry")
             
@@ -659,7 +979,7 @@ class GameActions():
         self.all_currencies_mapping = self.currency_loader.get_all_currencies_mapping()
         self.money_loader = MoneyLoader(currency_loader = self.currency_loader)
         self.table_loader = TablesLoader(path = self.TABLES_PATH)
-        self.table_resolver = TableResolver(table_loader = self.table_loader, item_loader = self.item_loader, item_spawner = self.item_spawner, money_loader = self.money_loader)
+        self.table_resolver = TableResolver(table_loader = self.table_loader, item_loader = self.item_loader, item_spawner = self.item_spawner, money_loader = self.money_loader, rng = self.random_streams.get_generator("loot"))
         self.dialogue_loader = DialogueLoader(path = self.DIALOGUES_PATH)
         self.interaction_loader = InteractionLoader(path = self.INTERACTIONS_PATH, dialogue_loader = self.dialogue_loader)
         self.cultivation_loader = CultivationLoader(path = self.CULTIVATION_PATH, initalize_registry = True)
@@ -667,7 +987,7 @@ class GameActions():
         self.cultivation_creator = CultivationCreator(registry = self.cultivation_loader.registry, calculator = self.cultivation_calculator)
         self.basic_stat_calculator = BasicStatCalculator()
         self.technique_loader = TechniqueLoader(path = self.TECHNIQUES_PATH)
-        self.entity_loader = EntityLoader(name_loader = self.name_loader, entity_registry = self.entity_registry, cultivation_creator = self.cultivation_creator, basic_stat_calculator = self.basic_stat_calculator, item_spawner = self.item_spawner, table_resolver = self.table_resolver, interaction_loader = self.interaction_loader, dialogue_loader = self.dialogue_loader, technique_loader = self.technique_loader)
+        self.entity_loader = EntityLoader(name_loader = self.name_loader, entity_registry = self.entity_registry, cultivation_creator = self.cultivation_creator, basic_stat_calculator = self.basic_stat_calculator, item_spawner = self.item_spawner, table_resolver = self.table_resolver, interaction_loader = self.interaction_loader, dialogue_loader = self.dialogue_loader, technique_loader = self.technique_loader, rng = self.random_streams.get("spawning"))
         self.entity_loader.initialize_entities(path = self.ENTITY_PATH)
         self.skills_loader = SkillsLoader(path = self.SKILLS_PATH)
         self.map_loader = MapLoader(path = self.MAPS_PATH, item_spawner = self.item_spawner, table_resolver = self.table_resolver, entity_loader = self.entity_loader)
@@ -676,17 +996,22 @@ class GameActions():
     def initialize_new_game(self) -> None:
         self.initialize_game()
         self.world_state = WorldState()
+        self.world_state.random_streams = self.random_streams
         self.world_state.world_time = WorldTime()
         self.world_state.timed_scheduler = TimedScheduler()
         self.world_state.player = self.get_default_player()
         self.world_state.quest_condition_pool = QuestConditionPool(interpreter = self.interpreter)
         self.world_state.player.quest_manager.add_all_quest_conditionals_to_pool(quest_loader = self.quest_loader, quest_condition_pool = self.world_state.quest_condition_pool)
-        self.game_engine.current_location = self.get_sublocation_from_path(self.world_state.player.location)
+        self.start_world_index()
+        self.start_residency()
+        self.start_simulation()
+        self.start_partitions()
+        self.sync_engine_location_to_player_location()
         self.set_state_to_game()
     
     def load_game(self) -> None:
         self.output(f"Please enter the save name you would like to load. Here are the most recent saves in \"{self.save_path}\" dir:", "system")
-        save_game_names = os.listdir(self.save_path)
+        save_game_names = [save_name for save_name in os.listdir(self.save_path) if not save_name.startswith(".")] #autosaves being written live in hidden temporary folders.
         if len(save_game_names) > 10:
             self.output("...")
             for save_location in range(len(save_game_names)-10, len(save_game_names)):
@@ -703,11 +1028,15 @@ class GameActions():
             self.output(f"No such save by the name \"{user_input}\" exists.", "system")
         else:
             game_save_dict = self.load_game_folder(f"{self.save_path}/{user_input}")
-            self.initialize_game(item_registry = game_save_dict["item_registry"], entity_registry = game_save_dict["entity_registry"])
+            self.initialize_game(item_registry = game_save_dict["item_registry"], entity_registry = game_save_dict["entity_registry"], random_streams = game_save_dict["random_streams"])
             self.world_state = self.load_world_state(path = f"{self.save_path}/{user_input}", world_state_config = game_save_dict["world_state_config"])
             self.world_state.quest_condition_pool = QuestConditionPool(interpreter = self.interpreter)
             self.world_state.player.quest_manager.add_all_quest_conditionals_to_pool(quest_loader = self.quest_loader, quest_condition_pool = self.world_state.quest_condition_pool)
-            self.game_engine.current_location = self.get_sublocation_from_path(self.world_state.player.location)
+            self.start_world_index()
+            self.start_residency()
+            self.start_simulation()
+            self.start_partitions()
+            self.sync_engine_location_to_player_location()
             self.set_state_to_game()
     
     def continue_last_game(self) -> None:
@@ -720,9 +1049,13 @@ class GameActions():
             return
         else:
             game_save_dict = self.load_game_folder(f"{self.save_path}/{last_game_folder}")
-            self.initialize_game(item_registry = game_save_dict["item_registry"], entity_registry = game_save_dict["entity_registry"])
+            self.initialize_game(item_registry = game_save_dict["item_registry"], entity_registry = game_save_dict["entity_registry"], random_streams = game_save_dict["random_streams"])
             self.world_state = self.load_world_state(path = f"{self.save_path}/{last_game_folder}", world_state_config = game_save_dict["world_state_config"])
-            self.game_engine.current_location = self.get_sublocation_from_path(self.world_state.player.location)
+            self.start_world_index()
+            self.start_residency()
+            self.start_simulation()
+            self.start_partitions()
+            self.sync_engine_location_to_player_location()
             self.set_state_to_game()
     
     def process_mainmenu_player_input(self) -> None:
@@ -745,10 +1078,11 @@ class GameActions():
                 self.output(f"\"{user_input}\" is not a recognized command.", "system")
     
     def get_player_location_as_list(self) -> list[str]:
-        return self.world_state.player.location.split("/")
+        return list(self.world_index.split(self.world_state.player.location))
     
     def sync_engine_location_to_player_location(self) -> None:
         self.game_engine.current_location = self.get_sublocation_from_path(self.world_state.player.location)
+        self.world_state.visited.add(self.world_index.normalize(self.world_state.player.location))
     
     def process_sublocation_events(self) -> None:
         player_sublocation = self.game_engine.current_location
@@ -763,8 +1097,37 @@ class GameActions():
             player_sublocation.location_events.pop(event_location_to_remove)
     
     def save_game(self) -> None:
-        self._save_game(path = self.save_path, world_state = self.world_state, item_registry = self.item_registry, entity_registry = self.entity_registry)
+        save_folder_name = self._save_game(path = self.save_path, world_state = self.world_state, item_registry = self.item_registry, entity_registry = self.entity_registry)
+        #recorded by the background writer, after any autosave it is still finishing, so an older autosave never takes the place of this save.
+        self.game_engine.autosave_manager.writer.submit(lambda : self._record_last_save(save_folder_name))
+        self.game_engine.last_save_time = datetime.datetime.now()
+        self.game_engine.autosave_manager.reset(world_ticks = self.world_state.world_time.get_total_ticks())
+    
+    def request_autosave(self, reason : str, immediate : bool = False) -> None:
+        autosave_manager = self.game_engine.autosave_manager
+        if autosave_manager is None or self.game_engine.state == "mainmenu":
+            return
+        autosave_manager.request(reason)
+        if immediate:
+            self.game_engine.process_autosave()
+            autosave_manager.discard(reason) #one that could not be saved right away (eg: too soon after the last save) would be saved too late to be of use (eg: after the fight it was meant to come before).
+    
+    def autosave(self, reasons : set[str]) -> None:
+        #only a snapshot of the world is taken here, on the loop thread. Writing it to disk, publishing the folder, recording it and rotation happen on the background writer.
+        autosave_manager = self.game_engine.autosave_manager
+        save_path = self.save_path
+        folder_name = autosave_manager.new_folder_name()
+        os.makedirs(save_path, exist_ok = True)
+        temp_folder_path = autosave_manager.open_temp_folder(path = save_path, folder_name = folder_name)
+        snapshot = self._snapshot_save_contents(folder_path = temp_folder_path, world_state = self.world_state, item_registry = self.item_registry, entity_registry = self.entity_registry)
+        def write_autosave() -> None:
+            autosave_manager.write_snapshot(temp_folder_path = temp_folder_path, snapshot = snapshot)
+            autosave_manager.finish_temp_folder(path = save_path, folder_name = folder_name)
+            self._record_last_save(folder_name)
+            autosave_manager.rotate(path = save_path)
+        autosave_manager.writer.submit(write_autosave)
         self.game_engine.last_save_time = datetime.datetime.now()
+        print(f"[System] Autosaving to \"{folder_name}\" ({", ".join(sorted(reasons))}).")
         
     def start_trade(self) -> None:
         if not self.game_engine.current_interaction:
@@ -773,52 +1136,59 @@ class GameActions():
             self.output("I am not a merchant.", "npc")
             return
         self.game_engine.state = "trade"
-        trade_session = TradeSession(merchant = self.game_engine.current_interaction.npc, player = self.world_state.player)
+        trade_session = TradeSession(merchant = self.game_engine.current_interaction.npc, player = self.world_state.player, economy = self.economy)
         trade_session.build()
         self.game_engine.trade_session = trade_session
-        self.display_trading_info_from_dicts(sell_id_to_price = trade_session.sell_id_to_price, sell_id_to_item = trade_session.sell_id_to_item, sell_id_to_stack = trade_session.sell_id_to_stack)
+        self.display_trading_info(ledger = trade_session.merchant_ledger)
         self.output(f"Currencies Accepted : {trade_session.trader_profile.accepted_currencies}\nItem Types Accepted : {trade_session.trader_profile.accepted_item_tags}")
         
     def end_trade(self) -> None:
         if self.game_engine.state == "trade":
+            self.game_engine.trade_session.close()
             self.game_engine.trade_session = None
             self.game_engine.state = "interaction"
     
-    def display_trading_info_from_dicts(self, sell_id_to_price : dict, sell_id_to_item : dict, sell_id_to_stack : dict) -> None:
-        for sell_id in sell_id_to_price.keys():
-            if sell_id in sell_id_to_item:
-                item = sell_id_to_item[sell_id]
-                item_name = item.name
-            else:
-                item = sell_id_to_stack[sell_id]
-                item_name = item.base.name
-            if isinstance(item, Item):
-                self.output(f"Id : {sell_id}, Item : {item_name}, Durability : {(item.current_durability / item.durability * 100):.2f}%, Price : {sell_id_to_price[sell_id]}", "npc")
+    def display_trading_info(self, ledger : TradeLedger) -> None:
+        for sell_id, item in ledger.sell_id_to_item.items():
+            if hasattr(item, "durability"):
+                self.output(f"Id : {sell_id}, Item : {item.name}, Durability : {(item.current_durability / item.durability * 100):.2f}%, Price : {ledger.sell_id_to_price[sell_id]}", "npc")
             else:
-                self.output(f"Id : {sell_id}, Item : {item.base.name}, Amount : {item.amount}, Price : {sell_id_to_price[sell_id]}", "npc")
+                self.output(f"Id : {sell_id}, Item : {item.name}, Price : {ledger.sell_id_to_price[sell_id]}", "npc")
+        for sell_id, stack in ledger.sell_id_to_stack.items():
+            self.output(f"Id : {sell_id}, Item : {stack.base.name}, Amount : {stack.amount}, Price : {ledger.sell_id_to_price[sell_id]}", "npc")
     
     def display_trade_help(self) -> None:
         self.output(f"You have the following commands at your disposal while trading :", "info")
         self.output(f"1) \"leave\" : to leave the trade.", "info")
         self.output(f"2) \"inspect\" : followed by the id of the item you would like to inspect.", "info")
         self.output(f"3) \"view\" : followed by \"self\" to see everything you can sell to the trader or leave empty to view everything the trader has to offer.", "info")
-        self.output(f"4) \"buy\" : followed by the id of the item you would like to buy. Additionally, you can follow up with the number of items you would like to buy if the item is a stack.", "info")
-        self.output(f"5) \"sell\" : followed by the id of the item you would like to see. Additionall, you can follow up with the number of items you would like to sell if the item is a stack.", "info")        
-        
-    def handle_trade(self, item_sell_id : str, sell_id_to_price_mapping : dict, sell_id_to_item_mapping : dict, sell_id_to_stack_mapping : dict, from_inventory : Inventory, to_inventory : Inventory, from_trade_profile : TraderProfile, to_trade_profile : TraderProfile, amount : int | None = None):
+        self.output(f"4) \"buy\" : followed by the id of the item you would like to buy. Additionally, you can follow up with the number of items you would like to buy, for items that aren't stacks the rest are picked from items with the same name.", "info")
+        self.output(f"5) \"sell\" : followed by the id of the item you would like to see. Additionall, you can follow up with the number of items you would like to sell, same as buying.", "info")        
         
-        if item_sell_id in sell_id_to_item_mapping:
+    def handle_trade(self, item_sell_id : str, ledger : TradeLedger, from_inventory : Inventory, to_inventory : Inventory, from_trade_profile : TraderProfile, to_trade_profile : TraderProfile, amount : int | None = None):
+        #buying or selling any amount is a single transaction, both ledgers are updated once it is done.
+        if item_sell_id in ledger.sell_id_to_item:
             item_type = "instanced"
-            item = sell_id_to_item_mapping[item_sell_id]
-        else:
+            item = ledger.sell_id_to_item[item_sell_id]
+            items = ledger.get_same_items(sell_id = item_sell_id, amount = 1 if amount is None else amount)
+            if amount is not None and len(items) < amount:
+                self.output(f"It seems like the seller doesn't have the requested number of items.", "info")
+                return
+        elif item_sell_id in ledger.sell_id_to_stack:
             item_type = "stacked"
-            item = sell_id_to_stack_mapping[item_sell_id]
+            item = ledger.sell_id_to_stack[item_sell_id]
             if amount is None:
                 self.output("Please specify an amount to trade.", "info")
                 return
             elif item.amount < amount:
                 self.output(f"It seems like the seller doesn't have the requested number of items.", "info")
                 return
+        else:
+            self.output(f"There is nothing with the id \"{item_sell_id}\" up for trade.", "info")
+            return
+        if amount is not None and amount <= 0:
+            self.output("You can't trade less than one item.", "info")
+            return
         accepted_currencies = from_trade_profile.accepted_currencies
         accepted_item_tags = set(to_trade_profile.accepted_item_tags)
         if isinstance(item, Item):
@@ -836,31 +1206,30 @@ class GameActions():
             usable_currencies = list(self.all_currencies_mapping.values())
         else:
             usable_currencies = [self.all_currencies_mapping[currency_name] for currency_name in accepted_currencies]
-        item_value = sell_id_to_price_mapping[item_sell_id]
         if item_type == "stacked":
-            item_value = item_value * amount
-        elif item_type == "instanced" and amount not in (None, 1):
-            self.output("Instanced items can only be traded one at a time.", "info")
-            return
+            item_value = ledger.sell_id_to_price[item_sell_id] * amount
+        else:
+            item_value = sum(ledger.sell_id_to_price[ledger.item_id_to_listing_id[same_item.id]] for same_item in items)
         money_can_be_adjusted_dict = to_inventory.money.can_adjust(value = item_value, currencies = usable_currencies)
         if not money_can_be_adjusted_dict["can_adjust"]:
             self.output(f"It seems like the buyer doesn't have enough money of the same kind as the seller accepts for the purchase.", "info")
             return
         cost = money_can_be_adjusted_dict["cost"]
-        if item_type == "instanced":
-            from_inventory.remove_item_by_id(item_type = item_type, item_id = item.id)
-            to_inventory.add_item(item = item)
-            sell_id_to_item_mapping.pop(item_sell_id)
-            sell_id_to_price_mapping.pop(item_sell_id)
-        else:
-            from_inventory.remove_stack(stack_name = item.base.name, amount = amount)
-            to_inventory.add_stack(Stack(base = item.base, amount = amount))
-            sell_id_to_stack_mapping[item_sell_id].amount -= amount
-            if sell_id_to_stack_mapping[item_sell_id].amount == 0:
-                sell_id_to_stack_mapping.pop(item_sell_id)
-                sell_id_to_price_mapping.pop(item_sell_id)
-        to_inventory.money.remove(cost)
-        from_inventory.money.add(Money(cost))
+        with self.game_engine.trade_session.transaction():
+            if item_type == "instanced":
+                for same_item in items:
+                    from_inventory.remove_item_by_id(item_id = same_item.id)
+                to_inventory.add_items(items)
+            else:
+                from_inventory.remove_stack(stack_name = item.base.name, amount = amount)
+                to_inventory.add_stack(Stack(base = item.base, amount = amount))
+            to_inventory.money.remove(cost)
+            from_inventory.money.add(Money(cost))
+        trade_session = self.game_engine.trade_session
+        if trade_session.economy is not None:
+            traded_item = item if item_type == "instanced" else item.base
+            traded_amount = len(items) if item_type == "instanced" else amount
+            trade_session.economy.record_trade(merchant = trade_session.merchant, item = traded_item, amount = traded_amount if ledger is trade_session.merchant_ledger else -traded_amount)
         self.output("Trade Successful!", "success")
         
     def display_item_info(self, item : Item | Stack) -> None:
@@ -888,8 +1257,9 @@ class GameActions():
             self.display_trade_help()
             return
         trade_session = self.game_engine.trade_session
+        trade_session.refresh_prices()
         if user_input == "view":
-            self.display_trading_info_from_dicts(sell_id_to_price = trade_session.merchant_sell_id_to_price, sell_id_to_item = trade_session.merchant_sell_id_to_item, sell_id_to_stack = trade_session.merchant_sell_id_to_stack)
+            self.display_trading_info(ledger = trade_session.merchant_ledger)
             self.output(f"Currencies Accepted : {trade_session.trader_profile.accepted_currencies}\nItem Types Accepted : {trade_session.trader_profile.accepted_item_tags}")
             return
         
@@ -916,40 +1286,35 @@ class GameActions():
                 return
         if trade_type == "buy":
             if user_input_length == 3:
-                self.handle_trade(item_sell_id = item_sell_id, sell_id_to_price_mapping = trade_session.merchant_sell_id_to_price, sell_id_to_item_mapping = trade_session.merchant_sell_id_to_item, sell_id_to_stack_mapping = trade_session.merchant_sell_id_to_stack, from_inventory = trader_inventory, to_inventory = player_inventory, from_trade_profile = trader_profile, to_trade_profile = player_profile, amount = amount)
+                self.handle_trade(item_sell_id = item_sell_id, ledger = trade_session.merchant_ledger, from_inventory = trader_inventory, to_inventory = player_inventory, from_trade_profile = trader_profile, to_trade_profile = player_profile, amount = amount)
             else:
-                self.handle_trade(item_sell_id = item_sell_id, sell_id_to_price_mapping = trade_session.merchant_sell_id_to_price, sell_id_to_item_mapping = trade_session.merchant_sell_id_to_item, sell_id_to_stack_mapping = trade_session.merchant_sell_id_to_stack, from_inventory = trader_inventory, to_inventory = player_inventory, from_trade_profile = trader_profile, to_trade_profile = player_profile)
-            self.set_player_inventory_mapping()
+                self.handle_trade(item_sell_id = item_sell_id, ledger = trade_session.merchant_ledger, from_inventory = trader_inventory, to_inventory = player_inventory, from_trade_profile = trader_profile, to_trade_profile = player_profile)
         elif trade_type == "sell":
-            if item_sell_id in self.game_engine.trade_session.player_sell_id_to_item:
-                item = self.game_engine.trade_session.player_sell_id_to_item[item_sell_id]
-                if self.world_state.player.loadout.item_is_equipped(item = item):
+            if item_sell_id in trade_session.player_ledger.sell_id_to_item:
+                items = trade_session.player_ledger.get_same_items(sell_id = item_sell_id, amount = amount if user_input_length == 3 else 1)
+                if any(self.world_state.player.loadout.item_is_equipped(item = item) for item in items):
                     self.output("Item currently equipped. Please unequip to sell it.", "info")
                     self.output("Yeah, I also thought about that. Try harder to find a bug.", "narrator")
                     return
             if user_input_length == 3:
-                self.handle_trade(item_sell_id = item_sell_id, sell_id_to_price_mapping = trade_session.player_sell_id_to_price, sell_id_to_item_mapping = trade_session.player_sell_id_to_item, sell_id_to_stack_mapping = trade_session.player_sell_id_to_stack, from_inventory = player_inventory, to_inventory = trader_inventory, from_trade_profile = player_profile, to_trade_profile = trader_profile, amount = amount)
+                self.handle_trade(item_sell_id = item_sell_id, ledger = trade_session.player_ledger, from_inventory = player_inventory, to_inventory = trader_inventory, from_trade_profile = player_profile, to_trade_profile = trader_profile, amount = amount)
             else:
-                self.handle_trade(item_sell_id = item_sell_id, sell_id_to_price_mapping = trade_session.player_sell_id_to_price, sell_id_to_item_mapping = trade_session.player_sell_id_to_item, sell_id_to_stack_mapping = trade_session.player_sell_id_to_stack, from_inventory = player_inventory, to_inventory = trader_inventory, from_trade_profile = player_profile, to_trade_profile = trader_profile)
-            self.set_player_inventory_mapping()
+                self.handle_trade(item_sell_id = item_sell_id, ledger = trade_session.player_ledger, from_inventory = player_inventory, to_inventory = trader_inventory, from_trade_profile = player_profile, to_trade_profile = trader_profile)
         
         elif trade_type == "view":
             if not user_input[1].strip().lower() == "self":
                 self.output(f"I'm going to take a wild guess and say you read help. Unfortunately, you didn't read it well. Anyhow, since I am nice, ill just let you see your inventory even after you wrote \"{user_input[1]}\" instead of the correct \"self\". If you wanted to just see the trader's inventory again, just write view without anything else after that.", "narrator")
-            self.display_trading_info_from_dicts(sell_id_to_price = trade_session.player_sell_id_to_price, sell_id_to_item = trade_session.player_sell_id_to_item, sell_id_to_stack = trade_session.player_sell_id_to_stack)
+            self.display_trading_info(ledger = trade_session.player_ledger)
         
         elif trade_type == "inspect":
             item_id_to_inspect = user_input[1].strip()
-            if item_id_to_inspect in trade_session.merchant_sell_id_to_price:
-                if item_id_to_inspect in trade_session.merchant_sell_id_to_item:
-                    self.display_item_info(trade_session.merchant_sell_id_to_item[item_id_to_inspect])
-                else:
-                    self.display_item_info(trade_session.merchant_sell_id_to_stack[item_id_to_inspect])
-            elif item_id_to_inspect in trade_session.player_sell_id_to_price:
-                if item_id_to_inspect in trade_session.player_sell_id_to_item:
-                    self.display_item_info(trade_session.player_sell_id_to_item[item_id_to_inspect])
-                else:
-                    self.display_item_info(trade_session.player_sell_id_to_stack[item_id_to_inspect])
+            for ledger in (trade_session.merchant_ledger, trade_session.player_ledger):
+                if item_id_to_inspect in ledger.sell_id_to_price:
+                    if item_id_to_inspect in ledger.sell_id_to_item:
+                        self.display_item_info(ledger.sell_id_to_item[item_id_to_inspect])
+                    else:
+                        self.display_item_info(ledger.sell_id_to_stack[item_id_to_inspect])
+                    break
             else:
                 self.output(f"Inspect what? \"{item_id_to_inspect}\" is not in the trader's inventory, nor in yours. How do you even know it exists? Or was it a typo? Either way, it doesn't exist.", "narrator")
         else:
@@ -1030,22 +1395,15 @@ class GameActions():
             self.output(f"{exit_number + 1} : {exit_name}", "info")
     
     def set_player_inventory_mapping(self) -> None:
-        id_to_item = {}
-        id_to_stack = {}
-        for item_type in ["instanced", "stacked"]:
-            item_type_inventory : dict[str , list[Item]] | dict[str, Stack] = getattr(self.world_state.player.inventory, item_type)
-            for item_name in item_type_inventory.keys():
-                if item_type == "instanced":
-                    item_number = 0
-                    for item in item_type_inventory[item_name]:
-                        item_number += 1
-                        item_id = f"{item_name}_{item_number}".replace(" ", "_")
-                        id_to_item[item_id] = item
-                else:
-                    stack = item_type_inventory[item_name]
-                    item_id = f"{stack.base.name}".replace(" ", "_")
-                    id_to_stack[item_id] = stack
-        self.game_engine.current_player_inventory_mapping = {"id_to_item" : id_to_item, "id_to_stack" : id_to_stack}
+        #the listing follows the player's inventory, it is only rebuilt when the inventory itself is replaced (eg: after loading a game).
+        listing : InventoryListing | None = self.game_engine.player_inventory_listing
+        if listing is not None and listing.inventory is self.world_state.player.inventory:
+            return
+        if listing is not None:
+            listing.close()
+        listing = InventoryListing(inventory = self.world_state.player.inventory)
+        self.game_engine.player_inventory_listing = listing
+        self.game_engine.current_player_inventory_mapping = {"id_to_item" : listing.id_to_item, "id_to_stack" : listing.id_to_stack}
     
     def handle_inventory_look(self) -> None:
         self.set_player_inventory_mapping()
@@ -1197,9 +1555,19 @@ class GameActions():
                     self.output("Then again, when have locked places ever stopped you?", "narrator")
                 return
             
+            if self.world_index.get_map_name(location_to_go_to_path) != self.world_index.get_map_name(self.world_state.player.location):
+                self.request_autosave("map_transition")
             self.game_engine.current_location = sublocation_to_go_to
             self.game_engine.temp_entity_id_to_entity_mapping = None
             self.world_state.player.location = location_to_go_to_path
+            self.world_state.visited.add(self.world_index.normalize(location_to_go_to_path))
+            return
+        
+        elif first_arg == "travel":
+            if player_input_length < 2:
+                self.output("travel where? The world is big, you know. Follow \"travel\" with the place you want to go to.", "narrator")
+                return
+            self.handle_travel(destination = original_player_input.strip()[len(player_input[0]):].strip())
             return
         
         elif first_arg == "equip":
@@ -1353,6 +1721,7 @@ class GameActions():
         self.output("10) \"quests\" : Followed by \"completed\", \"active\" or \"failed\" to view completed quests, active quests and failed quests respectively.", "info")
         self.output("11) \"use\" : Followed by the item id of the item you want to use. Use \"inventory\" to see item ids.", "info")
         self.output("12) \"observe\" : To carefully observe your surroundings or a particular entity by following it up with the entity id.", "info")
+        self.output("13) \"travel\" : Followed by the name or full path of any place you have been to or seen an exit to, to walk there through as few places as possible.", "info")
         
     def process_game_player_input(self) -> None:
         while not self.ui_engine.input_queue.empty():
@@ -1397,9 +1766,10 @@ class GameActions():
                 tag_tuples_for_team.append(tuple(tag_list_for_team))
             tags_to_team_mapping[tuple(tag_tuples_for_team)] = team
         
+        self.request_autosave("before_combat", immediate = True)
         combat_starter = CombatStarter(self.game_engine.current_location)
         combat_context = combat_starter.group_by_tags(tags_to_team_mapping = tags_to_team_mapping)
-        self.game_engine.combat_resolver = CombatResolver(combat_context = combat_context, game_engine = self.game_engine, cultivation_calculator = self.cultivation_calculator)
+        self.game_engine.combat_resolver = CombatResolver(combat_context = combat_context, game_engine = self.game_engine, cultivation_calculator = self.cultivation_calculator, rng = self.random_streams.session("combat"), targeting_rng = self.random_streams.session("targeting"))
         self.game_engine.state = "combat"
         
     def start_combat_with_commanders(self, commanders_ids : list[str]) -> None:
@@ -1416,15 +1786,17 @@ class GameActions():
             self.output("Found more commanders than commanders ids. Combat initialization aborted. There is something very wrong with entity ids. It would be wise to fix it while you can.", "error")
             return
                 
+        self.request_autosave("before_combat", immediate = True)
         combat_starter = CombatStarter(self.game_engine.current_location)
         combat_context = combat_starter.group_by_commanders(commanders = commanders)
-        self.game_engine.combat_resolver = CombatResolver(combat_context = combat_context, game_engine = self.game_engine, cultivation_calculator = self.cultivation_calculator)
+        self.game_engine.combat_resolver = CombatResolver(combat_context = combat_context, game_engine = self.game_engine, cultivation_calculator = self.cultivation_calculator, rng = self.random_streams.session("combat"), targeting_rng = self.random_streams.session("targeting"))
         self.game_engine.state = "combat"
         
     def start_combat_with_target_tags(self, target : Entity) -> None:
+        self.request_autosave("before_combat", immediate = True)
         combat_starter = CombatStarter(self.game_engine.current_location)
         self.game_engine.combat_context = combat_starter.group_by_target_tags(target = target)
-        self.game_engine.combat_resolver = CombatResolver(combat_context = self.game_engine.combat_context, game_engine = self.game_engine, cultivation_calculator = self.cultivation_calculator)
+        self.game_engine.combat_resolver = CombatResolver(combat_context = self.game_engine.combat_context, game_engine = self.game_engine, cultivation_calculator = self.cultivation_calculator, rng = self.random_streams.session("combat"), targeting_rng = self.random_streams.session("targeting"))
         self.game_engine.state = "combat"
     
     def end_combat(self, conclusion : Literal["win", "defeat"]) -> None:
@@ -1439,10 +1811,11 @@ class GameActions():
                             entity.entity.is_alive = True
                     continue
                 for entity in self.game_engine.combat_context.combat_positions[team].values():
-                    for item in entity.entity.inventory.instanced.values():
-                        sublocation.inventory.add_item(item = item)
-                    for stack in entity.entity.inventory.stacked.values():
-                        sublocation.inventory.add_stack(stack = stack)
+                    for item in entity.entity.inventory.iter_items():
+                        if isinstance(item, Item):
+                            sublocation.inventory.add_item(item = item)
+                        else:
+                            sublocation.inventory.add_stack(stack = item)
         else:
             self.output("You lost the battle but managed to escape.", "defeat")
         self.game_engine.state = "game"
@@ -1462,10 +1835,12 @@ class GameActions():
             if not map_file_name_with_extension in maps_present:
                 self.output(f"Critical Error : Map \"{map_name}\" not found in maps.\nFix : copy and paste default map from game files or try to recover the map.", "error")
             else:
-                with open(f"{path}/maps/{map_file_name_with_extension}", encoding = "utf-8") as config_file:
-                    config = json.load(config_file)
-                    maps[map_name] = self.map_loader.load_map_state(config = config)
+                maps[map_name] = self.map_loader.load_map_state_from_file(path = f"{path}/maps/{map_file_name_with_extension}")
+                self.enable_stat_table(maps[map_name])
 
+        world_state.random_streams = self.random_streams
+        world_state.last_simulated = dict(world_state_config.get("last_simulated", {})) #saves from before it was stored catch up from their first visit.
+        world_state.visited = set(world_state_config.get("visited", [])) #saves from before it was stored only know of the places seen from where the player stands.
         world_state.world_time = world_time
         world_state.timed_scheduler = timed_scheduler
         world_state.quest_condition_pool = quest_condition_pool
@@ -1486,20 +1861,25 @@ class GameActions():
             self.output(f"\"{path}\" directory does not contain either file \"world_state.json\" or directory \"maps\".", "error")
             return None
         
+        id_allocator = IdAllocator()
         with open(f"{path}/item_registry.json", encoding = "utf-8") as item_registry_file:
             item_registry_file = json.load(item_registry_file)
-            item_registry = ItemRegistry(item_registry_file)
+            item_registry = ItemRegistry(item_registry_file, allocator = id_allocator)
         
         with open(f"{path}/entity_registry.json", encoding = "utf-8") as entity_registry_file:
             entity_registry_file = json.load(entity_registry_file)
-            entity_registry = EntityRegistry(entity_registry_file)
+            entity_registry = EntityRegistry(entity_registry_file, allocator = id_allocator)
+        
+        with open(f"{path}/world_state.json", encoding = "utf-8") as world_state_file:
+            reader = JSONStreamReader(world_state_file) #read one top level value at a time, the file's text is never held whole.
+            world_state_config = {key : reader.read_value() for key in reader.iter_object()}
         
-        with open(f"{path}/world_state.json", encoding = "utf-8") as world_state_config:
-            world_state_config = json.load(world_state_config)
+        random_streams = RandomStreams(**world_state_config["random_streams"]) if "random_streams" in world_state_config else None #saves from before seeding start from a new seed.
             
-        return {"world_state_config" : world_state_config, "item_registry" : item_registry, "entity_registry" : entity_registry}
+        return {"world_state_config" : world_state_config, "item_registry" : item_registry, "entity_registry" : entity_registry, "random_streams" : random_streams}
 
-    def _save_game(self, path : str, world_state : WorldState, item_registry : ItemRegistry, entity_registry : EntityRegistry) -> None:
+    def _save_game(self, path : str, world_state : WorldState, item_registry : ItemRegistry, entity_registry : EntityRegistry) -> str:
+        #returns the name of the save folder, recording it as the last save is left to the caller.
         verifier.verify_type(world_state, WorldState, "world_state")
         verifier.verify_type(item_registry, ItemRegistry, "item_registry")
         verifier.verify_type(entity_registry, EntityRegistry, "entity_registry")
@@ -1507,20 +1887,43 @@ class GameActions():
         save_folder_name = datetime.datetime.today().strftime("%Y%m%d%H%M%S%f")
         save_folder_path = f"{path}/{save_folder_name}"
         os.makedirs(f"{save_folder_path}/maps", exist_ok = False)
+        self._write_save_contents(folder_path = save_folder_path, world_state = world_state, item_registry = item_registry, entity_registry = entity_registry)
+        return save_folder_name
+    
+    def _write_save_contents(self, folder_path : str, world_state : WorldState, item_registry : ItemRegistry, entity_registry : EntityRegistry) -> None:
+        #folder_path already holds an empty maps folder. Partition workers write the maps they own into it themselves.
         for map_name, map_object in world_state.maps.items():
-            with open(f"{save_folder_path}/maps/{map_name}.json", "w", encoding = "utf-8") as map_file:
-                json.dump(map_object.to_dict(), map_file, indent = 4)
-        with open(f"{save_folder_path}/world_state.json", "w", encoding = "utf-8") as world_state_file:
-            json.dump(world_state.to_dict(), world_state_file, indent = 4)
-        with open(f"{save_folder_path}/item_registry.json", "w", encoding = "utf-8") as item_registry_file:
+            with open(f"{folder_path}/maps/{map_name}.json", "w", encoding = "utf-8") as map_file:
+                map_object.stream_to(JSONStreamWriter(map_file))
+        if self.partitions is not None:
+            world_state.last_simulated.update(self.partitions.write_maps(folder_path = folder_path))
+        with open(f"{folder_path}/world_state.json", "w", encoding = "utf-8") as world_state_file:
+            world_state.stream_to(JSONStreamWriter(world_state_file))
+        with open(f"{folder_path}/item_registry.json", "w", encoding = "utf-8") as item_registry_file:
             json.dump(item_registry.to_dict(), item_registry_file)
-        with open(f"{save_folder_path}/entity_registry.json", "w", encoding = "utf-8") as entity_registry_file:
+        with open(f"{folder_path}/entity_registry.json", "w", encoding = "utf-8") as entity_registry_file:
             json.dump(entity_registry.to_dict(), entity_registry_file)
-        with open(f"settings.json", "r", encoding = "utf-8") as settings_file:
-            settings_data = json.load(settings_file)
-            settings_data["last_save"] = save_folder_name
-        with open(f"settings.json", "w", encoding = "utf-8") as settings_file:
-            json.dump(settings_data, settings_file, indent = 4)
+    
+    def _snapshot_save_contents(self, folder_path : str, world_state : WorldState, item_registry : ItemRegistry, entity_registry : EntityRegistry) -> dict[str, bytes]:
+        #same files as _write_save_contents, as relative path -> pickled to_dict. Pickles are far smaller than the dicts they hold and can not change with the live world, they are only turned into json on the background writer. Partition workers still write the maps they own into folder_path themselves.
+        snapshot = {}
+        for map_name, map_object in world_state.maps.items():
+            snapshot[f"maps/{map_name}.json"] = pickle.dumps(map_object.to_dict(), protocol = pickle.HIGHEST_PROTOCOL)
+        if self.partitions is not None:
+            world_state.last_simulated.update(self.partitions.write_maps(folder_path = folder_path))
+        snapshot["world_state.json"] = pickle.dumps(world_state.to_dict(), protocol = pickle.HIGHEST_PROTOCOL)
+        snapshot["item_registry.json"] = pickle.dumps(item_registry.to_dict(), protocol = pickle.HIGHEST_PROTOCOL)
+        snapshot["entity_registry.json"] = pickle.dumps(entity_registry.to_dict(), protocol = pickle.HIGHEST_PROTOCOL)
+        return snapshot
+    
+    def _record_last_save(self, save_folder_name : str) -> None:
+        with self.settings_lock:
+            with open(f"settings.json", "r", encoding = "utf-8") as settings_file:
+                settings_data = json.load(settings_file)
+                settings_data["last_save"] = save_folder_name
+            with open(f"settings.json", "w", encoding = "utf-8") as settings_file:
+                json.dump(settings_data, settings_file, indent = 4)
+            self.settings["last_save"] = save_folder_name
 
     def load_player(self, player_data : dict) -> Player:
         player : Player = self.entity_loader.load_entity(entity_data = player_data)
@@ -1552,24 +1955,59 @@ class GameActions():
         for tick_to_remove in to_remove:
             self.game_engine.tick_based_queue.pop(tick_to_remove)
     
-    def refresh_trader_inventories(self) -> None:
-        current_world_time = self.world_state.world_time.to_world_timestamp().get_time_id()
-        for entity in self.game_engine.current_location.entities.values():
-            if "Merchant" in entity.tags:
-                if hasattr(entity, "trading_tables"):
-                    for table in entity.trading_tables:
-                        if table["last_rolled"] is None or (current_world_time - table["last_rolled"]) >= 1440:
-                            items = self.table_resolver.resolve_static_by_name(table_name = table["table_name"])
-                            entity.inventory.clear()
-                            entity.inventory.money.clear()
-                            for item in items:
-                                if isinstance(item, Item):
-                                    entity.inventory.add_item(item)
-                                elif isinstance(item, Stack):
-                                    entity.inventory.add_stack(stack = item)
-                                else:
-                                    entity.inventory.money.add(item)
-                            table["last_rolled"] = current_world_time
+    def queue_restock_if_merchant(self, entity : Entity, sublocation_path : str) -> None:
+        if "Merchant" in entity.tags and getattr(entity, "trading_tables", None):
+            self.pending_restocks.add(sublocation_path.strip())
+    
+    def queue_map_restocks(self, game_map : Map) -> None:
+        for location_name, location in game_map.locations.items():
+            for sub_location_name, sub_location in location.sub_locations.resident_items(): #the rest are queued once they are parsed.
+                for entity in sub_location.entities.with_tag("Merchant"):
+                    self.queue_restock_if_merchant(entity = entity, sublocation_path = f"{game_map.name}/{location_name}/{sub_location_name}")
+    
+    def queue_restock(self, sublocation : str) -> None:
+        #fired by the timed scheduler once a restock period is over. Merchants around the player restock right away, the rest on their sublocation's next access.
+        sublocation = sublocation.strip()
+        self.pending_restocks.add(sublocation)
+        if sublocation == self.world_state.player.location.strip():
+            self.get_sublocation_from_path(sublocation)
+    
+    def restock_merchants(self, sublocation_path : str, sublocation : SubLocation) -> None:
+        #restocks every merchant in the sublocation whose restock is due and schedules the sublocation's next restock, merchants cost nothing in between.
+        self.pending_restocks.discard(sublocation_path)
+        current_time = self.world_state.world_time.to_world_timestamp()
+        current_time_id = current_time.get_time_id()
+        next_restock_time = current_time + self.RESTOCK_PERIOD
+        due_merchants = []
+        for entity in sublocation.entities.with_tag("Merchant"):
+            if not getattr(entity, "trading_tables", None):
+                continue
+            if not any(table.get("next_restock") is None or current_time_id >= table["next_restock"] for table in entity.trading_tables):
+                continue
+            due_merchants.append(entity)
+        table_counts = {}
+        for entity in due_merchants:
+            for table in entity.trading_tables:
+                table_counts[table["table_name"]] = table_counts.get(table["table_name"], 0) + 1
+        table_rolls = {table_name : iter(self.table_resolver.roll_many_by_name(table_type = "static", table_name = table_name, n = count)) for table_name, count in table_counts.items()} #one batch per table for all due merchants.
+        for entity in due_merchants:
+            entity.inventory.clear()
+            entity.inventory.money.clear()
+            for table in entity.trading_tables:
+                for item in next(table_rolls[table["table_name"]]):
+                    if isinstance(item, Item):
+                        entity.inventory.add_item(item)
+                    elif isinstance(item, Stack):
+                        entity.inventory.add_stack(stack = item)
+                    else:
+                        entity.inventory.money.add(item)
+                table["last_rolled"] = current_time_id
+                table["next_restock"] = next_restock_time.get_time_id()
+            if self.economy is not None and getattr(entity, "trader_profile", None) is not None:
+                self.economy.restocked(entity)
+        restocked = bool(due_merchants)
+        if restocked:
+            self.world_state.timed_scheduler.schedule(command = TimeScheduledCommand(execution_time = next_restock_time, actions = [{"type" : "restock_merchants", "args" : {"sublocation" : sublocation_path}}, ]))
                             
 class GameEngine():
     def __init__(self, ui_engine : UIEngine):
@@ -1584,9 +2022,11 @@ class GameEngine():
         self.current_interaction : InteractionContext | None = None
         self.trade_session : TradeSession | None = None
         self.last_save_time : datetime.datetime = None
+        self.autosave_manager : AutosaveManager | None = None
         self.temp_entity_id_to_entity_mapping : dict[str, Entity] | None = None
         self.current_location : SubLocation = None
         self.current_player_inventory_mapping : dict[str, dict[str, Item] | dict[str, Stack]] = None
+        self.player_inventory_listing : InventoryListing | None = None
         self.tick_based_queue : dict[int, list[dict]] = {}
         self.USER_INPUT_HANDLER_MAPPING = {
             "mainmenu" : self.game_actions.process_mainmenu_player_input,
@@ -1617,8 +2057,25 @@ class GameEngine():
             pass
         else:
             self.game_actions.world_state.timed_scheduler.add_pending_to_command_queue(self.game_actions.world_state.world_time.to_world_timestamp(), self.game_actions.command_queue)
-            self.game_actions.refresh_trader_inventories()
+            self.game_actions.update_simulation()
+            self.game_actions.update_stat_tables()
+    
+    def process_autosave(self) -> None:
+        if self.autosave_manager is None or not self.state in {"game", "interaction"}:
+            return #pending requests wait until combat or trade is over.
+        world_ticks = self.game_actions.world_state.world_time.get_total_ticks()
+        self.autosave_manager.check_intervals(world_ticks = world_ticks)
+        if self.autosave_manager.is_due(last_save_time = self.last_save_time):
+            self.game_actions.autosave(reasons = self.autosave_manager.take_reasons(world_ticks = world_ticks))
             
+    def process_residency(self) -> None:
+        if self.state == "game": #combat, trade and interactions hold on to entities of the current sublocation.
+            self.game_actions.update_residency()
+    
+    def process_partitions(self) -> None:
+        if not self.state == "mainmenu":
+            self.game_actions.update_partitions()
+    
     def process_location_events(self) -> None:
         if self.state == "game":
             self.game_actions.process_sublocation_events()
@@ -1664,6 +2121,7 @@ class GameEngine():
     def mainloop(self):
         self.game_actions.game_engine = self
         self.game_actions.load_settings_file()
+        self.autosave_manager = AutosaveManager(policy = self.game_actions.autosave_policy, writer = BackgroundSaveWriter())
         self.game_actions.output("New Game\nContinue\nLoad Game\nExit", "system")
         self.tick = 0
         while self.running:
@@ -1675,8 +2133,14 @@ class GameEngine():
             self.process_time_based_events()
             self.process_location_events()
             self.update_quests()
+            self.process_autosave()
+            self.process_residency()
+            self.process_partitions()
             self.update_game_ui()
             self.tick += 1
+        self.autosave_manager.writer.stop()
+        self.game_actions.stop_partitions()
+        self.game_actions.stop_residency()
         self.ui_engine.stop()
     
     def run(self):
@@ -1,32 +1,42 @@
 import os
+import math
 import json
 import random
-from typing import TYPE_CHECKING
+from typing import Callable, TYPE_CHECKING
 
 from GeneralVerifier import verifier
 from Items import Item, Stack, ItemsSpawner
 from Inventory import Inventory
-from Cultivation import Cultivation, CultivationCreator
+from Cultivation import Cultivation, PhysicalCultivation, CultivationCreator
 from Stats import Stats, CombatStats, OtherStats, BasicStatCalculator
 from Skills import SkillState
 from Loadout import Loadout
 from TableLoader import TableResolver
 from Money import Money
 from NameLoader import NamesLoader
-from Dialogue import Interaction, DialogueLoader, InteractionLoader
+from Dialogue import DialogueLoader, InteractionLoader
 from Trade import TraderProfile
 from Packets import DamagePacket
 from Techniques import Technique, TechniqueLoader
+from JSONStream import JSONStreamWriter
+from Schema import Schema, VALUE, OBJECT, STREAM, NAMES
+from Identifiers import IdAllocator, TagList, intern_string, intern_strings
 
 if TYPE_CHECKING:
     from Quests import QuestManager
+    from StatTable import StatTable
 
 class Entity():
+    __slots__ = ("name", "id", "cultivation", "stats", "_hp", "_stamina", "inventory", "description", "_is_alive", "_tags", "_stat_table", "_stat_row", "__weakref__") #weak references let an evicted sublocation hand its entities back on restore.
+    SCHEMA = Schema((("name", VALUE), ("id", VALUE), ("cultivation", OBJECT), ("stats", OBJECT), ("hp", VALUE), ("stamina", VALUE), ("inventory", STREAM), ("description", VALUE), ("is_alive", VALUE), ("tags", VALUE)), omit_none = True) #subclasses extend it with their own slots.
+    
     def __init__(self, name : str, id : str, cultivation : Cultivation, stats : Stats, hp : int | float, stamina : int | float, description : str = "You don't quite grasp what you are looking at."):
         self.name = verifier.verify_type(name, str, "name")
         self.id : str = verifier.verify_type(id, str, "id")
         self.cultivation : Cultivation = verifier.verify_type(cultivation, Cultivation, "cultivation")
         self.stats : Stats = verifier.verify_type(stats, Stats, "stats")
+        self._stat_table : StatTable | None = None #set by StatTable.attach, hp, stamina, is_alive and stats then live in the table's arrays.
+        self._stat_row : int | None = None
         self.hp = verifier.verify_non_negative(hp, "hp")
         self.stamina = verifier.verify_non_negative(stamina, "stamina")
         self.inventory = Inventory(50)
@@ -34,20 +44,73 @@ class Entity():
         self.is_alive = True
         self.tags = []
     
+    @property
+    def hp(self) -> int | float:
+        if self._stat_table is None:
+            return self._hp
+        return self._stat_table.get(self._stat_row, "hp")
+    
+    @hp.setter
+    def hp(self, hp : int | float) -> None:
+        if self._stat_table is None:
+            self._hp = hp
+        else:
+            self._stat_table.set(self._stat_row, "hp", hp)
+    
+    @property
+    def stamina(self) -> int | float:
+        if self._stat_table is None:
+            return self._stamina
+        return self._stat_table.get(self._stat_row, "stamina")
+    
+    @stamina.setter
+    def stamina(self, stamina : int | float) -> None:
+        if self._stat_table is None:
+            self._stamina = stamina
+        else:
+            self._stat_table.set(self._stat_row, "stamina", stamina)
+    
+    @property
+    def is_alive(self) -> bool:
+        if self._stat_table is None:
+            return self._is_alive
+        return bool(self._stat_table.alive[self._stat_row])
+    
+    @is_alive.setter
+    def is_alive(self, is_alive : bool) -> None:
+        if self._stat_table is None:
+            self._is_alive = is_alive
+        else:
+            self._stat_table.alive[self._stat_row] = is_alive
+    
+    @property
+    def tags(self) -> TagList:
+        return self._tags
+    
+    @tags.setter
+    def tags(self, tags : list[str]) -> None:
+        #sublocations index their entities by tag when they are added, tags are expected to be settled by then.
+        self._tags = tags if isinstance(tags, TagList) else TagList(verifier.verify_type(tags, list, "tags"))
+    
+    def regenerate(self, ticks : int, hp_per_tick : int, stamina_per_tick : int) -> None:
+        #whole points per world tick up to the entity's maximum, values already above it are left alone. Entities in a stat table are regenerated with their whole table by StatTable.regenerate.
+        if not self.is_alive:
+            return
+        for attribute, per_tick in (("hp", hp_per_tick), ("stamina", stamina_per_tick)):
+            maximum = BasicStatCalculator.get(self.stats, attribute)
+            current = getattr(self, attribute)
+            if per_tick and current < maximum:
+                setattr(self, attribute, max(current, math.floor(min(maximum, current + (per_tick * ticks)))))
+    
     def to_dict(self) -> dict:
-        entity_data = {"entity_type" : type(self).__name__}
-        for entity_attribute in sorted(vars(self)):
-            attribute = getattr(self, entity_attribute)
-            if isinstance(attribute, (int, str, float, bool, dict, list)):
-                data = attribute
-            elif hasattr(attribute, "to_dict"):
-                    data = attribute.to_dict()
-            elif entity_attribute == "techniques":
-                data = [technique.name for technique in attribute]
-            else:
-                continue
-            entity_data[entity_attribute] = data
-        return entity_data
+        return self.SCHEMA.encode(self, {"entity_type" : type(self).__name__})
+    
+    def stream_to(self, writer : JSONStreamWriter) -> None:
+        #same layout as to_dict but nested objects that can stream themselves (inventory) are written directly to the writer.
+        writer.begin_object()
+        writer.item("entity_type", type(self).__name__)
+        self.SCHEMA.stream(self, writer)
+        writer.end_object()
     
     def __str__(self) -> str:
         return str(self.to_dict())
@@ -61,11 +124,17 @@ class Entity():
         return DamagePacket(crush = self.stats.combat_stats.strength)
 
 class Beast(Entity):
+    __slots__ = ()
+    SCHEMA = Entity.SCHEMA
+    
     def __init__(self, name : str, id : str, cultivation : Cultivation, hp : int | float, stamina : int | float, stats : Stats, description : str = "A beast."):
         super().__init__(name = name, id = id, cultivation = cultivation, hp = hp, stamina = stamina, stats = stats, description = description)
         self.tags = ["Beast", ]
 
 class Human(Entity):
+    __slots__ = ("loadout", "techniques")
+    SCHEMA = Entity.SCHEMA.extend((("loadout", OBJECT), ("techniques", NAMES)))
+    
     def __init__(self, name : str, id : str, cultivation : Cultivation, hp : int | float, stamina : int | float, stats : Stats, description : str = "An ordinary looking person."):
         super().__init__(name = name, id = id, cultivation = cultivation, hp = hp, stamina = stamina, stats = stats, description = description)
         self.loadout = Loadout()
@@ -91,18 +160,27 @@ class Human(Entity):
             return DamagePacket(**{damage_type : (damage_amount + damage_distribution[damage_type] * self.stats.combat_stats.strength) for damage_type, damage_amount in damage.items()})
 
 class GeneralHuman(Human):
+    __slots__ = ("interaction", )
+    SCHEMA = Human.SCHEMA.extend((("interaction", VALUE), ))
+    
     def __init__(self, name : str, id : str, cultivation : Cultivation, hp : int | float, stamina : int | float, stats : Stats, description : str = "An ordinary looking person."):
         super().__init__(name = name, id = id, cultivation = cultivation, hp = hp, stamina = stamina, stats = stats, description = description)
         self.tags.append("GeneralHuman")
         self.interaction = None
 
 class Bandit(Human):
+    __slots__ = ("interaction", )
+    SCHEMA = Human.SCHEMA.extend((("interaction", VALUE), ))
+    
     def __init__(self, name : str, id : str, cultivation : Cultivation, hp : int | float, stamina : int | float, stats : Stats, description : str = "A Bandit."):
         super().__init__(name = name, id = id, cultivation = cultivation, hp = hp, stamina = stamina, stats = stats, description = description)
         self.tags.append("Bandit")
         self.interaction = None
 
 class Narrator(Human):
+    __slots__ = ("interaction", )
+    SCHEMA = Human.SCHEMA.extend((("interaction", VALUE), ))
+    
     def __init__(self, name : str, id : str, cultivation : Cultivation, hp : int | float, stamina : int | float, stats : Stats, description : str = "A Bandit."):
         super().__init__(name = name, id = id, cultivation = cultivation, hp = hp, stamina = stamina, stats = stats, description = description)
         self.tags.append("Narrator")
@@ -110,6 +188,9 @@ class Narrator(Human):
         self.interaction = None
 
 class Merchant(Bandit):
+    __slots__ = ("trading_tables", "trader_profile")
+    SCHEMA = Bandit.SCHEMA.extend((("trading_tables", VALUE), ("trader_profile", OBJECT)))
+    
     def __init__(self, name : str, id : str, cultivation : Cultivation, hp : int | float, stamina : int | float, stats : Stats, description : str = "A Merchant."):
         super().__init__(name = name, id = id, cultivation = cultivation, hp = hp, stamina = stamina, stats = stats, description = description)
         self.tags.remove("Bandit") #This is a joke btw, that merchants are just licenced bandits.
@@ -119,12 +200,18 @@ class Merchant(Bandit):
         self.trader_profile : TraderProfile = None
 
 class Guard(Human):
+    __slots__ = ("interaction", )
+    SCHEMA = Human.SCHEMA.extend((("interaction", VALUE), ))
+    
     def __init__(self, name : str, id : str, cultivation : Cultivation, hp : int | float, stamina : int | float, stats : Stats, description : str = "A Guard."):
         super().__init__(name = name, id = id, cultivation = cultivation, hp = hp, stamina = stamina, stats = stats, description = description)
         self.tags.append("Guard")
         self.interaction = None
 
 class Player(Human):
+    __slots__ = ("skills", "quest_manager", "location")
+    SCHEMA = Human.SCHEMA.extend((("skills", OBJECT), ("quest_manager", OBJECT), ("location", VALUE)))
+    
     def __init__(self, name : str, id : str, cultivation : Cultivation, hp : int | float, stamina : int | float, stats : Stats, description : str = "You."):
         super().__init__(name = name, id = id, cultivation = cultivation, hp = hp, stamina = stamina, stats = stats, description = description)
         self.skills = SkillState()
@@ -133,32 +220,52 @@ class Player(Human):
         self.location : str = None
         
 class EntityRegistry():
-    def __init__(self, registry : dict[str, int] | None = None):
-        self.registry = verifier.verify_type(registry, dict, "registry", True) or {}
+    #entity ids are handed out by the IdAllocator, which may be shared with the ItemRegistry.
+    def __init__(self, registry : dict[str, int] | None = None, allocator : IdAllocator | None = None):
+        self.allocator = verifier.verify_type(allocator, IdAllocator, "allocator", True) or IdAllocator()
+        registry = verifier.verify_type(registry, dict, "registry", True) or {}
+        #registries saved before ids were allocated hold per entity type counts instead, their "type_number" ids can never collide with allocated ones.
+        self.allocator.set_count("entity", registry.get("entity", 0))
     
-    def add_count(self, entity_type : str) -> None:
-        verifier.verify_type(entity_type, str, "entity_type")
-        if entity_type in self.registry:
-            self.registry[entity_type] += 1
-        else:
-            self.registry[entity_type] = 1
+    def reserve_ids(self, amount : int = 1) -> list[str]:
+        return self.allocator.make_ids("entity", amount)
     
-    def get_count(self, entity_type : str) -> int:
-        verifier.verify_type(entity_type, str, "entity_type")
-        if not entity_type in self.registry:
-            return 0
-        else:
-            return self.registry[entity_type]
+    def get_count(self) -> int:
+        return self.allocator.get_count("entity")
 
     def to_dict(self) -> dict[str, int]:
-        return dict(self.registry)
+        return {"entity" : self.allocator.get_count("entity")}
+
+class EntityTemplate():
+    #an entity template compiled once by EntityLoader.initialize_entities so spawning never walks the raw json again.
+    def __init__(self, entity_type : str, name : str, entity_class : type, description : str):
+        self.entity_type = verifier.verify_type(entity_type, str, "entity_type")
+        self.name = verifier.verify_type(name, str, "name")
+        self.entity_class = entity_class
+        self.description = verifier.verify_type(description, str, "description")
+        self.cultivation_tables : dict[str, tuple[list[str], list[int | float]]] = {} #cultivation type -> (stages, cumulative weights)
+        self.fixed_cultivation : dict[str, str] = {}
+        self.combat_stat_distribution : dict[str, int | float] = {}
+        self.other_stat_values : dict[str, int] = {}
+        self.stat_modifiers : list[tuple[str, str, str, int | float]] = [] #(stat type, modifier type, stat, value)
+        self.stats_by_physical_stage : dict[str, tuple[dict[str, int], int | float, int | float]] = {} #filled lazily, physical stage -> (combat stats, hp, stamina)
+        self.inventory_tables : list[tuple[str, str]] = [] #table type and table name, rolled for a whole spawn batch at once.
+        self.inventory_items : list[tuple[Callable[[dict], Item | Stack], dict]] = []
+        self.loadout : dict[str, str | dict] = {}
+        self.interaction : str | None = None
+        self.tags : list[str] = []
+        self.trader_profile : dict | None = None
+        self.techniques : list[Technique] = []
+        self.trading_tables : list[str] = []
     
 class EntityLoader():
     
     MAPPING = {"GeneralHuman" : GeneralHuman, "Bandit" : Bandit, "Merchant" : Merchant, "Guard" : Guard, "Player" : Player, "Narrator" : Narrator}
     DEFAULT_INTERACTIONS_MAPPING = {"GeneralHuman" : "default_general_human_interaction", "Bandit" : "default_bandit_interaction", "Merchant" : "default_merchant_interaction", "Guard" : "default_guard_interaction"}
+    DEFAULT_TRADER_PROFILE = {"accepted_currencies" : ["__any__", ], "price_multiplier" : 1.0, "accepted_item_tags" : ["__any__", ]}
+    CONSTRUCTOR_ARGUMENTS = ("name", "id", "cultivation", "stats", "hp", "stamina", "description")
     
-    def __init__(self, name_loader : NamesLoader, entity_registry : EntityRegistry, cultivation_creator : CultivationCreator, basic_stat_calculator : BasicStatCalculator, item_spawner : ItemsSpawner, table_resolver : TableResolver, interaction_loader : InteractionLoader, dialogue_loader : DialogueLoader, technique_loader : TechniqueLoader):
+    def __init__(self, name_loader : NamesLoader, entity_registry : EntityRegistry, cultivation_creator : CultivationCreator, basic_stat_calculator : BasicStatCalculator, item_spawner : ItemsSpawner, table_resolver : TableResolver, interaction_loader : InteractionLoader, dialogue_loader : DialogueLoader, technique_loader : TechniqueLoader, rng : random.Random | None = None):
         verifier.verify_type(name_loader, NamesLoader, "name_loader")
         verifier.verify_type(cultivation_creator, CultivationCreator, "cultivation_creator")
         verifier.verify_type(basic_stat_calculator, BasicStatCalculator, "basic_stat_calculator")
@@ -177,16 +284,26 @@ class EntityLoader():
         self.interaction_loader = interaction_loader
         self.dialogue_loader = dialogue_loader
         self.technique_loader = technique_loader
+        self.rng = random.Random() if rng is None else verifier.verify_type(rng, random.Random, "rng") #cultivation stage rolls.
         self.CULTIVATION_REGISTRY = {"physical" : self.cultivation_creator.registry.physical_defs,
                                      "qi" : self.cultivation_creator.registry.qi_defs,
                                      "soul" : self.cultivation_creator.registry.soul_defs,
                                      "essence" : self.cultivation_creator.registry.essence_defs}
+        #one decoder per entity type generated from its schema, loadout needs the loaded inventory and is resolved afterwards. Player skills and quests are loaded by the engine.
+        converters = {"cultivation" : self.cultivation_creator.load_cultivation,
+                      "stats" : self.load_stats,
+                      "inventory" : self.load_inventory,
+                      "techniques" : self.get_techniques,
+                      "trading_tables" : lambda trading_tables : verifier.verify_type(trading_tables, list, "trading_tables"),
+                      "trader_profile" : lambda trader_profile : TraderProfile(**trader_profile)}
+        self.ENTITY_DECODERS = {entity_type : entity_class.SCHEMA.compile_decoder({field_name : converter for field_name, converter in converters.items() if field_name in entity_class.SCHEMA.names}) for entity_type, entity_class in self.MAPPING.items()}
 
     def initialize_entities(self, path : str ) -> None:
         path = verifier.verify_is_dir(path, "path")
         configs = os.listdir(path)
         
         registry = {}
+        templates = {}
         
         print("[EntitySystem] Initializing entities...")
         
@@ -203,6 +320,7 @@ class EntityLoader():
                 
                 if not entity_type in registry:
                     registry[entity_type] = {}
+                    templates[entity_type] = {}
 
                 for template in config["templates"].keys():
                     if template in registry[entity_type]:
@@ -211,56 +329,92 @@ class EntityLoader():
                         if not necessary_key in config["templates"][template]:
                             raise KeyError(f"Entity : \"{template}\" is expected to have key \"{necessary_key}\".")
                     registry[entity_type][template] = config["templates"][template]
+                    templates[entity_type][template] = self.compile_template(entity_type = entity_type, template_name = template, template = config["templates"][template])
         self.registry = registry
+        self.templates = templates
 
-    def spawn_cultivation_from_weights(self, cultivation_weights : dict) -> Cultivation:
-        verifier.verify_type(cultivation_weights, dict, "cultivation_weights")
-        cultivation_spawning_dict = {}
+    def compile_template(self, entity_type : str, template_name : str, template : dict) -> EntityTemplate:
+        verifier.verify_type(template, dict, "template")
+        entity_class = EntityLoader.MAPPING[entity_type]
+        compiled = EntityTemplate(entity_type = intern_string(entity_type), name = template_name, entity_class = entity_class, description = template["description"])
+        
         for cultivation_type in ["physical", "qi", "soul", "essence"]:
-            if cultivation_type in cultivation_weights:
-                total_weight = sum(cultivation_weights[cultivation_type].values())
-                chosen_cultivation_weight = random.randint(1, total_weight)
-                current_weight = 0
-                for cultivation_stage_key in cultivation_weights[cultivation_type].keys():
-                    current_weight += cultivation_weights[cultivation_type][cultivation_stage_key]
-                    if current_weight >= chosen_cultivation_weight:
-                        chosen_cultivation = self.CULTIVATION_REGISTRY[cultivation_type]["meta"]["order"][int(cultivation_stage_key)]
-                        cultivation_spawning_dict[cultivation_type] = chosen_cultivation
-                        break
-            else:
-                cultivation_spawning_dict[cultivation_type] = self.CULTIVATION_REGISTRY[cultivation_type]["meta"]["order"][0]
-                
-        entity_cultivation = self.cultivation_creator.spawn_cultivation(cultivation_spawning_dict)
-        return entity_cultivation
-    
-    def spawn_stats_from_weights(self, stat_points : int, stats_weights : dict) -> Stats:
-        verifier.verify_positive(stat_points, "stat_points")
-        verifier.verify_type(stats_weights, dict, "stats_weights")
+            stage_order = self.CULTIVATION_REGISTRY[cultivation_type]["meta"]["order"]
+            if not cultivation_type in template["cultivation"]:
+                compiled.fixed_cultivation[cultivation_type] = stage_order[0]
+                continue
+            stages = []
+            cumulative_weights = []
+            total_weight = 0
+            for cultivation_stage_key, weight in template["cultivation"][cultivation_type].items():
+                total_weight += verifier.verify_non_negative(weight, "weight")
+                stages.append(stage_order[int(cultivation_stage_key)])
+                cumulative_weights.append(total_weight)
+            if total_weight <= 0:
+                raise ValueError(f"Entity template \"{template_name}\" has no positive weight for \"{cultivation_type}\" cultivation.")
+            compiled.cultivation_tables[cultivation_type] = (stages, cumulative_weights)
+        
+        stats_weights = verifier.verify_type(template["stats"], dict, "stats")
         if sum(list(stats_weights["base_stats"]["combat_stats"].values())) > 1:
             raise RuntimeError(f"Entity template \"{stats_weights}\" stats distribution exceeds 100%.")
-        combat_stats = CombatStats()
-        other_stats = OtherStats()
-        MAPPING = {"combat_stats" : combat_stats, "other_stats" : other_stats}
-        for stat_type in ["combat_stats", "other_stats"]:
-            for stat_key in stats_weights["base_stats"][stat_type].keys():
-                stat_distribution = stats_weights["base_stats"][stat_type][stat_key]
-                verifier.verify_non_negative(stat_distribution, "stat_distribution")
-                if stat_type == "combat_stats":
-                    stat_points_to_allocate = int(stat_points * stat_distribution)
-                else:
-                    stat_points_to_allocate = int(stat_distribution)
-                setattr(MAPPING[stat_type], stat_key, stat_points_to_allocate)
+        for stat_key, stat_distribution in stats_weights["base_stats"]["combat_stats"].items():
+            compiled.combat_stat_distribution[stat_key] = verifier.verify_non_negative(stat_distribution, "stat_distribution")
+        for stat_key, stat_distribution in stats_weights["base_stats"]["other_stats"].items():
+            compiled.other_stat_values[stat_key] = int(verifier.verify_non_negative(stat_distribution, "stat_distribution"))
+        modifiers = stats_weights.get("modifiers", {})
+        for modifier_class in ["combat_stats", "other_stats"]:
+            for modifier_type in ["mult", "add"]:
+                for modifier_key, modifier_value in modifiers.get(modifier_class, {}).get(modifier_type, {}).items():
+                    compiled.stat_modifiers.append((modifier_class, modifier_type, modifier_key, modifier_value))
+        
+        compiled.inventory_tables, compiled.inventory_items = self.compile_inventory(template["inventory"])
+        compiled.loadout = verifier.verify_type(template.get("loadout", {}), dict, "loadout")
+        
+        if "interaction" in entity_class.SCHEMA.names:
+            if "interaction" in template:
+                compiled.interaction = template["interaction"]
+            elif entity_type in EntityLoader.DEFAULT_INTERACTIONS_MAPPING:
+                compiled.interaction = EntityLoader.DEFAULT_INTERACTIONS_MAPPING[entity_type]
+            else:
+                raise KeyError(f"Entity class \"{entity_type}\" is expected to have an interaction but wasn't assigned.")
         
-        if "modifiers" in stats_weights:
-            for modifier_class in ["combat_stats", "other_stats"]:
-                if modifier_class in stats_weights["modifiers"]:
-                    for modifier_type in ["mult", "add"]:
-                        if modifier_type in stats_weights["modifiers"][modifier_class]:
-                            for modifier_key in stats_weights[modifier_class][modifier_type]:
-                                MAPPING[modifier_class][modifier_type][modifier_key] = stats_weights["modifiers"][modifier_class][modifier_type][modifier_key]
-                        
-        entity_stats = Stats(combat_stats = combat_stats, other_stats = other_stats)
-        return entity_stats
+        compiled.tags = intern_strings(verifier.verify_type(template.get("tags", []), list, "tags"))
+        if "trader_profile" in entity_class.SCHEMA.names:
+            compiled.trader_profile = verifier.verify_type(template.get("trader_profile", EntityLoader.DEFAULT_TRADER_PROFILE), dict, "trader_profile")
+            TraderProfile(**compiled.trader_profile) #a broken profile fails here instead of on every spawn.
+        if "techniques" in entity_class.SCHEMA.names and "techniques" in template:
+            compiled.techniques = self.get_techniques(template["techniques"])
+        if "trading_tables" in entity_class.SCHEMA.names and "trading_tables" in template:
+            compiled.trading_tables = verifier.verify_type(template["trading_tables"], list, "trading_tables")
+        return compiled
+    
+    def get_template(self, entity_type : str, entity_template_name : str) -> EntityTemplate:
+        if not hasattr(self, "templates"):
+            raise ValueError("Entities not yet initialized.")
+        entity_type = verifier.verify_type(entity_type, str, "entity_type")
+        entity_template_name = verifier.verify_type(entity_template_name, str, "entity_template_name")
+        if not entity_type in self.templates:
+            raise KeyError(f"There is no such entity type as \"{entity_type}\" in the loader.")
+        if not entity_template_name in self.templates[entity_type]:
+            raise KeyError(f"There is no such entity template by the name of {entity_template_name} in the loader.")
+        return self.templates[entity_type][entity_template_name]
+    
+    def _build_stats(self, template : EntityTemplate, combat_stat_values : dict[str, int]) -> Stats:
+        combat_stats = CombatStats(**combat_stat_values)
+        other_stats = OtherStats(**template.other_stat_values)
+        MAPPING = {"combat_stats" : combat_stats, "other_stats" : other_stats}
+        for modifier_class, modifier_type, modifier_key, modifier_value in template.stat_modifiers:
+            MAPPING[modifier_class].modifiers[modifier_type][modifier_key] = modifier_value
+        return Stats(combat_stats = combat_stats, other_stats = other_stats)
+    
+    def _get_stage_stats(self, template : EntityTemplate, physical_cultivation : PhysicalCultivation) -> tuple[dict[str, int], int | float, int | float]:
+        #stat points only depend on the physical stage, so stats, hp and stamina are computed once per stage.
+        if not physical_cultivation.stage in template.stats_by_physical_stage:
+            stat_points = verifier.verify_positive(physical_cultivation.stat_points, "stat_points")
+            combat_stat_values = {stat_key : int(stat_points * stat_distribution) for stat_key, stat_distribution in template.combat_stat_distribution.items()}
+            stats = self._build_stats(template = template, combat_stat_values = combat_stat_values)
+            template.stats_by_physical_stage[physical_cultivation.stage] = (combat_stat_values, self.basic_stat_calculator.get(stats = stats, stat = "hp"), self.basic_stat_calculator.get(stats = stats, stat = "stamina"))
+        return template.stats_by_physical_stage[physical_cultivation.stage]
     
     def load_stats(self, stats_data : dict) -> Stats:
         verifier.verify_type(stats_data, dict, "stats_data")
@@ -276,24 +430,32 @@ class EntityLoader():
         stats = Stats(combat_stats = combat_stats, other_stats = other_stats)
         return stats
     
-    def resolve_inventory(self, inventory_data : dict) -> Inventory:
+    def compile_inventory(self, inventory_data : dict) -> tuple[list[tuple[str, str]], list[tuple[Callable[[dict], Item | Stack], dict]]]:
         verifier.verify_type(inventory_data, dict, "inventory_data")
+        tables = []
         items = []
-        MAPPING = {"static" : self.table_resolver.resolve_static_by_name, "dynamic" : self.table_resolver.resolve_dynamic_by_name}
         HANDLER = {"instanced" : self.item_spawner.spawn_new_item_from_dict, "stacked" : self.item_spawner.spawn_new_stack_from_dict}
         if "tables" in inventory_data:
             for table_type in ["static", "dynamic"]:
                 if table_type in inventory_data["tables"]:
                     for table_name in inventory_data["tables"][table_type]:
-                        items.extend(MAPPING[table_type](table_name))
+                        tables.append((table_type, table_name))
         
         for loading_type in ["instanced", "stacked"]:
             if loading_type in inventory_data:
                 for item_data in inventory_data[loading_type]:
-                    items.append(HANDLER[loading_type](item_data))
+                    items.append((HANDLER[loading_type], item_data))
+        return tables, items
+    
+    def build_inventory(self, rolled_tables : list[list[Item | Stack | Money]], items : list[tuple[Callable[[dict], Item | Stack], dict]]) -> Inventory:
+        resolved_items = []
+        for rolled in rolled_tables:
+            resolved_items.extend(rolled)
+        for handler, item_data in items:
+            resolved_items.append(handler(item_data))
         
         inventory = Inventory(float("inf"))
-        for item in items:
+        for item in resolved_items:
             if isinstance(item, Item):
                 inventory.add_item(item)
                 continue
@@ -304,40 +466,42 @@ class EntityLoader():
                 if inventory.money.is_empty():
                     inventory.money = item
                 else:
-                    inventory.money.add(item, delete_other = True)
+                    inventory.money.add(item, clear_other = True)
         inventory.shrink_to_fit()
         
         return inventory
     
+    def roll_tables(self, tables : list[tuple[str, str]]) -> list[list[Item | Stack | Money]]:
+        return [self.table_resolver.roll_many_by_name(table_type = table_type, table_name = table_name, n = 1)[0] for table_type, table_name in tables]
+    
+    def resolve_inventory(self, inventory_data : dict) -> Inventory:
+        tables, items = self.compile_inventory(inventory_data)
+        return self.build_inventory(rolled_tables = self.roll_tables(tables), items = items)
+    
+    def load_inventory(self, inventory_data : dict) -> Inventory:
+        #saved instanced items carry their id and current attributes in meta/data, template ones only name the item.
+        tables, items = self.compile_inventory(inventory_data)
+        items = [(self.item_spawner.load_item_with_id if "meta" in item_data else handler, item_data) for handler, item_data in items]
+        return self.build_inventory(rolled_tables = self.roll_tables(tables), items = items)
+    
     def resolve_loadout(self, loadout : dict, inventory : Inventory) -> Loadout:
         verifier.verify_type(loadout, dict, "loadout")
         verifier.verify_type(inventory, Inventory, "inventory")
         entity_loadout = Loadout()
         for key in ["weapon", "helmet", "chestplate", "legging", "boot"]:
             if key in loadout:
-                loadout_item_name = loadout[key]["item_name"]
-                loadout_item_id = loadout[key]["item_id"]
-                if loadout_item_name in inventory.instanced:
-                    for item in inventory.instanced.keys[loadout_item_name]:
-                        if item.id == loadout_item_id:
-                            setattr(entity_loadout, key, item)
-        return entity_loadout
-    
-    def set_interaction_if_present_else_use_default(self, entity : Entity, entity_template : dict) -> Interaction:
-        verifier.verify_type(entity, Entity, "entity")
-        verifier.verify_type(entity_template, dict, "entity_template")
-        entity_class = type(entity).__name__
-        
-        if "interaction" in entity_template:
-            interaction = entity_template["interaction"]
-        else:
-            if not entity_class in EntityLoader.DEFAULT_INTERACTIONS_MAPPING:
-                if not hasattr(entity, "interaction"):
-                    return
+                if isinstance(loadout[key], str): #templates only name the item, saves also record which one.
+                    loadout_item_name = loadout[key]
+                    loadout_item_id = None
                 else:
-                    raise KeyError(f"Entity class \"{entity_class}\" is expected to have an interaction but wasn't assigned.")
-            interaction = EntityLoader.DEFAULT_INTERACTIONS_MAPPING[type(entity).__name__]
-        entity.interaction = interaction
+                    loadout_item_name = loadout[key]["item_name"]
+                    loadout_item_id = loadout[key]["item_id"]
+                if loadout_item_id is not None:
+                    if inventory.contains_id(loadout_item_id):
+                        setattr(entity_loadout, key, inventory.get_item(loadout_item_id))
+                elif loadout_item_name in inventory.instanced:
+                    setattr(entity_loadout, key, next(iter(inventory.instanced[loadout_item_name].values())))
+        return entity_loadout
     
     def get_techniques(self, technique_names : list[str]) -> list[Technique]:
         techniques = []
@@ -346,92 +510,57 @@ class EntityLoader():
         return techniques
     
     def spawn_entity(self, entity_type : str, entity_template_name : str) -> Entity:
-        if not hasattr(self, "registry"):
-            raise ValueError("Entities not yet initialized.")
-        entity_type = verifier.verify_type(entity_type, str, "entity_type")
-        entity_template_name = verifier.verify_type(entity_template_name, str, "entity_template_name")
-        if not entity_type in self.registry:
-            raise KeyError(f"There is no such entity type as \"{entity_type}\" in the loader.")
-        if not entity_template_name in self.registry[entity_type]:
-            raise KeyError(f"There is no such entity template by the name of {entity_template_name} in the loader.")
-        
-        entity_template = self.registry[entity_type][entity_template_name]
-        
-        entity_class = EntityLoader.MAPPING[entity_type]
-        
-        entity_name = self.name_loader.get_random_name()
-        
-        entity_id = f"{entity_type}_{self.entity_registry.get_count(entity_type) + 1}"
-        
-        entity_cultivation = self.spawn_cultivation_from_weights(entity_template["cultivation"])
-        
-        entity_stats = self.spawn_stats_from_weights(entity_cultivation.physical.stat_points, entity_template["stats"])
-        
-        entity_hp = self.basic_stat_calculator.get(stats = entity_stats, stat = "hp")
-        
-        entity_stamina = self.basic_stat_calculator.get(stats = entity_stats, stat = "stamina")
-        
-        entity_inventory = self.resolve_inventory(entity_template["inventory"])
-        
-        entity_description = entity_template["description"]
-        
-        entity : Entity = entity_class(name = entity_name, id = entity_id, cultivation = entity_cultivation, hp = entity_hp, stamina = entity_stamina, stats = entity_stats, description = entity_description)
+        return self.spawn_many(entity_type = entity_type, entity_template_name = entity_template_name, amount = 1)[0]
+    
+    def spawn_many(self, entity_type : str, entity_template_name : str, amount : int) -> list[Entity]:
+        template = self.get_template(entity_type = entity_type, entity_template_name = entity_template_name)
+        amount = int(verifier.verify_non_negative(amount, "amount"))
         
-        self.set_interaction_if_present_else_use_default(entity = entity, entity_template = entity_template)
+        stage_columns = {cultivation_type : self.rng.choices(stages, cum_weights = cumulative_weights, k = amount) for cultivation_type, (stages, cumulative_weights) in template.cultivation_tables.items()}
+        entity_names = self.name_loader.get_random_names(amount)
+        entity_ids = self.entity_registry.reserve_ids(amount)
+        entity_class = template.entity_class
+        table_rolls = [self.table_resolver.roll_many_by_name(table_type = table_type, table_name = table_name, n = amount) for table_type, table_name in template.inventory_tables]
         
-        if "tags" in entity_template:
-            for tag in entity_template["tags"]:
+        entities = []
+        for i in range(amount):
+            cultivation_spawning_dict = dict(template.fixed_cultivation)
+            for cultivation_type, stage_column in stage_columns.items():
+                cultivation_spawning_dict[cultivation_type] = stage_column[i]
+            entity_cultivation = self.cultivation_creator.spawn_cultivation(cultivation_spawning_dict)
+            
+            combat_stat_values, entity_hp, entity_stamina = self._get_stage_stats(template = template, physical_cultivation = entity_cultivation.physical)
+            entity_stats = self._build_stats(template = template, combat_stat_values = combat_stat_values)
+            
+            entity : Entity = entity_class(name = entity_names[i], id = entity_ids[i], cultivation = entity_cultivation, hp = entity_hp, stamina = entity_stamina, stats = entity_stats, description = template.description)
+            entity.inventory = self.build_inventory(rolled_tables = [rolls[i] for rolls in table_rolls], items = template.inventory_items)
+            
+            if template.interaction is not None:
+                entity.interaction = template.interaction
+            for tag in template.tags:
                 if not tag in entity.tags:
                     entity.tags.append(tag)
-        
-        if hasattr(entity, "loadout"):
-            entity_loadout = self.resolve_loadout(entity_template["loadout"], entity_inventory)
-            setattr(entity, "loadout", entity_loadout)
-        
-        if hasattr(entity, "trader_profile"):
-            setattr(entity, "trader_profile", TraderProfile(**entity_template["trader_profile"]))
-        
-        if "techniques" in entity_template:
-            if hasattr(entity, "techniques"):
-                setattr(entity, "techniques", self.get_techniques(entity_template["techniques"]))
-        
-        if "Merchant" in entity.tags:
-            if "trading_tables" in entity_template:
-                entity.trading_tables = [{"table_name" : table_name, "last_rolled" : None} for table_name in entity_template["trading_tables"]]
-        
-        self.entity_registry.add_count(entity_type)
-        return entity
+            if "loadout" in entity_class.SCHEMA.names:
+                entity.loadout = self.resolve_loadout(template.loadout, entity.inventory)
+            if template.trader_profile is not None:
+                entity.trader_profile = TraderProfile(**template.trader_profile)
+            if template.techniques:
+                entity.techniques = list(template.techniques)
+            if template.trading_tables:
+                entity.trading_tables = [{"table_name" : table_name, "last_rolled" : None} for table_name in template.trading_tables]
+            entities.append(entity)
+        return entities
     
     def load_entity(self, entity_data : dict) -> Entity:
         verifier.verify_type(entity_data, dict, "entity_data")
         
         entity_class : type = EntityLoader.MAPPING[entity_data["entity_type"]]
-        entity_name = entity_data["name"]
-        entity_id = entity_data["id"]
-        entity_cultivation = self.cultivation_creator.load_cultivation(entity_data["cultivation"])
-        entity_stats = self.load_stats(entity_data["stats"])
-        entity_hp = entity_data["hp"]
-        entity_stamina = entity_data["stamina"]
-        entity_inventory = self.resolve_inventory(entity_data["inventory"])
-        entity_is_alive = entity_data["is_alive"]
-        if "description" in entity_data:
-            entity_description = entity_data["description"]
-            entity : Entity = entity_class(name = entity_name, id = entity_id, cultivation = entity_cultivation, hp = entity_hp, stamina = entity_stamina, stats = entity_stats, description = entity_description)
-        else:
-            entity : Entity = entity_class(name = entity_name, id = entity_id, cultivation = entity_cultivation, hp = entity_hp, stamina = entity_stamina, stats = entity_stats)
-        entity.inventory = entity_inventory
-        entity.is_alive = entity_is_alive
-        entity.tags = entity_data["tags"]
-        if "interaction" in entity_data:
-            interaction_id = entity_data["interaction"]
-            entity.interaction = interaction_id
-        if hasattr(entity, "loadout"):
-            entity.loadout = self.resolve_loadout(entity_data["loadout"], entity_inventory)
-        if hasattr(entity, "trader_profile"):
-            setattr(entity, "trader_profile", TraderProfile(**entity_data["trader_profile"]))
-        if hasattr(entity, "techniques"):
-            setattr(entity, "techniques", self.get_techniques(entity_data["techniques"]))
-        if "Merchant" in entity.tags:
-            if "trading_tables" in entity_data:
-                setattr(entity, "trading_tables", verifier.verify_type(entity_data["trading_tables"], list, "trading_tables"))
+        entity_values = self.ENTITY_DECODERS[entity_data["entity_type"]](entity_data)
+        constructor_arguments = {argument : entity_values.pop(argument) for argument in self.CONSTRUCTOR_ARGUMENTS if argument in entity_values}
+        entity : Entity = entity_class(**constructor_arguments)
+        for attribute, value in entity_values.items():
+            setattr(entity, attribute, value)
+        entity.name = intern_string(entity.name)
+        if "loadout" in entity_class.SCHEMA.names:
+            entity.loadout = self.resolve_loadout(entity_data["loadout"], entity.inventory)
         return entity
\ No newline at end of file
@@ -0,0 +1,177 @@
+import sys
+from typing import Iterable
+
+from GeneralVerifier import verifier
+
+def intern_string(value : str) -> str:
+    return sys.intern(verifier.verify_type(value, str, "value"))
+
+def intern_strings(values : list[str]) -> list[str]:
+    verifier.verify_type(values, list, "values")
+    return [intern_string(value) for value in values]
+
+class IdAllocator():
+    #hands out increasing integer ids per kind. An id is the kind's one letter prefix followed by the number in base 36, the display form spells out the kind and the decimal number. eg: "i2s" <-> "item#100".
+    DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+    PREFIXES = {"item" : "i", "entity" : "e"}
+    KINDS = {prefix : kind for kind, prefix in PREFIXES.items()}
+
+    def __init__(self, counters : dict[str, int] | None = None):
+        self.counters = {kind : 0 for kind in IdAllocator.PREFIXES} #kind -> last number handed out.
+        for kind, count in (verifier.verify_type(counters, dict, "counters", True) or {}).items():
+            self.set_count(kind, count)
+
+    def _verify_kind(self, kind : str) -> str:
+        verifier.verify_type(kind, str, "kind")
+        if not kind in IdAllocator.PREFIXES:
+            raise KeyError(f"No id kind \"{kind}\" exists. Expected one of {list(IdAllocator.PREFIXES.keys())}.")
+        return kind
+
+    @staticmethod
+    def encode(number : int) -> str:
+        number = verifier.verify_non_negative(verifier.verify_type(number, int, "number"), "number")
+        digits = IdAllocator.DIGITS
+        encoded = ""
+        while True:
+            number, digit = divmod(number, 36)
+            encoded = digits[digit] + encoded
+            if number == 0:
+                return encoded
+
+    @staticmethod
+    def decode(encoded : str) -> int:
+        verifier.verify_type(encoded, str, "encoded")
+        try:
+            return int(encoded, 36)
+        except ValueError:
+            raise ValueError(f"\"{encoded}\" is not a base 36 number.")
+
+    def get_count(self, kind : str) -> int:
+        return self.counters[self._verify_kind(kind)]
+
+    def set_count(self, kind : str, count : int) -> None:
+        self.counters[self._verify_kind(kind)] = verifier.verify_non_negative(verifier.verify_type(count, int, "count"), "count")
+
+    def allocate(self, kind : str, amount : int = 1) -> range:
+        #the whole range is reserved with a single counter update.
+        amount = verifier.verify_non_negative(verifier.verify_type(amount, int, "amount"), "amount")
+        first_number = self.counters[self._verify_kind(kind)] + 1
+        self.counters[kind] += amount
+        return range(first_number, first_number + amount)
+
+    def make_id(self, kind : str, number : int) -> str:
+        return IdAllocator.PREFIXES[self._verify_kind(kind)] + IdAllocator.encode(number)
+
+    def make_ids(self, kind : str, amount : int = 1) -> list[str]:
+        prefix = IdAllocator.PREFIXES[self._verify_kind(kind)]
+        encode = IdAllocator.encode
+        return [prefix + encode(number) for number in self.allocate(kind, amount)]
+
+    def parse(self, id : str) -> tuple[str, int]:
+        verifier.verify_type(id, str, "id")
+        if len(id) < 2 or not id[0] in IdAllocator.KINDS:
+            raise ValueError(f"\"{id}\" is not an allocated id.")
+        return IdAllocator.KINDS[id[0]], IdAllocator.decode(id[1:])
+
+    def to_display(self, id : str) -> str:
+        kind, number = self.parse(id)
+        return f"{kind}#{number}"
+
+    def from_display(self, display : str) -> str:
+        verifier.verify_type(display, str, "display")
+        kind, separator, number = display.strip().partition("#")
+        if not separator or not number.isdigit():
+            raise ValueError(f"\"{display}\" is expected to look like \"kind#number\".")
+        return self.make_id(kind, int(number))
+
+    def to_dict(self) -> dict[str, int]:
+        return dict(self.counters)
+
+class ReservedIdAllocator(IdAllocator):
+    #only hands out numbers from ranges another allocator reserved for it (eg: the engine's for a partition worker), so ids never clash once both sides end up in one save. What is left of a range too short for a request is skipped.
+    def __init__(self):
+        super().__init__()
+        self.blocks : dict[str, list[range]] = {kind : [] for kind in IdAllocator.PREFIXES}
+
+    def add_block(self, kind : str, numbers : range) -> None:
+        self.blocks[self._verify_kind(kind)].append(verifier.verify_type(numbers, range, "numbers"))
+
+    def allocate(self, kind : str, amount : int = 1) -> range:
+        amount = verifier.verify_non_negative(verifier.verify_type(amount, int, "amount"), "amount")
+        blocks = self.blocks[self._verify_kind(kind)]
+        while blocks and len(blocks[0]) < amount:
+            blocks.pop(0)
+        if not blocks:
+            raise RuntimeError(f"No reserved \"{kind}\" ids are left for {amount} more.")
+        numbers = blocks[0][:amount]
+        blocks[0] = blocks[0][amount:]
+        if numbers:
+            self.counters[kind] = numbers[-1]
+        return numbers
+
+class TagList(list):
+    #a list of interned tags that also keeps them as a bitset, every distinct tag gets one bit the first time it is seen. Membership checks are then single integer operations.
+    __slots__ = ("mask", )
+    BITS : dict[str, int] = {} #tag -> its bit, shared by every tag list.
+
+    def __init__(self, tags : Iterable[str] = ()):
+        super().__init__(intern_string(tag) for tag in tags)
+        self.mask = TagList.get_mask(self)
+
+    @staticmethod
+    def get_bit(tag : str) -> int:
+        bit = TagList.BITS.get(tag)
+        if bit is None:
+            bit = TagList.BITS[intern_string(tag)] = 1 << len(TagList.BITS)
+        return bit
+
+    @staticmethod
+    def get_mask(tags : Iterable[str]) -> int:
+        mask = 0
+        for tag in tags:
+            mask |= TagList.get_bit(tag)
+        return mask
+
+    def _refresh(self) -> None:
+        self.mask = TagList.get_mask(self)
+
+    def __contains__(self, tag : object) -> bool:
+        bit = TagList.BITS.get(tag) if isinstance(tag, str) else None
+        return bit is not None and bool(self.mask & bit)
+
+    def append(self, tag : str) -> None:
+        super().append(intern_string(tag))
+        self.mask |= TagList.get_bit(tag)
+
+    def extend(self, tags : Iterable[str]) -> None:
+        super().extend(intern_string(tag) for tag in tags)
+        self._refresh()
+
+    def insert(self, index : int, tag : str) -> None:
+        super().insert(index, intern_string(tag))
+        self.mask |= TagList.get_bit(tag)
+
+    def remove(self, tag : str) -> None:
+        super().remove(tag)
+        self._refresh() #the same tag may be listed twice.
+
+    def pop(self, index : int = -1) -> str:
+        tag = super().pop(index)
+        self._refresh()
+        return tag
+
+    def clear(self) -> None:
+        super().clear()
+        self.mask = 0
+
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, [intern_string(tag) for tag in value] if isinstance(index, slice) else intern_string(value))
+        self._refresh()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self._refresh()
+
+    def __iadd__(self, tags : Iterable[str]) -> TagList:
+        self.extend(tags)
+        return self
@@ -1,90 +1,259 @@
+from typing import Callable, Iterable, Iterator
+
 from Items import Item, Stack
 from GeneralVerifier import verifier
 from Money import Money
+from JSONStream import JSONStreamWriter
 
 class Inventory():
     def __init__(self, capacity : int = 0, money : Money | None = None):
         self.capacity = verifier.verify_non_negative(capacity, "capacity")
-        self.filled = 0
-        self.stacked = {}     #str -> Stack
-        self.instanced = {}   #str -> list[Item]
+        self.filled = 0 #total weight.
+        self.value = 0 #total base price.
+        self.item_count = 0 #instanced items plus the amount of every stack.
+        self.stacked : dict[str, Stack] = {}
+        self.instanced : dict[str, dict[str, Item]] = {} #item name -> item id -> item
+        self.by_id : dict[str, Item] = {}
+        self.instanced_by_tag : dict[str, dict[str, Item]] = {} #tag -> item id -> item
+        self.stacked_by_tag : dict[str, dict[str, Stack]] = {} #tag -> stack name -> stack
+        self.instanced_by_class : dict[type, dict[str, Item]] = {}
+        self.stacked_by_class : dict[type, dict[str, Stack]] = {}
+        self.listeners : list[Callable[[str, Item | Stack], None]] = [] #called with "added", "changed" or "removed" and the item or stack after every change.
         if money is None:
             self.money = Money()
         else:
             self.money = verifier.verify_type(money, Money, "money")
+    
+    def subscribe(self, listener : Callable[[str, Item | Stack], None]) -> None:
+        if not callable(listener):
+            raise TypeError(f"listener must be callable, not \"{type(listener).__name__}\".")
+        self.listeners.append(listener)
+    
+    def unsubscribe(self, listener : Callable[[str, Item | Stack], None]) -> None:
+        self.listeners.remove(listener)
+    
+    def _notify(self, change : str, element : Item | Stack) -> None:
+        for listener in self.listeners:
+            listener(change, element)
+    
+    def _index(self, index : dict, index_key : str | type, key : str, element : Item | Stack) -> None:
+        if index_key in index:
+            index[index_key][key] = element
+        else:
+            index[index_key] = {key : element}
+    
+    def _unindex(self, index : dict, index_key : str | type, key : str) -> None:
+        elements = index[index_key]
+        del elements[key]
+        if not elements:
+            del index[index_key]
         
     def add_item(self, item : Item) -> bool:
         item = verifier.verify_type(item, Item, "item")
         
         if self.capacity < self.filled + item.weight:
             return False
+        self._add_instanced(item)
+        return True
         
+    def add_items(self, items : list[Item]) -> bool:
+        #all or nothing, capacity is checked once for the whole batch.
+        verifier.verify_type(items, list, "items")
+        for item in items:
+            verifier.verify_type(item, Item, "item")
+        if self.capacity < self.filled + sum(item.weight for item in items):
+            return False
+        for item in items:
+            self._add_instanced(item)
+        return True
+    
+    def _add_instanced(self, item : Item) -> None:
+        if item.id in self.by_id:
+            raise KeyError(f"Item with id \"{item.id}\" is already in the inventory.")
         if item.name in self.instanced:
-            self.instanced[item.name].append(item)
+            self.instanced[item.name][item.id] = item
         else:
-            self.instanced[item.name] = [item]
-
-        self.filled += item.weight
+            self.instanced[item.name] = {item.id : item}
+        self.by_id[item.id] = item
+        for tag in item.tags:
+            self._index(self.instanced_by_tag, tag, item.id, item)
+        self._index(self.instanced_by_class, type(item), item.id, item)
         
-        return True
+        self.filled += item.weight
+        self.value += item.price
+        self.item_count += 1
+        if self.listeners:
+            self._notify("added", item)
     
     def add_stack(self, stack : Stack) -> bool:
         stack = verifier.verify_type(stack, Stack, "stack")
         verifier.verify_positive(stack.amount, "stack_amount")
         
-        if self.capacity < self.filled + stack.weight:
+        weight = stack.base.weight * stack.amount
+        if self.capacity < self.filled + weight:
             return False
         
         key = stack.base.name
         
         if key in self.stacked:
             self.stacked[key].amount += stack.amount
+            self.stacked[key].weight = self.stacked[key].base.weight * self.stacked[key].amount
+            change = "changed"
         else:
             self.stacked[key] = stack
+            for tag in stack.base.tags:
+                self._index(self.stacked_by_tag, tag, key, stack)
+            self._index(self.stacked_by_class, type(stack.base), key, stack)
+            change = "added"
         
-        self.filled += stack.weight
+        self.filled += weight
+        self.value += stack.base.price * stack.amount
+        self.item_count += stack.amount
+        if self.listeners:
+            self._notify(change, self.stacked[key])
         
         return True
     
-    def remove_item_by_id(self, item_name : str, item_id : str) -> None:
-        for i, item in enumerate(self.instanced[item_name]):
-            if item.id == item_id:
-                self.instanced[item_name].pop(i)
-            else:
-                raise KeyError(f"No item by name \"{item_name}\" with id \"{item_id}\" found in the inventory.")
+    def _remove_instanced(self, item : Item) -> Item:
+        items = self.instanced[item.name]
+        del items[item.id]
+        if not items:
+            del self.instanced[item.name]
+        del self.by_id[item.id]
+        for tag in item.tags:
+            self._unindex(self.instanced_by_tag, tag, item.id)
+        self._unindex(self.instanced_by_class, type(item), item.id)
+        self.filled -= item.weight
+        self.value -= item.price
+        self.item_count -= 1
+        if self.listeners:
+            self._notify("removed", item)
+        return item
+    
+    def remove_item_by_id(self, item_id : str) -> Item:
+        if not item_id in self.by_id:
+            raise KeyError(f"No item with id \"{item_id}\" found in the inventory.")
+        return self._remove_instanced(self.by_id[item_id])
     
-    def remove_item(self, item_name : str) -> None:
+    def remove_item(self, item_name : str) -> Item:
         if not item_name in self.instanced:
             raise KeyError(f"No item by the name of \"{item_name}\" found in inventory.")
-        self.instanced[item_name].pop()
-        if len(self.instanced[item_name]) == 0:
-            del self.instanced[item_name]
+        return self._remove_instanced(next(reversed(self.instanced[item_name].values())))
+    
+    def remove_items(self, item_name : str, amount : int) -> list[Item]:
+        #removes the most recently added items first, nothing is removed if there are fewer than amount.
+        amount = int(verifier.verify_non_negative(amount, "amount"))
+        if self.count(item_name) < amount or (amount and not item_name in self.instanced):
+            raise ValueError(f"The inventory only has \"{self.count(item_name)}\" items by the name of \"{item_name}\", not \"{amount}\".")
+        if amount == 0:
+            return []
+        items_to_remove = list(self.instanced[item_name].values())[-amount:]
+        for item in reversed(items_to_remove):
+            self._remove_instanced(item)
+        return items_to_remove
     
     def remove_stack(self, stack_name : str, amount : int) -> None:
         verifier.verify_non_negative(amount, "amount")
         if not stack_name in self.stacked:
             raise KeyError(f"No stack by the name of item by the name of \"{stack_name}\" found in inventory.")
-        if self.stacked[stack_name].amount < amount:
-            raise ValueError(f"The stack only has \"{self.stacked[stack_name].amount}\" amount of items, not \"{amount}\"")
-        self.stacked[stack_name].amount -= amount
-        if self.stacked[stack_name].amount == 0:
+        stack = self.stacked[stack_name]
+        if stack.amount < amount:
+            raise ValueError(f"The stack only has \"{stack.amount}\" amount of items, not \"{amount}\"")
+        stack.amount -= amount
+        stack.weight = stack.base.weight * stack.amount
+        self.filled -= stack.base.weight * amount
+        self.value -= stack.base.price * amount
+        self.item_count -= amount
+        if stack.amount == 0:
             del self.stacked[stack_name]
+            for tag in stack.base.tags:
+                self._unindex(self.stacked_by_tag, tag, stack_name)
+            self._unindex(self.stacked_by_class, type(stack.base), stack_name)
+        if self.listeners:
+            self._notify("removed" if stack.amount == 0 else "changed", stack)
+    
+    def get_item(self, item_id : str) -> Item:
+        if not item_id in self.by_id:
+            raise KeyError(f"No item with id \"{item_id}\" found in the inventory.")
+        return self.by_id[item_id]
+    
+    def contains_id(self, item_id : str) -> bool:
+        return item_id in self.by_id
+    
+    def count(self, item_name : str) -> int:
+        if item_name in self.stacked:
+            return self.stacked[item_name].amount
+        if item_name in self.instanced:
+            return len(self.instanced[item_name])
+        return 0
+    
+    def iter_items(self) -> Iterator[Item | Stack]:
+        yield from self.by_id.values()
+        yield from self.stacked.values()
+    
+    def find(self, tags : Iterable[str] | None = None, item_class : type | None = None, predicate : Callable[[Item | Stack], bool] | None = None) -> list[Item | Stack]:
+        #items and stacks having any of the tags, of item_class (or a subclass) and accepted by predicate. Only the matching index entries are visited.
+        if tags is not None:
+            instanced = {}
+            stacked = {}
+            for tag in tags:
+                instanced.update(self.instanced_by_tag.get(tag, {}))
+                stacked.update(self.stacked_by_tag.get(tag, {}))
+            candidates = list(instanced.values()) + list(stacked.values())
+        else:
+            candidates = None
+        if item_class is not None:
+            if candidates is None:
+                candidates = []
+                for index in (self.instanced_by_class, self.stacked_by_class):
+                    for indexed_class, elements in index.items():
+                        if issubclass(indexed_class, item_class):
+                            candidates.extend(elements.values())
+            else:
+                candidates = [element for element in candidates if isinstance(element.base if isinstance(element, Stack) else element, item_class)]
+        if candidates is None:
+            candidates = list(self.iter_items())
+        if predicate is not None:
+            candidates = [element for element in candidates if predicate(element)]
+        return candidates
         
     def shrink_to_fit(self) -> None:
         self.capacity = self.filled
     
     def clear(self) -> None:
+        if self.listeners:
+            for element in list(self.iter_items()):
+                self._notify("removed", element)
+        self.filled = 0
+        self.value = 0
+        self.item_count = 0
         self.instanced = {}
         self.stacked = {}
+        self.by_id = {}
+        self.instanced_by_tag = {}
+        self.stacked_by_tag = {}
+        self.instanced_by_class = {}
+        self.stacked_by_class = {}
     
     def to_dict(self) -> dict[str, list[dict]]:
         item_data = {}
-        item_data["instanced"] = []
-        item_data["stacked"] = []
-        for item_type in self.instanced.keys():
-            item_data["instanced"].extend([item.to_dict() for item in self.instanced[item_type]])
-        item_data["stacked"].extend([item.to_dict() for item in self.stacked.values()])
+        item_data["instanced"] = [item.to_dict() for item in self.by_id.values()]
+        item_data["stacked"] = [stack.to_dict() for stack in self.stacked.values()]
         return item_data
     
+    def stream_to(self, writer : JSONStreamWriter) -> None:
+        writer.begin_object()
+        writer.key("instanced")
+        writer.begin_array()
+        for item in self.by_id.values():
+            writer.value(item.to_dict())
+        writer.end_array()
+        writer.key("stacked")
+        writer.begin_array()
+        for stack in self.stacked.values():
+            writer.value(stack.to_dict())
+        writer.end_array()
+        writer.end_object()
+    
     def __str__(self) -> str:
-        return str(self.to_dict())
\ No newline at end of file
+        return str(self.to_dict())
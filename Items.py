@@ -1,27 +1,47 @@
 import os
 import json
 from GeneralVerifier import verifier
+from Schema import Schema, VALUE
+from Identifiers import IdAllocator, intern_string, intern_strings
 
 class Item():
+    __slots__ = ("name", "id", "template", "weight", "price", "stackable", "tags", "description")
+    SCHEMA = Schema((("weight", VALUE), ("price", VALUE), ("stackable", VALUE), ("tags", VALUE), ("description", VALUE))) #attributes carried over from templates and written to saves, name and id live in meta. Subclasses extend it with their own slots.
+    
     def __init__(self, name : str, id : str, weight : int | float = 0, price : int = 1, stackable : bool = False, tags : list | None = None, description : str = "Misc."):
         self.name = verifier.verify_type(name, str, "name")
         self.id = verifier.verify_type(id, str, "id")
+        self.template : Item | None = None
         self.weight = verifier.verify_type(weight, (int, float), "weight")
         self.price = verifier.verify_type(verifier.verify_non_negative(price, "price"), int, "price")
         self.stackable = verifier.verify_type(stackable, bool, "stackable")
         self.tags = verifier.verify_type(tags, list, "tags", True) or ["misc", ]
         self.description = verifier.verify_type(description, str, "description")
 
+    @classmethod
+    def from_template(cls, template : Item, id : str) -> Item:
+        #only name, id and the template are set, every other attribute is read from the template until the instance assigns its own.
+        item = cls.__new__(cls)
+        item.name = template.name
+        item.id = verifier.verify_type(id, str, "id")
+        item.template = template
+        return item
+    
+    def __getattr__(self, attribute : str):
+        #only called for slots the instance never assigned.
+        if attribute == "template":
+            raise AttributeError(attribute)
+        if self.template is None:
+            raise AttributeError(f"\"{type(self).__name__}\" object has no attribute \"{attribute}\".")
+        return getattr(self.template, attribute)
+    
     def to_dict(self) -> dict:
         item_data = {}
         item_data["meta"] = {}
         item_data["meta"]["item_type"] = type(self).__name__
         item_data["meta"]["item_name"] = self.name
         item_data["meta"]["item_id"] = self.id
-        item_data["data"] = {}
-        for item_attribute in vars(self):
-            if not item_attribute in ["name", "id"]:
-                item_data["data"][item_attribute] = getattr(self, item_attribute)
+        item_data["data"] = self.SCHEMA.encode(self, {})
         return item_data
     
     def get_trade_price(self) -> int:
@@ -30,6 +50,8 @@ class Item():
         return int(self.price * (self.current_durability/self.durability))
 
 class Stack():
+    __slots__ = ("base", "amount", "weight", "name")
+    
     def __init__(self, base : Item, amount : int):
         if not isinstance(base, Item):
             raise TypeError(f"base item is expected to be an item, not \"{type(base).__name__}\"")
@@ -46,6 +68,9 @@ class Stack():
         return item_data
 
 class Consumable(Item):
+    __slots__ = ("effects", "requirements", "one_time_use")
+    SCHEMA = Item.SCHEMA.extend((("effects", VALUE), ("requirements", VALUE), ("one_time_use", VALUE)))
+    
     def __init__(self, name : str, id : str, weight : int | float = 0, effects : list | None = None, one_time_use : bool = True, description : str = "Consumable."):
         super().__init__(name = name, id = id, weight = weight, stackable = True, description = description)
         self.effects : list = verifier.verify_type(effects, list, "effects", True) or []
@@ -61,6 +86,9 @@ class Consumable(Item):
 #         self.ammo_class = verifier.verify_type(ammo_class, str, "ammo_type")
 
 class RangedWeapon(Item):
+    __slots__ = ("base_damage", "durability", "current_durability", "requirements", "modifiers")
+    SCHEMA = Item.SCHEMA.extend((("base_damage", VALUE), ("durability", VALUE), ("current_durability", VALUE), ("requirements", VALUE), ("modifiers", VALUE)))
+    
     def __init__(self, name : str, id : str, weight : int | float = 0.01, base_damage : int = 0, durability : int = 100, description : str = "Ranged weapon."):
         super().__init__(name = name, id = id, weight = weight, stackable = False, description = description)
         self.base_damage = verifier.verify_non_negative(base_damage, "base_damage")
@@ -70,6 +98,9 @@ class RangedWeapon(Item):
         self.modifiers = None
         
 class MeleeWeapon(Item):
+    __slots__ = ("slash_damage", "pierce_damage", "crush_damage", "durability", "current_durability", "requirements", "modifiers")
+    SCHEMA = Item.SCHEMA.extend((("slash_damage", VALUE), ("pierce_damage", VALUE), ("crush_damage", VALUE), ("durability", VALUE), ("current_durability", VALUE), ("requirements", VALUE), ("modifiers", VALUE)))
+    
     def __init__(self, name : str, id : str, weight : int | float = 0.01, slash_damage : int = 0, pierce_damage : int = 0, crush_damage : int = 0, durability : int = 100, description : str = "Melee weapon."):
         super().__init__(name = name, id = id, weight = weight, stackable = False, description = description)
         self.slash_damage = verifier.verify_non_negative(slash_damage, "slash_damage")
@@ -81,6 +112,9 @@ class MeleeWeapon(Item):
         self.modifiers = None
 
 class Armor(Item):
+    __slots__ = ("base_slash_defense", "base_pierce_defense", "base_crush_defense", "durability", "current_durability", "requirements", "modifiers")
+    SCHEMA = Item.SCHEMA.extend((("base_slash_defense", VALUE), ("base_pierce_defense", VALUE), ("base_crush_defense", VALUE), ("durability", VALUE), ("current_durability", VALUE), ("requirements", VALUE), ("modifiers", VALUE)))
+    
     def __init__(self, name : str, id : str, weight : int | float = 1, base_slash_defense : int = 0, base_pierce_defense : int = 0, base_crush_defense : int = 0, durability : int = 100, description : str = "Armor."):
         super().__init__(name = name, id = id, weight = weight, stackable = False, description = description)
         self.base_slash_defense = verifier.verify_non_negative(base_slash_defense, "base_slash_defense")
@@ -92,16 +126,16 @@ class Armor(Item):
         self.modifiers = None
 
 class Helmet(Armor):
-    pass
+    __slots__ = ()
         
 class Chestplate(Armor):
-    pass
+    __slots__ = ()
 
 class Legging(Armor):
-    pass
+    __slots__ = ()
 
 class Boot(Armor):
-    pass
+    __slots__ = ()
 
 class ItemsLoader():
     
@@ -139,8 +173,13 @@ class ItemsLoader():
                     default_item_obj = item_class(name = item_name, id = f"<{item_name}>")
                     
                     for config_key in item_config.keys():
-                        if not config_key in ["name", "id"]:
-                            setattr(default_item_obj, config_key, item_config[config_key])
+                        if config_key in ["name", "id"]:
+                            continue
+                        if not config_key in item_class.SCHEMA.names:
+                            raise KeyError(f"Item template \"{item_name}\" of type \"{item_type}\" has unknown attribute \"{config_key}\". Expected one of {list(item_class.SCHEMA.names)}.")
+                        setattr(default_item_obj, config_key, item_config[config_key])
+                    default_item_obj.name = intern_string(item_name)
+                    default_item_obj.tags = intern_strings(default_item_obj.tags)
                     default_items[item_type][item_name] = default_item_obj
         self.default_items = default_items
 
@@ -156,31 +195,24 @@ class ItemsLoader():
         return default_item
     
 class ItemRegistry():
-    def __init__(self, registry : dict[str : dict[str : int]] | None = None):
-        self.registry = verifier.verify_type(registry, dict, "registry", True) or {}
+    #item ids are handed out by the IdAllocator, which may be shared with the EntityRegistry.
+    def __init__(self, registry : dict[str, int] | None = None, allocator : IdAllocator | None = None):
+        self.allocator = verifier.verify_type(allocator, IdAllocator, "allocator", True) or IdAllocator()
+        self.load(verifier.verify_type(registry, dict, "registry", True) or {})
 
-    def add_count(self, item_type : str, item_name : str):
-        item_type = verifier.verify_type(item_type, str, "item_type")
-        item_name = verifier.verify_type(item_name, str, "item_name")
-        if not item_type in self.registry:
-            self.registry[item_type] = {}
-        if not item_name in self.registry[item_type]:
-            self.registry[item_type][item_name] = 1
-        else:
-            self.registry[item_type][item_name] += 1
+    def reserve_ids(self, amount : int = 1) -> list[str]:
+        return self.allocator.make_ids("item", amount)
     
-    def get_count(self, item_type : str, item_name : str) -> int:
-        if not item_type in self.registry:
-            return 0
-        if not item_name in self.registry[item_type]:
-            return 0
-        return self.registry[item_type][item_name]
+    def get_count(self) -> int:
+        return self.allocator.get_count("item")
     
-    def to_dict(self) -> dict[str : dict[str : int]]:
-        return dict(self.registry)
+    def to_dict(self) -> dict[str, int]:
+        return {"item" : self.allocator.get_count("item")}
     
-    def load(self, data : dict[str : dict[str : int]]) -> None:
-        self.registry = verifier.verify_type(data, dict, "data")
+    def load(self, data : dict[str, int]) -> None:
+        verifier.verify_type(data, dict, "data")
+        #registries saved before ids were allocated hold per item counts instead, their "<...>" ids can never collide with allocated ones.
+        self.allocator.set_count("item", data.get("item", 0))
     
 class ItemsSpawner():
     def __init__(self, loader : ItemsLoader, registry : ItemRegistry):
@@ -188,42 +220,27 @@ class ItemsSpawner():
         self.registry = verifier.verify_type(registry, ItemRegistry, "registry")
     
     def _spawn_minimal_item(self, item_type : str, item_name : str) -> Item:
-
+        return self.spawn_many(item_type = item_type, item_name = item_name, amount = 1)[0]
+    
+    def spawn_many(self, item_type : str, item_name : str, amount : int) -> list[Item]:
+        #the whole id range is reserved with a single allocator update.
+        amount = int(verifier.verify_non_negative(amount, "amount"))
         item_type = item_type.strip()
         
         default_item = self.loader.get_default(item_type, item_name)
         item_class = self.loader.MAPPING[item_type]
         
-        total_count_of_item = self.registry.get_count(item_type = item_type, item_name = item_name)
-        new_item_id = f"<{item_class.__name__}_{item_name}_{total_count_of_item + 1}>".replace(" ", "_")
-        
-        new_item = item_class(name = default_item.name, id = new_item_id)
-        self.registry.add_count(item_type, item_name)
-        return new_item
-    
-    def _apply_attributes(self, item : Item, attributes : dict) -> Item:
-        item = verifier.verify_type(item, Item, "item")
-        attributes = verifier.verify_type(attributes, dict, "attributes")
-        
-        for attribute in attributes.keys():
-            if attribute not in ("name", "id"):
-                setattr(item, attribute, attributes[attribute])
-        return item
+        from_template = item_class.from_template
+        return [from_template(default_item, item_id) for item_id in self.registry.reserve_ids(amount)]
     
     def spawn_new_item(self, item_type : str, item_name : str) -> Item:
-        
-        new_item = self._spawn_minimal_item(item_type, item_name)
-        default_item = self.loader.get_default(item_type, item_name)
-        
-        new_item = self._apply_attributes(new_item, {attribute : getattr(default_item, attribute) for attribute in vars(default_item)})
-        
-        return new_item
+        return self._spawn_minimal_item(item_type, item_name)
     
     def load_item(self, item_type : str, item_name : str, item_data : dict) -> Item:
         item_data = verifier.verify_type(item_data, dict, "item_data")
         
         new_item = self._spawn_minimal_item(item_type, item_name)
-        new_item = self._apply_attributes(new_item, item_data)
+        new_item = new_item.SCHEMA.apply_delta(new_item, item_data, new_item.template)
 
         return new_item
 
@@ -273,5 +290,8 @@ class ItemsSpawner():
         item_id = item_data["meta"]["item_id"]
         item_data = item_data["data"]
         
-        item = self.loader.MAPPING[item_type](name = item_name, id = item_id)
-        return self._apply_attributes(item, item_data)
\ No newline at end of file
+        item_class = self.loader.MAPPING[item_type]
+        if item_type in self.loader.default_items and item_name in self.loader.default_items[item_type]:
+            template = self.loader.default_items[item_type][item_name]
+            return item_class.SCHEMA.apply_delta(item_class.from_template(template = template, id = item_id), item_data, template)
+        return item_class.SCHEMA.apply(item_class(name = item_name, id = item_id), item_data) #the template was removed from the game data, keep everything the save has.
\ No newline at end of file
@@ -0,0 +1,250 @@
+import re
+import json
+from typing import Any, Iterator, TextIO
+
+from GeneralVerifier import verifier
+
+class JSONStreamWriter():
+    def __init__(self, file : TextIO):
+        self.file = file
+        self._first_in_container : list[bool] = [] #one flag per open container, True until the first element is written.
+        self._after_key = False
+
+    def _before_element(self) -> None:
+        if self._after_key:
+            self._after_key = False
+            return
+        if not self._first_in_container:
+            return
+        if self._first_in_container[-1]:
+            self._first_in_container[-1] = False
+        else:
+            self.file.write(",")
+
+    def begin_object(self) -> None:
+        self._before_element()
+        self.file.write("{")
+        self._first_in_container.append(True)
+
+    def end_object(self) -> None:
+        if not self._first_in_container:
+            raise RuntimeError("end_object called without a matching begin_object.")
+        self._first_in_container.pop()
+        self.file.write("}")
+
+    def begin_array(self) -> None:
+        self._before_element()
+        self.file.write("[")
+        self._first_in_container.append(True)
+
+    def end_array(self) -> None:
+        if not self._first_in_container:
+            raise RuntimeError("end_array called without a matching begin_array.")
+        self._first_in_container.pop()
+        self.file.write("]")
+
+    def key(self, key : str) -> None:
+        verifier.verify_type(key, str, "key")
+        self._before_element()
+        self.file.write(json.dumps(key))
+        self.file.write(":")
+        self._after_key = True
+
+    def value(self, value : Any) -> None:
+        self._before_element()
+        self.file.write(json.dumps(value))
+
+    def raw(self, text : str) -> None:
+        #text must already be a single valid json value.
+        verifier.verify_type(text, str, "text")
+        self._before_element()
+        self.file.write(text)
+    
+    def item(self, key : str, value : Any) -> None:
+        self.key(key)
+        self.value(value)
+
+class JSONStreamReader():
+    WHITESPACE = " \t\n\r"
+    SCALAR_END = re.compile(r"[,:\]}\s]") #numbers and literals only end at one of these (or the end of the stream).
+
+    def __init__(self, file : TextIO, chunk_size : int = 65536):
+        self.file = file
+        self.chunk_size = verifier.verify_positive(chunk_size, "chunk_size")
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        if self.position > self.chunk_size:
+            self.buffer = self.buffer[self.position:]
+            self.position = 0
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def _skip_whitespace(self) -> None:
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in self.WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer) or not self._fill():
+                return
+
+    def peek(self) -> str:
+        self._skip_whitespace()
+        if self.position >= len(self.buffer):
+            raise EOFError("Unexpected end of JSON stream.")
+        return self.buffer[self.position]
+
+    def expect(self, character : str) -> None:
+        found = self.peek()
+        if found != character:
+            raise ValueError(f"Expected \"{character}\" in JSON stream at position {self.position} but found \"{found}\".")
+        self.position += 1
+
+    def _fill_scalar(self) -> None:
+        #a number or literal cut off at the end of the buffer (eg: "12" of "1234" or "1e" of "1e5") would decode early, the buffer is filled until it ends.
+        searched = 0 #characters after position already known not to end the scalar, kept relative since _fill may move position.
+        while not self.SCALAR_END.search(self.buffer, self.position + searched):
+            searched = len(self.buffer) - self.position
+            if not self._fill():
+                return
+
+    def read_value(self) -> Any:
+        self._skip_whitespace()
+        if self.position < len(self.buffer) and not self.buffer[self.position] in "{[\"":
+            self._fill_scalar()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError: #strings and containers are only decoded once they are complete.
+                if not self._fill():
+                    raise
+                continue
+            self.position = end
+            return value
+
+    def skip_value(self) -> None:
+        if self.peek() == "{":
+            for _ in self.iter_object():
+                self.skip_value()
+        elif self.peek() == "[":
+            for _ in self.iter_array():
+                self.skip_value()
+        else:
+            self.read_value()
+
+    def iter_object(self) -> Iterator[str]:
+        #yields every key of the object. The caller MUST consume the value (read_value, skip_value or iterate it) before asking for the next key.
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f"JSON object keys are expected to be strings, not \"{type(key).__name__}\".")
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.position += 1
+                continue
+            self.expect("}")
+            return
+
+    def iter_array(self) -> Iterator[int]:
+        #yields the index of every element of the array. Same consumption rule as iter_object.
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.peek() == ",":
+                self.position += 1
+                continue
+            self.expect("]")
+            return
+
+class JSONSpanScanner():
+    #finds where values start and end in utf-8 json bytes (or an mmap of them) without decoding them. Strings are jumped over with one regex match, nested containers by counting brackets.
+    WHITESPACE = re.compile(rb"[ \t\n\r]*")
+    STRING = re.compile(rb'"(?:[^"\\]|\\.)*"', re.DOTALL)
+    STRUCTURE = re.compile(rb'["{}\[\]]')
+    SCALAR = re.compile(rb"[^,:}\]\s]+")
+
+    def __init__(self, buffer : bytes):
+        self.buffer = buffer
+
+    def skip_whitespace(self, position : int) -> int:
+        return JSONSpanScanner.WHITESPACE.match(self.buffer, position).end()
+
+    def _expect(self, position : int, character : bytes) -> int:
+        position = self.skip_whitespace(position)
+        if self.buffer[position : position + 1] != character:
+            raise ValueError(f"Expected \"{character.decode()}\" in JSON at byte {position} but found \"{self.buffer[position : position + 1].decode(errors = 'replace')}\".")
+        return position + 1
+
+    def skip_value(self, position : int) -> int:
+        #end of the value starting at position (after whitespace).
+        position = self.skip_whitespace(position)
+        first = self.buffer[position : position + 1]
+        if first == b'"':
+            match = JSONSpanScanner.STRING.match(self.buffer, position)
+            if match is None:
+                raise ValueError(f"Unterminated JSON string at byte {position}.")
+            return match.end()
+        if first in (b"{", b"["):
+            depth = 0
+            while True:
+                match = JSONSpanScanner.STRUCTURE.search(self.buffer, position)
+                if match is None:
+                    raise ValueError("Unexpected end of JSON.")
+                character = match.group()
+                if character == b'"':
+                    position = JSONSpanScanner.STRING.match(self.buffer, match.start()).end()
+                    continue
+                position = match.end()
+                depth += 1 if character in (b"{", b"[") else -1
+                if depth == 0:
+                    return position
+        match = JSONSpanScanner.SCALAR.match(self.buffer, position)
+        if match is None:
+            raise ValueError(f"Expected a JSON value at byte {position}.")
+        return match.end()
+
+    def scan_object(self, position : int = 0) -> tuple[dict[str, tuple[int, int]], int]:
+        #key -> (start, end) of its value for the object starting at position, and where the object ends.
+        spans = {}
+        position = self._expect(position, b"{")
+        position = self.skip_whitespace(position)
+        if self.buffer[position : position + 1] == b"}":
+            return spans, position + 1
+        while True:
+            key_start = self.skip_whitespace(position)
+            key_end = self.skip_value(key_start)
+            key = json.loads(self.buffer[key_start : key_end])
+            if not isinstance(key, str):
+                raise ValueError(f"JSON object keys are expected to be strings, not \"{type(key).__name__}\".")
+            value_start = self.skip_whitespace(self._expect(key_end, b":"))
+            position = self.skip_value(value_start)
+            spans[key] = (value_start, position)
+            position = self.skip_whitespace(position)
+            separator = self.buffer[position : position + 1]
+            if separator == b",":
+                position += 1
+                continue
+            if separator == b"}":
+                return spans, position + 1
+            raise ValueError(f"Expected \",\" or \"}}\" in JSON at byte {position}.")
+
+    def read(self, span : tuple[int, int]) -> Any:
+        return json.loads(self.buffer[span[0] : span[1]])
@@ -1,18 +1,127 @@
 import os
 import json
+import mmap
+import contextlib
+from collections import deque
+from typing import Any, Callable, Iterator, ItemsView, TYPE_CHECKING
 
 from GeneralVerifier import verifier
 from Inventory import Inventory
-from Entities import Entity, EntityLoader
+from Entities import Entity, Player, EntityLoader
 from Items import Item, Stack, ItemsSpawner
 from TableLoader import TableResolver
 from Money import Money
+from JSONStream import JSONStreamWriter, JSONStreamReader, JSONSpanScanner
+from StatTable import StatTable
+from Identifiers import TagList, intern_string
+
+if TYPE_CHECKING:
+    from Residency import SubLocationResidency
+
+def get_paths_within(path : str, distance : int, get_exits : Callable[[str], dict[str, str]]) -> set[str]:
+    #breadth first walk over the exit graph, every sublocation path at most distance exits away from path (path included).
+    paths = {path}
+    frontier = deque([(path, 0)])
+    while frontier:
+        current_path, current_distance = frontier.popleft()
+        if current_distance >= distance:
+            continue
+        for exit_path in get_exits(current_path).values():
+            if not exit_path in paths:
+                paths.add(exit_path)
+                frontier.append((exit_path, current_distance + 1))
+    return paths
+
+class WorldIndex():
+    #resolved locations and resident sublocations by path, and paths by object. Every path string ever asked for is parsed once into its interned canonical form "map/location[/sublocation]", which also gets a stable integer id.
+    def __init__(self):
+        self.canonical_paths : dict[str, str] = {} #any spelling seen so far -> canonical path.
+        self.path_parts : dict[str, tuple[str, ...]] = {} #canonical path -> its stripped parts.
+        self.path_ids : dict[str, int] = {}
+        self.paths : list[str] = [] #path id -> canonical path.
+        self.locations : dict[str, Location] = {}
+        self.sub_locations : dict[str, SubLocation] = {}
+        self.object_paths : dict[int, str] = {} #id() of an indexed location or sublocation -> its path.
+
+    def normalize(self, path : str) -> str:
+        canonical_path = self.canonical_paths.get(path)
+        if canonical_path is not None:
+            return canonical_path
+        verifier.verify_type(path, str, "path")
+        parts = tuple(intern_string(part.strip()) for part in path.split("/"))
+        if not 2 <= len(parts) <= 3 or not all(parts):
+            raise ValueError(f"Path \"{path}\" is expected to look like \"map/location\" or \"map/location/sublocation\".")
+        canonical_path = intern_string("/".join(parts))
+        if not canonical_path in self.path_parts:
+            self.path_parts[canonical_path] = parts
+            self.path_ids[canonical_path] = len(self.paths)
+            self.paths.append(canonical_path)
+        self.canonical_paths[path] = canonical_path
+        self.canonical_paths[canonical_path] = canonical_path
+        return canonical_path
+
+    def split(self, path : str) -> tuple[str, ...]:
+        return self.path_parts[self.normalize(path)]
+
+    def get_map_name(self, path : str) -> str:
+        return self.split(path)[0]
+
+    def get_id(self, path : str) -> int:
+        return self.path_ids[self.normalize(path)]
+
+    def get_path_by_id(self, path_id : int) -> str:
+        if not 0 <= path_id < len(self.paths):
+            raise KeyError(f"No path with id \"{path_id}\" is indexed.")
+        return self.paths[path_id]
+
+    def get_location(self, path : str) -> Location | None:
+        return self.locations.get(self.normalize(path))
+
+    def get_sub_location(self, path : str) -> SubLocation | None:
+        #None for sublocations of maps that are not resolved and for evicted ones.
+        return self.sub_locations.get(self.normalize(path))
+
+    def get_path(self, place : Location | SubLocation) -> str | None:
+        return self.object_paths.get(id(place))
+
+    def add_map(self, game_map : Map) -> None:
+        for location_name, location in game_map.locations.items():
+            location_path = self.normalize(f"{game_map.name}/{location_name}")
+            self.locations[location_path] = location
+            self.object_paths[id(location)] = location_path
+            for sub_location_name, sub_location in location.sub_locations.resident_items():
+                self.add_sub_location(f"{location_path}/{sub_location_name}", sub_location)
+
+    def add_sub_location(self, path : str, sub_location : SubLocation) -> None:
+        path = self.normalize(path)
+        self.invalidate(path)
+        self.sub_locations[path] = sub_location
+        self.object_paths[id(sub_location)] = path
+
+    def invalidate(self, path : str) -> None:
+        #the path keeps its id, only the object is forgotten.
+        sub_location = self.sub_locations.pop(self.normalize(path), None)
+        if sub_location is not None:
+            self.object_paths.pop(id(sub_location), None)
+
+    def remove_map(self, map_name : str) -> None:
+        prefix = f"{map_name.strip()}/"
+        for index in (self.locations, self.sub_locations):
+            for path in [path for path in index if path.startswith(prefix)]:
+                self.object_paths.pop(id(index.pop(path)), None)
+
+    def clear(self) -> None:
+        self.locations.clear()
+        self.sub_locations.clear()
+        self.object_paths.clear()
 
 class Map():
     def __init__(self, name : str, locations : dict[str, Location] = None, description : str = "A Map."):
         self.name = verifier.verify_type(name, str, "name")
         self.locations = verifier.verify_type(locations, dict, "locations", True) or {}
         self.description = verifier.verify_type(description, str, "description")
+        self.stat_table : StatTable | None = None
+        self.on_sub_location_parsed : Callable[[str, SubLocation], None] | None = None #set by whoever holds the map (eg: the engine) to index sublocations parsed after the map was resolved.
 
     def to_dict(self) -> dict:
         map_data = {}
@@ -23,15 +132,187 @@ class Map():
             map_data["locations"][location_name] = self.locations[location_name].to_dict()
         return map_data
     
+    def stream_to(self, writer : JSONStreamWriter) -> None:
+        writer.begin_object()
+        writer.item("name", self.name)
+        writer.item("description", self.description)
+        writer.key("locations")
+        writer.begin_object()
+        for location_name, location in self.locations.items():
+            writer.key(location_name)
+            location.stream_to(writer)
+        writer.end_object()
+        writer.end_object()
+    
     def __str__(self) -> str:
         return str(self.to_dict())
     
+    def attach_stat_table(self, stat_table : StatTable) -> None:
+        #the player moves between maps all the time and keeps its own stats.
+        self.stat_table = verifier.verify_type(stat_table, StatTable, "stat_table")
+        for location in self.locations.values():
+            for _, sub_location in location.sub_locations.resident_items():
+                for entity in sub_location.entities.values():
+                    if not isinstance(entity, Player):
+                        stat_table.attach(entity)
+    
+class SubLocations(dict):
+    #sublocations evicted by SubLocationResidency are restored and ones not parsed from the map file yet are parsed the first time they are looked up.
+    __slots__ = ("location", )
+
+    def __init__(self, location : Location, sub_locations : dict[str, SubLocation]):
+        super().__init__(sub_locations)
+        self.location = location
+
+    def __missing__(self, sub_location_name : str) -> SubLocation:
+        if sub_location_name in self.location.evicted_sub_locations:
+            return self.location.residency.restore(self.location.evicted_sub_locations[sub_location_name])
+        if sub_location_name in self.location.unparsed_sub_locations:
+            return self.location.source.parse(location = self.location, sub_location_name = sub_location_name)
+        raise KeyError(sub_location_name)
+
+    #evicted and unparsed sublocations still count as being here, walking over them loads them. resident_items and get_resident never do.
+    def __contains__(self, sub_location_name : str) -> bool:
+        return super().__contains__(sub_location_name) or sub_location_name in self.location.evicted_sub_locations or sub_location_name in self.location.unparsed_sub_locations
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self.location.evicted_sub_locations) + len(self.location.unparsed_sub_locations)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def keys(self) -> list[str]:
+        return [*super().keys(), *self.location.evicted_sub_locations.keys(), *self.location.unparsed_sub_locations.keys()]
+
+    def values(self) -> list[SubLocation]:
+        return [self[sub_location_name] for sub_location_name in self.keys()]
+
+    def items(self) -> list[tuple[str, SubLocation]]:
+        return [(sub_location_name, self[sub_location_name]) for sub_location_name in self.keys()]
+
+    def get(self, sub_location_name : str, default : SubLocation | None = None) -> SubLocation | None:
+        return self[sub_location_name] if sub_location_name in self else default
+
+    def resident_items(self) -> ItemsView[str, SubLocation]:
+        return super().items()
+
+    def get_resident(self, sub_location_name : str) -> SubLocation | None:
+        return super().get(sub_location_name)
+
+class SubLocationEntities(dict):
+    #entity id -> entity, also indexed by tag. Tag lookups are intersections of the matching id sets and come back in the same order as the dict.
+    __slots__ = ("by_tag", "order", "next_order")
+
+    def __init__(self, entities : dict[str, Entity] | None = None):
+        super().__init__()
+        self.by_tag : dict[str, dict[str, None]] = {} #tag -> ids of entities having it, kept as an insertion ordered set.
+        self.order : dict[str, int] = {} #entity id -> when it was added.
+        self.next_order = 0
+        for entity_id, entity in (entities or {}).items():
+            self[entity_id] = entity
+
+    def _index(self, entity_id : str, entity : Entity) -> None:
+        for tag in entity.tags:
+            if tag in self.by_tag:
+                self.by_tag[tag][entity_id] = None
+            else:
+                self.by_tag[tag] = {entity_id : None}
+
+    def _unindex(self, entity_id : str, entity : Entity) -> None:
+        for tag in entity.tags:
+            ids = self.by_tag.get(tag)
+            if ids is not None:
+                ids.pop(entity_id, None)
+                if not ids:
+                    del self.by_tag[tag]
+
+    def __setitem__(self, entity_id : str, entity : Entity) -> None:
+        if entity_id in self: #replaced in place, like a plain dict.
+            self._unindex(entity_id, self[entity_id])
+        else:
+            self.order[entity_id] = self.next_order
+            self.next_order += 1
+        super().__setitem__(entity_id, entity)
+        self._index(entity_id, entity)
+
+    def __delitem__(self, entity_id : str) -> None:
+        entity = super().pop(entity_id)
+        del self.order[entity_id]
+        self._unindex(entity_id, entity)
+
+    def pop(self, entity_id : str, *default) -> Entity:
+        if not entity_id in self:
+            if default:
+                return default[0]
+            raise KeyError(entity_id)
+        entity = self[entity_id]
+        del self[entity_id]
+        return entity
+
+    def clear(self) -> None:
+        super().clear()
+        self.by_tag.clear()
+        self.order.clear()
+
+    def popitem(self) -> tuple[str, Entity]:
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        entity_id = next(reversed(self))
+        return entity_id, self.pop(entity_id)
+
+    def setdefault(self, entity_id : str, entity : Entity) -> Entity:
+        if not entity_id in self:
+            self[entity_id] = entity
+        return self[entity_id]
+
+    def update(self, *args, **kwargs) -> None:
+        for entity_id, entity in dict(*args, **kwargs).items():
+            self[entity_id] = entity
+
+    def __ior__(self, other : dict[str, Entity]) -> SubLocationEntities:
+        self.update(other)
+        return self
+
+    def copy(self) -> SubLocationEntities:
+        return SubLocationEntities(self)
+
+    def __reduce__(self) -> tuple:
+        #the tag index is rebuilt from the entities instead of being pickled with them.
+        return (SubLocationEntities, (dict(self), ))
+
+    def get_ids_with_tags(self, tags : tuple[str, ...] | list[str]) -> list[str]:
+        #ids of entities having every one of tags, no tags matches everyone.
+        if not tags:
+            return list(self.keys())
+        id_sets = []
+        for tag in tags:
+            ids = self.by_tag.get(tag)
+            if ids is None:
+                return []
+            id_sets.append(ids)
+        id_sets.sort(key = len)
+        smallest, rest = id_sets[0], id_sets[1:]
+        return sorted((entity_id for entity_id in smallest if all(entity_id in ids for ids in rest)), key = self.order.__getitem__)
+
+    def with_tags(self, tags : tuple[str, ...] | list[str]) -> list[Entity]:
+        return [self[entity_id] for entity_id in self.get_ids_with_tags(tags)]
+
+    def with_tag(self, tag : str) -> list[Entity]:
+        return self.with_tags((tag, ))
+
+    def has_tag(self, tag : str) -> bool:
+        return tag in self.by_tag
+
 class Location():
     def __init__(self, name : str, sub_locations : dict[str, SubLocation] = None, description : str = "A Location."):
         self.name = verifier.verify_type(name, str, "name")
-        self.sub_locations = verifier.verify_type(sub_locations, dict, "sub_locations", True) or {}
+        self.sub_locations = SubLocations(self, verifier.verify_type(sub_locations, dict, "sub_locations", True) or {})
         self.description = verifier.verify_type(description, str, "description")
-        self.tags = []
+        self.tags = TagList()
+        self.residency : SubLocationResidency | None = None
+        self.evicted_sub_locations : dict[str, str] = {} #sublocation name : path, their data lives in the residency cache.
+        self.unparsed_sub_locations : dict[str, tuple[int, int]] = {} #sublocation name : (start, end) of its config in the map file of source.
+        self.source : SubLocationSource | None = None
 
     def to_dict(self) -> dict:
         location_data = {}
@@ -39,19 +320,42 @@ class Location():
         location_data["description"] = self.description
         location_data["tags"] = self.tags
         location_data["sub_locations"] = {}
-        for sub_location_name in self.sub_locations.keys():
-            location_data["sub_locations"][sub_location_name] = self.sub_locations[sub_location_name].to_dict()
+        for sub_location_name, sub_location in self.sub_locations.resident_items():
+            location_data["sub_locations"][sub_location_name] = sub_location.to_dict()
+        for sub_location_name, path in self.evicted_sub_locations.items():
+            location_data["sub_locations"][sub_location_name] = json.loads(self.residency.read_text(path))
+        for sub_location_name, span in self.unparsed_sub_locations.items():
+            location_data["sub_locations"][sub_location_name] = json.loads(self.source.map_index.read_text(span))
         return location_data
+    
+    def stream_to(self, writer : JSONStreamWriter) -> None:
+        writer.begin_object()
+        writer.item("name", self.name)
+        writer.item("description", self.description)
+        writer.item("tags", self.tags)
+        writer.key("sub_locations")
+        writer.begin_object()
+        for sub_location_name, sub_location in self.sub_locations.resident_items():
+            writer.key(sub_location_name)
+            sub_location.stream_to(writer)
+        for sub_location_name, path in self.evicted_sub_locations.items():
+            writer.key(sub_location_name)
+            writer.raw(self.residency.read_text(path)) #already written by SubLocation.stream_to, copied as is.
+        for sub_location_name, span in self.unparsed_sub_locations.items():
+            writer.key(sub_location_name)
+            writer.raw(self.source.map_index.read_text(span)) #still the map file's config, loading the save parses it the same way.
+        writer.end_object()
+        writer.end_object()
         
 class SubLocation():
     def __init__(self, name : str, entities : dict[str, Entity] = None, inventory : Inventory = None, description : str = "A Place."):
         self.name = verifier.verify_type(name, str, "name")
-        self.entities : dict[str, Entity]= verifier.verify_type(entities, dict, "entities", True) or {}
+        self.entities = SubLocationEntities(verifier.verify_type(entities, dict, "entities", True))
         self.inventory = verifier.verify_type(inventory, Inventory, "inventory", True) or Inventory(float("inf"))
         self.description = verifier.verify_type(description, str, "description")
         self.location_events = [] #Map results. events that should be fired multiple times should contain a tag Literal["repetitive"]. if tag is not provided or tag is not repetitive then it's automatically discarded.
         self.exits = {}
-        self.tags = []
+        self.tags = TagList()
     
     def to_dict(self) -> dict:
         sub_location_data = {}
@@ -69,9 +373,98 @@ class SubLocation():
             sub_location_data["entities"]["load"].append(entity_data)
         return sub_location_data
     
+    def stream_to(self, writer : JSONStreamWriter) -> None:
+        writer.begin_object()
+        for attribute_name in ["name", "description", "exits", "tags", "location_events"]:
+            writer.item(attribute_name, getattr(self, attribute_name))
+        writer.key("inventory")
+        writer.begin_object()
+        writer.key("load")
+        self.inventory.stream_to(writer)
+        writer.end_object()
+        writer.key("entities")
+        writer.begin_object()
+        writer.key("load")
+        writer.begin_array()
+        for entity in self.entities.values():
+            entity.stream_to(writer)
+        writer.end_array()
+        writer.end_object()
+        writer.end_object()
+    
     def add_entity(self, entity : Entity) -> None:
         self.entities[entity.id] = entity
     
+class MapFileIndex():
+    #where every location and sublocation of a map file sits, found by a single scan that decodes nothing but keys. Only the parts asked for are read back and parsed.
+    def __init__(self, path : str):
+        self.path = verifier.verify_type(path, str, "path")
+        if os.path.getsize(path) == 0: #mmap refuses empty files.
+            raise ValueError(f"Map file \"{path}\" is empty.")
+        with open(path, "rb") as map_file, mmap.mmap(map_file.fileno(), 0, access = mmap.ACCESS_READ) as buffer:
+            scanner = JSONSpanScanner(buffer)
+            map_fields, _ = scanner.scan_object()
+            self._verify_fields(map_fields, ["name", "description", "locations"], path)
+            self.name : str = intern_string(scanner.read(map_fields["name"]))
+            self.description_span = map_fields["description"]
+            self.locations : dict[str, dict[str, tuple[int, int]]] = {} #location name -> field name -> (start, end), sublocations not included.
+            self.sub_location_spans : dict[str, dict[str, tuple[int, int]]] = {} #location name -> sublocation name -> (start, end) of its whole config.
+            self.sub_location_fields : dict[str, dict[str, dict[str, tuple[int, int]]]] = {} #location name -> sublocation name -> field name -> (start, end).
+            location_spans, _ = scanner.scan_object(map_fields["locations"][0])
+            for location_name, (location_start, _) in location_spans.items():
+                location_fields, _ = scanner.scan_object(location_start)
+                self._verify_fields(location_fields, ["description", "tags", "sub_locations"], f"{path} -> {location_name}")
+                sub_location_spans, _ = scanner.scan_object(location_fields.pop("sub_locations")[0])
+                self.locations[location_name] = location_fields
+                self.sub_location_spans[location_name] = sub_location_spans
+                self.sub_location_fields[location_name] = {sub_location_name : scanner.scan_object(sub_location_start)[0] for sub_location_name, (sub_location_start, _) in sub_location_spans.items()}
+
+    def _verify_fields(self, fields : dict, required_keys : list[str], where : str) -> None:
+        for required_key in required_keys:
+            if not required_key in fields:
+                raise KeyError(f"\"{required_key}\" is expected to be in \"{where}\".")
+
+    @contextlib.contextmanager
+    def reader(self) -> Iterator[Callable[[tuple[int, int]], Any]]:
+        #one open file for a batch of reads, each read parses a single span.
+        with open(self.path, "rb") as map_file:
+            def read(span : tuple[int, int]) -> Any:
+                map_file.seek(span[0])
+                return json.loads(map_file.read(span[1] - span[0]))
+            yield read
+
+    def read_sub_location(self, location_name : str, sub_location_name : str) -> dict:
+        with self.reader() as read:
+            return read(self.sub_location_spans[location_name][sub_location_name])
+
+    def read_text(self, span : tuple[int, int]) -> str:
+        with open(self.path, "rb") as map_file:
+            map_file.seek(span[0])
+            return map_file.read(span[1] - span[0]).decode("utf-8")
+
+class SubLocationSource():
+    #the map file a resolved map came from, its sublocations are parsed one at a time on their first lookup.
+    def __init__(self, game_map : Map, map_index : MapFileIndex, load_sub_location : Callable[[str, dict], SubLocation]):
+        self.game_map = verifier.verify_type(game_map, Map, "game_map")
+        self.map_index = verifier.verify_type(map_index, MapFileIndex, "map_index")
+        if not callable(load_sub_location):
+            raise TypeError(f"load_sub_location must be callable, not \"{type(load_sub_location).__name__}\".")
+        self.load_sub_location = load_sub_location
+
+    def parse(self, location : Location, sub_location_name : str) -> SubLocation:
+        span = location.unparsed_sub_locations[sub_location_name]
+        with self.map_index.reader() as read:
+            sub_location = self.load_sub_location(sub_location_name, read(span))
+        location.unparsed_sub_locations.pop(sub_location_name)
+        location.sub_locations[sub_location_name] = sub_location
+        if self.game_map.stat_table is not None:
+            for entity in sub_location.entities.values():
+                if not isinstance(entity, Player):
+                    self.game_map.stat_table.attach(entity)
+        if self.game_map.on_sub_location_parsed is not None:
+            self.game_map.on_sub_location_parsed(f"{self.game_map.name}/{location.name}/{sub_location_name}", sub_location)
+        return sub_location
+
 class MapLoader():
     def __init__(self, path : str, item_spawner : ItemsSpawner, table_resolver : TableResolver, entity_loader : EntityLoader,):
         verifier.verify_type(path, str, "path")
@@ -83,7 +476,7 @@ class MapLoader():
         self.entity_loader = entity_loader
         self.TABLE_HANDLERS = {"static" : self.table_resolver.resolve_static_by_name, "dynamic" : self.table_resolver.resolve_dynamic_by_name}
         self.ITEM_HANDLERS = {"spawn" : {"instanced" : self.item_spawner.spawn_new_item_from_dict, "stacked" : self.item_spawner.spawn_new_stack_from_dict}, "load" : {"instanced" : self.item_spawner.load_item_from_dict, "stacked" : self.item_spawner.load_stack_from_dict}}
-        self.ENTITY_HANDLERS = {"spawn" : self.entity_loader.spawn_entity, "load" : self.entity_loader.load_entity}
+        self.ENTITY_HANDLERS = {"spawn" : self.entity_loader.spawn_many, "load" : self.entity_loader.load_entity}
         self.initialize_maps(path = path)
         
     def _resolve_entities(self, data : dict) -> dict[str, Entity]:
@@ -98,8 +491,7 @@ class MapLoader():
                         for entity_template_name in data[resolving_type][entity_type].keys():
                             number_to_load = data[resolving_type][entity_type][entity_template_name]
                             verifier.verify_non_negative(number_to_load, "number_to_load")
-                            for _ in range(int(number_to_load)):
-                                entity = self.ENTITY_HANDLERS[resolving_type](entity_type = entity_type, entity_template_name = entity_template_name)
+                            for entity in self.ENTITY_HANDLERS[resolving_type](entity_type = entity_type, entity_template_name = entity_template_name, amount = int(number_to_load)):
                                 entities[entity.id] = entity
                 else:
                     for entity_data in data[resolving_type]:
@@ -136,23 +528,36 @@ class MapLoader():
                 if inventory.money.is_empty():
                     inventory.money = item
                 else:
-                    inventory.money.add(item, delete_other = True)
+                    inventory.money.add(item, clear_other = True)
         
         return inventory
     
     def initialize_maps(self, path : str):
         verifier.verify_is_dir(path, "path")
         configs = os.listdir(path)
-        map_configs = {}
+        map_indexes = {}
         
         print("[MapSystem] Initializing maps...")
         
         for config in configs:
-            print(f"[MapSystem] Initializing map from {config}...")
-            with open(f"{path}/{config}") as config:
-                config = json.load(config)
-                map_configs[config["name"]] = config
-        self.maps = map_configs
+            print(f"[MapSystem] Indexing map from {config}...")
+            map_index = MapFileIndex(f"{path}/{config}")
+            map_indexes[map_index.name] = map_index
+        self.map_indexes = map_indexes
+    
+    def load_sub_location(self, sub_location_name : str, config : dict) -> SubLocation:
+        verifier.verify_type(config, dict, "config")
+        sub_location_description = config["description"]
+        entities = self._resolve_entities(data = config["entities"])
+        inventory = self._resolve_inventory(data = config["inventory"])
+        exits = verifier.verify_type(config["exits"], dict, "exits")
+        tags = verifier.verify_type(config["tags"], list, "tags")
+        location_events = [verifier.verify_type(location_event, dict, "location_event") for location_event in config["location_events"]]
+        sub_location = SubLocation(name = sub_location_name, entities = entities, inventory = inventory, description = sub_location_description)
+        sub_location.location_events = location_events
+        sub_location.tags = TagList(tags)
+        sub_location.exits = exits
+        return sub_location
     
     def load_map_state(self, config : dict) -> Map:
         verifier.verify_type(config, dict, "config")
@@ -164,23 +569,70 @@ class MapLoader():
             location_tags = config["locations"][location_name]["tags"]
             sub_locations = {}
             for sub_location_name in config["locations"][location_name]["sub_locations"].keys():
-                sub_location_description = config["locations"][location_name]["sub_locations"][sub_location_name]["description"]
-                entities = self._resolve_entities(data = config["locations"][location_name]["sub_locations"][sub_location_name]["entities"])
-                inventory = self._resolve_inventory(data = config["locations"][location_name]["sub_locations"][sub_location_name]["inventory"])
-                exits = verifier.verify_type(config["locations"][location_name]["sub_locations"][sub_location_name]["exits"], dict, "exits")
-                tags = verifier.verify_type(config["locations"][location_name]["sub_locations"][sub_location_name]["tags"], list, "tags")
-                location_events = [verifier.verify_type(location_event, dict, "location_event") for location_event in config["locations"][location_name]["sub_locations"][sub_location_name]["location_events"]]
-                sub_locations[sub_location_name] = SubLocation(name = sub_location_name, entities = entities, inventory = inventory, description = sub_location_description)
-                sub_locations[sub_location_name].location_events = location_events
-                sub_locations[sub_location_name].tags = tags
-                sub_locations[sub_location_name].exits = exits
+                sub_locations[sub_location_name] = self.load_sub_location(sub_location_name = sub_location_name, config = config["locations"][location_name]["sub_locations"][sub_location_name])
             locations[location_name] = Location(name = location_name, sub_locations=sub_locations, description=location_description)
-            locations[location_name].tags = location_tags
+            locations[location_name].tags = TagList(location_tags)
+        return Map(name = map_name, locations = locations, description = map_description)
+    
+    def _load_location_from_stream(self, location_name : str, reader : JSONStreamReader) -> Location:
+        location_description = "A Location."
+        location_tags = []
+        sub_locations = {}
+        for key in reader.iter_object():
+            if key == "sub_locations":
+                for sub_location_name in reader.iter_object():
+                    sub_locations[sub_location_name] = self.load_sub_location(sub_location_name = sub_location_name, config = reader.read_value())
+            elif key == "description":
+                location_description = reader.read_value()
+            elif key == "tags":
+                location_tags = verifier.verify_type(reader.read_value(), list, "tags")
+            else:
+                reader.skip_value()
+        location = Location(name = location_name, sub_locations = sub_locations, description = location_description)
+        location.tags = TagList(location_tags)
+        return location
+    
+    def load_map_state_from_stream(self, reader : JSONStreamReader) -> Map:
+        #builds the map one sublocation at a time, only a single sublocation's raw config is ever held in memory.
+        verifier.verify_type(reader, JSONStreamReader, "reader")
+        map_name = None
+        map_description = "A Map."
+        locations = {}
+        for key in reader.iter_object():
+            if key == "locations":
+                for location_name in reader.iter_object():
+                    locations[location_name] = self._load_location_from_stream(location_name = location_name, reader = reader)
+            elif key == "name":
+                map_name = reader.read_value()
+            elif key == "description":
+                map_description = reader.read_value()
+            else:
+                reader.skip_value()
+        if map_name is None:
+            raise KeyError("Map stream is expected to contain key \"name\".")
         return Map(name = map_name, locations = locations, description = map_description)
     
+    def load_map_state_from_file(self, path : str) -> Map:
+        with open(path, encoding = "utf-8") as map_file:
+            return self.load_map_state_from_stream(reader = JSONStreamReader(map_file))
+    
     def resolve_map(self, map_name : str) -> Map:
+        #only the map's locations are read here, every sublocation is parsed out of the file on its first lookup.
         verifier.verify_type(map_name, str, "map_name")
-        if not hasattr(self, "maps"):
+        if not hasattr(self, "map_indexes"):
             raise ValueError("Maps not initialized. Use initialize_maps method to initialize maps.")
-        config = self.maps[map_name]
-        return self.load_map_state(config = config)
\ No newline at end of file
+        if not map_name in self.map_indexes:
+            raise KeyError(f"No map by the name of \"{map_name}\" exists.")
+        map_index = self.map_indexes[map_name]
+        locations = {}
+        with map_index.reader() as read:
+            for location_name, location_fields in map_index.locations.items():
+                locations[location_name] = Location(name = location_name, description = read(location_fields["description"]))
+                locations[location_name].tags = TagList(read(location_fields["tags"]))
+                locations[location_name].unparsed_sub_locations = dict(map_index.sub_location_spans[location_name])
+            map_description = read(map_index.description_span)
+        game_map = Map(name = map_index.name, locations = locations, description = map_description)
+        source = SubLocationSource(game_map = game_map, map_index = map_index, load_sub_location = self.load_sub_location)
+        for location in locations.values():
+            location.source = source
+        return game_map
\ No newline at end of file
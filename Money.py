@@ -1,26 +1,172 @@
 from __future__ import annotations
 import os
 import json
+import math
+from collections import OrderedDict
+
+import numpy as np
+
 from GeneralVerifier import verifier
 
 class Currency():
+    #every distinct (name, value) gets the next id the first time it is created, CurrencyLoader creates them in load order. Money wallets are arrays indexed by these ids.
+    IDS : dict[tuple[str, int], int] = {}
+    REGISTERED : list[Currency] = []
+    VALUES = np.zeros(0, dtype = np.int64) #currency id -> value.
+    ORDER : list[int] = [] #currency ids from the most to the least valuable.
+
     def __init__(self, name : str, value : int, description : str = "A currency."):
         self.name = verifier.verify_type(name, str, "name")
         self.value = verifier.verify_positive(value, "value")
         self.description = verifier.verify_type(description, str, "description")
+        self.id = Currency.register(self)
+
+    @staticmethod
+    def register(currency : Currency) -> int:
+        key = (currency.name, currency.value)
+        if key in Currency.IDS:
+            return Currency.IDS[key]
+        currency_id = len(Currency.REGISTERED)
+        Currency.IDS[key] = currency_id
+        Currency.REGISTERED.append(currency)
+        Currency.VALUES = np.append(Currency.VALUES, np.int64(currency.value))
+        Currency.ORDER = sorted(range(len(Currency.REGISTERED)), key = lambda registered_id : Currency.REGISTERED[registered_id].value, reverse = True)
+        return currency_id
 
     def __eq__(self, other):
-        return (isinstance(other, Currency) and (self.name == other.name) and (self.value == other.value))
+        return (isinstance(other, Currency) and (self.id == other.id))
     
     def __hash__(self):
-        return hash((self.name, self.value))
+        return self.id
     
+class ChangeMaker():
+    #finds the exact payment using the fewest coins. Solutions ignoring the wallet's amounts are memoized per (denominations, value), the bounded knapsack only runs when the wallet can't cover that solution.
+    INFINITY = float("inf")
+
+    def __init__(self, max_memoized : int = 4096):
+        self.max_memoized = verifier.verify_positive(max_memoized, "max_memoized")
+        self.solutions : OrderedDict[tuple[tuple[int, ...], int], tuple[int, ...] | None] = OrderedDict() #least recently used first.
+        self.remainder_tables : dict[tuple[int, ...], tuple[list[int | float], list[int]]] = {}
+
+    def _get_remainder_table(self, denominations : tuple[int, ...], value : int) -> tuple[list[int | float], list[int]]:
+        #fewest coins of every denomination but the largest for each value up to min(value, limit), grown on demand. An optimal payment never holds as many coins of a smaller denomination as the largest one is worth, so nothing past the limit is needed.
+        largest = denominations[0]
+        limit = sum((largest - 1) * denomination for denomination in denominations[1:])
+        if not denominations in self.remainder_tables:
+            self.remainder_tables[denominations] = ([0], [0])
+        coins, last_used = self.remainder_tables[denominations]
+        for current_value in range(len(coins), min(value, limit) + 1):
+            best_coins = ChangeMaker.INFINITY
+            best_index = 0
+            for index in range(1, len(denominations)):
+                denomination = denominations[index]
+                if denomination <= current_value and coins[current_value - denomination] + 1 < best_coins:
+                    best_coins = coins[current_value - denomination] + 1
+                    best_index = index
+            coins.append(best_coins)
+            last_used.append(best_index)
+        return coins, last_used
+
+    def _solve_unbounded(self, denominations : tuple[int, ...], value : int) -> tuple[int, ...] | None:
+        key = (denominations, value)
+        if key in self.solutions:
+            self.solutions.move_to_end(key)
+            return self.solutions[key]
+        coins, last_used = self._get_remainder_table(denominations, value)
+        largest = denominations[0]
+        best_remainder = None
+        best_coins = ChangeMaker.INFINITY
+        for remainder in range(value % largest, min(value, len(coins) - 1) + 1, largest):
+            total_coins = coins[remainder] + (value - remainder) // largest
+            if total_coins < best_coins:
+                best_remainder = remainder
+                best_coins = total_coins
+        solution = None
+        if best_remainder is not None:
+            counts = [0] * len(denominations)
+            counts[0] = (value - best_remainder) // largest
+            while best_remainder:
+                counts[last_used[best_remainder]] += 1
+                best_remainder -= denominations[last_used[best_remainder]]
+            solution = tuple(counts)
+        self.solutions[key] = solution
+        if len(self.solutions) > self.max_memoized:
+            self.solutions.popitem(last = False)
+        return solution
+
+    def _solve_bounded(self, denominations : tuple[int, ...], amounts : tuple[int, ...], value : int) -> tuple[int, ...] | None:
+        #0/1 knapsack over the amounts split into powers of two, so every amount from 0 to the available one can still be picked.
+        parts = []
+        for index, (denomination, amount) in enumerate(zip(denominations, amounts)):
+            amount = min(amount, value // denomination)
+            part = 1
+            while amount > 0:
+                part = min(part, amount)
+                parts.append((index, part, denomination * part))
+                amount -= part
+                part *= 2
+        coins = [0] + [ChangeMaker.INFINITY] * value
+        taken = []
+        for index, part, part_value in parts:
+            taken_here = bytearray(value + 1)
+            for current_value in range(value, part_value - 1, -1):
+                if coins[current_value - part_value] + part < coins[current_value]:
+                    coins[current_value] = coins[current_value - part_value] + part
+                    taken_here[current_value] = 1
+            taken.append(taken_here)
+        if coins[value] == ChangeMaker.INFINITY:
+            return None
+        counts = [0] * len(denominations)
+        for (index, part, part_value), taken_here in zip(reversed(parts), reversed(taken)):
+            if taken_here[value]:
+                counts[index] += part
+                value -= part_value
+        return tuple(counts)
+
+    def solve(self, denominations : tuple[int, ...], amounts : tuple[int, ...], value : int) -> tuple[int, ...] | None:
+        #denominations must be distinct and sorted from largest to smallest. Returns how many of each to pay, or None if value can't be paid exactly.
+        if value == 0:
+            return tuple(0 for _ in denominations)
+        divisor = math.gcd(*denominations)
+        if value % divisor != 0 or sum(denomination * amount for denomination, amount in zip(denominations, amounts)) < value:
+            return None
+        denominations = tuple(denomination // divisor for denomination in denominations)
+        value //= divisor
+        solution = self._solve_unbounded(denominations, value)
+        if solution is None:
+            return None
+        if all(count <= amount for count, amount in zip(solution, amounts)):
+            return solution
+        return self._solve_bounded(denominations, amounts, value)
+
 class Money():
+    CHANGE_MAKER = ChangeMaker()
+
     def __init__(self, money : dict[Currency, int] | None = None):
-        if money is None:
-            money = {}
+        self.amounts = np.zeros(len(Currency.REGISTERED), dtype = np.int64) #currency id -> amount.
+        if money is not None:
+            self.amounts = self._to_amounts(money)
+
+    def _fit(self) -> np.ndarray:
+        #currencies registered after this wallet was made start at 0.
+        if len(self.amounts) < len(Currency.REGISTERED):
+            self.amounts = np.concatenate((self.amounts, np.zeros(len(Currency.REGISTERED) - len(self.amounts), dtype = np.int64)))
+        return self.amounts
+
+    def _to_amounts(self, money : Money | dict[Currency, int]) -> np.ndarray:
+        if isinstance(money, Money):
+            return money._fit()
         self.verify_money(money)
-        self.money = money
+        amounts = np.zeros(len(Currency.REGISTERED), dtype = np.int64)
+        for currency, amount in money.items():
+            amounts[currency.id] += amount
+        return amounts
+
+    @property
+    def money(self) -> dict[Currency, int]:
+        #currencies held, from the most to the least valuable.
+        amounts = self._fit()
+        return {Currency.REGISTERED[currency_id] : int(amounts[currency_id]) for currency_id in Currency.ORDER if amounts[currency_id]}
         
     def verify_money(self, money : dict[Currency, int]) -> None:
         verifier.verify_type(money, dict, "money")
@@ -29,65 +175,69 @@ class Money():
             verifier.verify_non_negative(money[currency], "amount")
 
     def is_empty(self) -> bool:
-        return (len(self.money) == 0)
+        return not self.amounts.any()
     
-    def add(self, other : Money, clear_other : bool = False) -> None:
-        verifier.verify_type(other, Money, "other")
-        for currency in other.money:
-            if currency in self.money:
-                self.money[currency] += other.money[currency]
-            else:
-                self.money[currency] = other.money[currency]
-        if clear_other:
+    def add(self, other : Money | dict[Currency, int], clear_other : bool = False) -> None:
+        verifier.verify_type(other, (Money, dict), "other")
+        self._fit()
+        self.amounts += self._to_amounts(other)
+        if clear_other and isinstance(other, Money):
             other.clear()
     
-    def has_money(self, money : dict[Currency, int]) -> bool:
-        self.verify_money(money)
-        for currency, amount in money.items():
-            if currency not in self.money or self.money[currency] < amount:
-                    return False
-        return True
+    def has_money(self, money : Money | dict[Currency, int]) -> bool:
+        return bool((self._fit() >= self._to_amounts(money)).all())
     
     def get_total_value(self) -> int:
-        total_value = 0
-        for currency in self.money:
-            total_value += currency.value * self.money[currency]
-        return total_value
+        return int(self._fit() @ Currency.VALUES)
     
     def can_adjust(self, value : int, currencies : list[Currency]) -> dict[str, bool | dict[Currency, int]]:
-        currency_dict = {}
-        currency_use = {}
-        for currency in currencies:
-            if currency in self.money:
-                currency_dict[currency] = self.money[currency]
-        if len(currency_dict) == 0:
+        #pays exactly value with the fewest coins of the given currencies. Currencies of equal value are spent in wallet order.
+        value = verifier.verify_non_negative(value, "value")
+        accepted_ids = {currency.id for currency in currencies}
+        wallet = self._fit()
+        denominations = []
+        amounts = []
+        currencies_by_value : dict[int, list[int]] = {}
+        for currency_id in Currency.ORDER:
+            amount = int(wallet[currency_id])
+            if not currency_id in accepted_ids or amount == 0:
+                continue
+            currency_value = Currency.REGISTERED[currency_id].value
+            if currency_value in currencies_by_value:
+                currencies_by_value[currency_value].append(currency_id)
+                amounts[-1] += amount
+            else:
+                currencies_by_value[currency_value] = [currency_id]
+                denominations.append(currency_value)
+                amounts.append(amount)
+        if len(denominations) == 0:
             return {"can_adjust" : False, "cost" : {}}
-        if sum([currency.value * currency_amount for currency, currency_amount in currency_dict.items()]) < value:
+        solution = Money.CHANGE_MAKER.solve(tuple(denominations), tuple(amounts), value)
+        if solution is None:
             return {"can_adjust" : False, "cost" : {}}
-        currency_dict = dict(sorted(currency_dict.items(), key=lambda item: item[0].value, reverse = True))
-        for currency in currency_dict.keys():
-            amount = currency_dict[currency]
-            currency_value = currency.value
-            if currency_value <= value:
-                amount_needed = value // currency_value
-                if amount_needed > amount:
-                    amount_needed = amount
-                currency_use[currency] = amount_needed
-                value -= currency_use[currency] * currency_value
-                if value == 0:
-                    return {"can_adjust" : True, "cost" : currency_use}
-        return {"can_adjust" : False, "cost" : {}}
+        currency_use = {}
+        for denomination, count in zip(denominations, solution):
+            for currency_id in currencies_by_value[denomination]:
+                if count == 0:
+                    break
+                amount_used = min(count, int(wallet[currency_id]))
+                currency_use[Currency.REGISTERED[currency_id]] = amount_used
+                count -= amount_used
+        return {"can_adjust" : True, "cost" : currency_use}
     
-    def remove(self, money : dict[Currency, int]) -> None:
-        for currency in money.keys():
-            if not currency in self.money:
+    def remove(self, money : Money | dict[Currency, int]) -> None:
+        wallet = self._fit()
+        amounts = self._to_amounts(money)
+        missing = np.flatnonzero(wallet < amounts)
+        if len(missing):
+            currency = Currency.REGISTERED[missing[0]]
+            if wallet[currency.id] == 0:
                 raise KeyError(f"Currency \"{currency.name}\" not found.")
-            if (self.money[currency] - money[currency]) < 0:
-                raise ValueError(f"Money can't be negative. Use debt system (if implemented).")
-            self.money[currency] -= money[currency]
+            raise ValueError(f"Money can't be negative. Use debt system (if implemented).")
+        wallet -= amounts
     
     def clear(self) -> None:
-        self.money = {}
+        self.amounts = np.zeros(len(Currency.REGISTERED), dtype = np.int64)
     
     def to_dict(self) -> dict:
         return {currency.name : amount for currency, amount in self.money.items()}
@@ -127,13 +277,12 @@ class MoneyLoader():
     def load_money(self, money : dict) -> Money:
         money = verifier.verify_type(money, dict, "money")
         
-        currency_dict = {}
+        loaded_money = Money()
         
         for currency in money.keys():
             if not currency in self.currency_loader.currencies:
                 raise KeyError(f"There is no such currency as \"{currency}\" in the currency loader.")
-            amount = verifier.verify_type(money[currency], int, "amount")
-            currency = self.currency_loader.currencies[currency]
-            currency_dict[currency] = amount
+            amount = verifier.verify_non_negative(verifier.verify_type(money[currency], int, "amount"), "amount")
+            loaded_money.amounts[self.currency_loader.currencies[currency].id] += amount
         
-        return Money(currency_dict)
\ No newline at end of file
+        return loaded_money
\ No newline at end of file
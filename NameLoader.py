@@ -1,9 +1,11 @@
 from GeneralVerifier import verifier
+from Identifiers import intern_string
 import random
 
 class NamesLoader(object):
-    def __init__(self, path : str):
+    def __init__(self, path : str, rng : random.Random | None = None):
         verifier.verify_type(path, str, "path")
+        self.rng = random.Random() if rng is None else verifier.verify_type(rng, random.Random, "rng")
         self.initialize_names(path = path)
     
     def initialize_names(self, path : str):
@@ -11,7 +13,10 @@ class NamesLoader(object):
         print("[Init] Initializing names...")
         
         with open(path, encoding = "utf-8") as names_file:
-            self.names = list(set(names_file.readlines()))
+            self.names = sorted(set(intern_string(name.strip().capitalize()) for name in names_file.readlines())) #cleaned and interned once so every entity sharing a name shares the string, sorted so a seed picks the same names in every run.
     
     def get_random_name(self) -> str:
-        return random.choice(self.names).strip().capitalize()
\ No newline at end of file
+        return self.rng.choice(self.names)
+    
+    def get_random_names(self, amount : int) -> list[str]:
+        return self.rng.choices(self.names, k = amount)
\ No newline at end of file
@@ -6,6 +6,9 @@ if TYPE_CHECKING:
     from Combat import CombatState
 
 class DamagePacket():
+    __slots__ = ("slash", "pierce", "crush")
+    FIELDS = __slots__
+    
     def __init__(self, slash : int | float = 0, pierce : int | float = 0, crush : int | float = 0):
         self.slash = slash
         self.pierce = pierce
@@ -15,6 +18,8 @@ class DamagePacket():
         return self.slash + self.pierce + self. crush
 
 class DefensePacket():
+    __slots__ = ("strength", "penetration_resistance", "decay")
+    
     def __init__(self, strength : int | float, penetration_resistance : int | float, decay : int | float):
         self.strength = strength
         self.penetration_resistance = penetration_resistance
@@ -44,6 +49,7 @@ class DefensePacket():
         return damage
 
 class ModifierPacket():
+    __slots__ = ("attribute", "modifier")
     ALLOWED_ATTRIBUTES = {"melee_weapons_damage", "ranged_weapons_damage", "melee_technique_damage", "ranged_technique_damage", "stamina_regen", "qi_regen", "soul_regen", "essence_regen", "strength", "vitality", "agility", "endurance"}
     def __init__(self, attribute : str, modifier : int | float):
         self.attribute = attribute
@@ -63,12 +69,14 @@ class ModifierPacket():
     def apply(self, item : DamagePacket | int | float) -> DamagePacket | int | float:
         if isinstance(item, DamagePacket):
             new_packet = DamagePacket()
-            for var in vars(item):
+            for var in item.FIELDS:
                 setattr(new_packet, var, (getattr(item, var) * self.modifier))
             return new_packet
         return item * self.modifier
 
 class ActionPacket():
+    __slots__ = ("action", "origin", "target", "technique", "stamina", "qi", "soul", "essence")
+    
     def __init__(self, action : str, origin : CombatState, target : CombatState, technique : Technique = None, stamina : int = None, qi : int = None, soul : int = None, essence : int = None):
         self.action = action
         self.origin = origin
@@ -80,6 +88,8 @@ class ActionPacket():
         self.essence = essence
 
 class EffectPacket():
+    __slots__ = ("effect_class", "attribute", "strength", "origin", "ending_time")
+    
     def __init__(self, effect_class : Literal["buff", "debuff", "utility"], attribute : str, strength : int | float, origin : CombatState, ending_time : WorldTimeStamp):
         self.effect_class = effect_class
         self.attribute = attribute
@@ -100,6 +110,8 @@ class EffectPacket():
         modifier_packet_pool.add(modifier_packet)
 
 class ModifierPacketPool():
+    __slots__ = ("pool", )
+    
     def __init__(self, pool : dict[str, ModifierPacket] | None = None):
         self.pool = pool or {}
     
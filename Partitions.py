@@ -0,0 +1,323 @@
+import os
+import sys
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import Any
+
+from GeneralVerifier import verifier
+from NameLoader import NamesLoader
+from Items import ItemsLoader, ItemsSpawner, ItemRegistry
+from Money import CurrencyLoader, MoneyLoader
+from TableLoader import TablesLoader, TableResolver
+from Dialogue import DialogueLoader, InteractionLoader
+from Cultivation import CultivationCreator, CultivationLoader, CultivationCalculator
+from Stats import BasicStatCalculator
+from Techniques import TechniqueLoader
+from Entities import Entity, Player, EntityLoader, EntityRegistry
+from Identifiers import IdAllocator, ReservedIdAllocator
+from JSONStream import JSONStreamWriter
+from Map import Map, Location, SubLocation, MapLoader, WorldIndex
+from Randomness import RandomStreams
+from Simulation import SimulationPolicy, SimulationScheduler, RecoveryPolicy, RecoverySystem
+from StatTable import StatTable
+
+class PartitionPolicy():
+    def __init__(self, enabled : bool = False, workers : int = 2, keep_distance : int = 1, advance_interval : int = 10):
+        self.enabled = verifier.verify_type(enabled, bool, "enabled")
+        self.workers = verifier.verify_positive(verifier.verify_type(workers, int, "workers"), "workers")
+        self.keep_distance = verifier.verify_non_negative(keep_distance, "keep_distance") #maps this many map borders away from the player's map stay in the engine.
+        self.advance_interval = verifier.verify_positive(advance_interval, "advance_interval") #world ticks between two advances of the workers.
+
+    def to_dict(self) -> dict:
+        return {"enabled" : self.enabled, "workers" : self.workers, "keep_distance" : self.keep_distance, "advance_interval" : self.advance_interval}
+
+class PartitionWorld():
+    #the loaders a worker needs to rebuild the maps it is handed, built the same way as the engine's. Workers never spawn, the few ids they hand out (eg: loot rolled into loaded inventories) come from ranges the engine reserved for them.
+    def __init__(self, data_path : str, seed : int, worker_index : int):
+        verifier.verify_type(data_path, str, "data_path")
+        random_streams = RandomStreams(seed = seed)
+        stream_prefix = f"partition{worker_index}"
+        self.name_loader = NamesLoader(path = f"{data_path}/names.txt", rng = random_streams.get(f"{stream_prefix}/names"))
+        self.item_registry = ItemRegistry(allocator = ReservedIdAllocator())
+        self.entity_registry = EntityRegistry(allocator = self.item_registry.allocator)
+        self.item_loader = ItemsLoader(path = f"{data_path}/Items")
+        self.item_spawner = ItemsSpawner(loader = self.item_loader, registry = self.item_registry)
+        self.currency_loader = CurrencyLoader(path = f"{data_path}/Currency")
+        self.money_loader = MoneyLoader(currency_loader = self.currency_loader)
+        self.table_loader = TablesLoader(path = f"{data_path}/Tables")
+        self.table_resolver = TableResolver(table_loader = self.table_loader, item_loader = self.item_loader, item_spawner = self.item_spawner, money_loader = self.money_loader, rng = random_streams.get_generator(f"{stream_prefix}/loot"))
+        self.dialogue_loader = DialogueLoader(path = f"{data_path}/Dialogues")
+        self.interaction_loader = InteractionLoader(path = f"{data_path}/Interactions", dialogue_loader = self.dialogue_loader)
+        self.cultivation_loader = CultivationLoader(path = f"{data_path}/Cultivation", initalize_registry = True)
+        self.cultivation_calculator = CultivationCalculator(registry = self.cultivation_loader.registry)
+        self.cultivation_creator = CultivationCreator(registry = self.cultivation_loader.registry, calculator = self.cultivation_calculator)
+        self.basic_stat_calculator = BasicStatCalculator()
+        self.technique_loader = TechniqueLoader(path = f"{data_path}/Techniques")
+        self.entity_loader = EntityLoader(name_loader = self.name_loader, entity_registry = self.entity_registry, cultivation_creator = self.cultivation_creator, basic_stat_calculator = self.basic_stat_calculator, item_spawner = self.item_spawner, table_resolver = self.table_resolver, interaction_loader = self.interaction_loader, dialogue_loader = self.dialogue_loader, technique_loader = self.technique_loader, rng = random_streams.get(f"{stream_prefix}/spawning"))
+        self.entity_loader.initialize_entities(path = f"{data_path}/Entities")
+        self.map_loader = MapLoader(path = f"{data_path}/Maps", item_spawner = self.item_spawner, table_resolver = self.table_resolver, entity_loader = self.entity_loader)
+
+class PartitionWorker():
+    #owns the maps it was handed and simulates every one of their sublocations as world time advances. Messages look like results, {"type" : ..., "args" : {...}}.
+    def __init__(self, world : PartitionWorld, recovery_policy : RecoveryPolicy, use_stat_tables : bool = False):
+        self.world = verifier.verify_type(world, PartitionWorld, "world")
+        self.recovery_policy = verifier.verify_type(recovery_policy, RecoveryPolicy, "recovery_policy")
+        self.use_stat_tables = verifier.verify_type(use_stat_tables, bool, "use_stat_tables")
+        self.maps : dict[str, Map] = {}
+        self.world_index = WorldIndex()
+        self.simulation = SimulationScheduler(policy = SimulationPolicy(), get_loaded_sub_location = self.world_index.get_sub_location)
+        self.simulation.add_system(RecoverySystem(policy = self.recovery_policy))
+        self.world_ticks : int | None = None
+        self.HANDLERS = {
+            "adopt_map" : self.adopt_map,
+            "release_map" : self.release_map,
+            "write_maps" : self.write_maps,
+            "advance" : self.advance,
+            "add_entities" : self.add_entities,
+            "take_entity" : self.take_entity,
+            "move_entity" : self.move_entity,
+            "set_tag" : self.set_tag,
+            "set_exit" : self.set_exit,
+            "set_interaction" : self.set_interaction
+        }
+
+    def handle(self, message : dict) -> Any:
+        verifier.verify_type(message, dict, "message")
+        if not message["type"] in self.HANDLERS:
+            raise KeyError(f"No partition message by the type of \"{message['type']}\" exists.")
+        return self.HANDLERS[message["type"]](**message["args"])
+
+    def _get_sub_location(self, path : str) -> SubLocation:
+        sub_location = self.world_index.get_sub_location(path)
+        if sub_location is None:
+            raise KeyError(f"Sublocation \"{path}\" is not owned by this worker.")
+        return sub_location
+
+    def _attach(self, entity : Entity, path : str) -> None:
+        stat_table = self.maps[self.world_index.get_map_name(path)].stat_table
+        if stat_table is not None and not isinstance(entity, Player):
+            stat_table.attach(entity)
+
+    def adopt_map(self, map_data : dict, last_simulated : dict[str, int], id_blocks : dict[str, range]) -> None:
+        for kind, numbers in id_blocks.items():
+            self.world.item_registry.allocator.add_block(kind, numbers)
+        game_map = self.world.map_loader.load_map_state(config = map_data)
+        if self.use_stat_tables:
+            game_map.attach_stat_table(StatTable())
+        self.maps[game_map.name] = game_map
+        self.world_index.add_map(game_map)
+        self.simulation.last_simulated.update(last_simulated)
+
+    def release_map(self, map_name : str) -> dict:
+        game_map = self.maps.pop(map_name)
+        self.world_index.remove_map(map_name)
+        prefix = f"{map_name}/"
+        last_simulated = {path : ticks for path, ticks in self.simulation.last_simulated.items() if path.startswith(prefix)}
+        for path in last_simulated:
+            self.simulation.last_simulated.pop(path)
+        return {"map_data" : game_map.to_dict(), "last_simulated" : last_simulated}
+
+    def write_maps(self, folder_path : str) -> dict[str, int]:
+        #the maps are streamed straight into the save folder, they never travel back to the engine. Only when their sublocations were last simulated does, for the world state.
+        for map_name, game_map in self.maps.items():
+            with open(f"{folder_path}/maps/{map_name}.json", "w", encoding = "utf-8") as map_file:
+                game_map.stream_to(JSONStreamWriter(map_file))
+        return dict(self.simulation.last_simulated)
+
+    def advance(self, world_ticks : int) -> None:
+        elapsed_ticks = 0 if self.world_ticks is None else world_ticks - self.world_ticks
+        if elapsed_ticks < 0:
+            return
+        self.world_ticks = world_ticks
+        if elapsed_ticks:
+            for game_map in self.maps.values():
+                if game_map.stat_table is not None:
+                    game_map.stat_table.regenerate(ticks = elapsed_ticks, hp_per_tick = self.recovery_policy.hp_per_tick, stamina_per_tick = self.recovery_policy.stamina_per_tick)
+        for path, sub_location in list(self.world_index.sub_locations.items()):
+            self.simulation.simulate(path, sub_location, world_ticks)
+
+    def add_entities(self, sublocation : str, entities : list[dict]) -> None:
+        sub_location = self._get_sub_location(sublocation)
+        for entity_data in entities:
+            entity = self.world.entity_loader.load_entity(entity_data = entity_data)
+            sub_location.add_entity(entity)
+            self._attach(entity, sublocation)
+
+    def take_entity(self, sublocation : str, entity_id : str) -> dict:
+        entity : Entity = self._get_sub_location(sublocation).entities.pop(entity_id)
+        if entity._stat_table is not None:
+            entity._stat_table.detach(entity)
+        return entity.to_dict()
+
+    def move_entity(self, entity_id : str, location_from : str, location_to : str) -> None:
+        location_to_object = self._get_sub_location(location_to)
+        entity : Entity = self._get_sub_location(location_from).entities.pop(entity_id)
+        location_to_object.add_entity(entity)
+        if self.world_index.get_map_name(location_from) != self.world_index.get_map_name(location_to):
+            if entity._stat_table is not None:
+                entity._stat_table.detach(entity)
+            self._attach(entity, location_to)
+
+    def set_tag(self, path : str, tag : str, present : bool) -> None:
+        #location paths have two parts, sublocation paths three.
+        if len(self.world_index.split(path)) == 2:
+            place : Location | None = self.world_index.get_location(path)
+        else:
+            place = self.world_index.get_sub_location(path)
+        if place is None:
+            raise KeyError(f"\"{path}\" is not owned by this worker.")
+        if present and not tag in place.tags:
+            place.tags.append(tag)
+        elif not present and tag in place.tags:
+            place.tags.remove(tag)
+
+    def set_exit(self, sublocation : str, exit_name : str, exit_path : str | None = None) -> None:
+        #no exit_path removes the exit, existing exits are never replaced.
+        exits = self._get_sub_location(sublocation).exits
+        if exit_path is None:
+            exits.pop(exit_name, None)
+        elif not exit_name in exits:
+            exits[exit_name] = exit_path
+
+    def set_interaction(self, sublocation : str, entity_id : str, interaction_id : str) -> None:
+        self._get_sub_location(sublocation).entities[entity_id].interaction = interaction_id
+
+def run_partition_worker(connection : Connection, data_path : str, seed : int, worker_index : int, recovery_policy : dict, use_stat_tables : bool) -> None:
+    #entry point of a worker process. Every message comes with whether the engine waits on a reply and the map it is about, a None message stops the worker. Messages nobody waits on report their failures back on their own.
+    sys.stdout = open(os.devnull, "w", encoding = "utf-8") #the loaders report their progress, workers share the engine's console and stay quiet.
+    worker = PartitionWorker(world = PartitionWorld(data_path = data_path, seed = seed, worker_index = worker_index), recovery_policy = RecoveryPolicy(**recovery_policy), use_stat_tables = use_stat_tables)
+    while True:
+        message, wants_reply, map_name = connection.recv()
+        if message is None:
+            break
+        try:
+            reply = (True, worker.handle(message))
+        except Exception as error:
+            reply = (False, f"{type(error).__name__} : {error}")
+        if wants_reply:
+            connection.send(("reply", reply))
+        elif not reply[0]:
+            connection.send(("failed", (map_name, f"\"{message['type']}\" failed, {reply[1]}")))
+    connection.close()
+
+class PartitionClient():
+    #the engine's end of one worker process. Messages are handled in the order they were sent, so a reply always reflects everything sent before it.
+    def __init__(self, context : multiprocessing.context.BaseContext, data_path : str, seed : int, worker_index : int, recovery_policy : RecoveryPolicy, use_stat_tables : bool):
+        self.worker_index = worker_index
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target = run_partition_worker, args = (worker_connection, data_path, seed, worker_index, recovery_policy.to_dict(), use_stat_tables), name = f"partition-{worker_index}", daemon = True)
+        self.process.start()
+        worker_connection.close()
+        self.map_names : set[str] = set()
+        self.failed_maps : dict[str, str] = {} #map name -> first error reported for it since it was last checked.
+
+    def send(self, message_type : str, args : dict, map_name : str | None = None) -> None:
+        #failures come back later, see collect_failures.
+        self.connection.send(({"type" : message_type, "args" : args}, False, map_name))
+
+    def request(self, message_type : str, **args) -> Any:
+        self.connection.send(({"type" : message_type, "args" : args}, True, None))
+        return self.receive(message_type)
+
+    def receive(self, message_type : str) -> Any:
+        #failures of earlier messages arriving before the reply are recorded on the way.
+        while True:
+            kind, payload = self.connection.recv()
+            if kind == "reply":
+                break
+            self._record_failure(*payload)
+        succeeded, reply = payload
+        if not succeeded:
+            raise RuntimeError(f"Partition worker {self.worker_index} could not handle \"{message_type}\" : {reply}")
+        return reply
+
+    def collect_failures(self) -> None:
+        #nothing is waited on here, everything already sent back is a failure.
+        while self.connection.poll():
+            kind, payload = self.connection.recv()
+            self._record_failure(*payload)
+
+    def _record_failure(self, map_name : str | None, error : str) -> None:
+        #a message about no map in particular (eg: advance) puts every map of the worker in doubt.
+        for failed_map_name in ([map_name] if map_name is not None else list(self.map_names)):
+            self.failed_maps.setdefault(failed_map_name, error)
+
+    def stop(self) -> None:
+        try:
+            self.connection.send((None, False, None))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout = 5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+
+class PartitionManager():
+    #maps away from the player are handed to worker processes, the least loaded worker takes the next map. The engine keeps the player's map and the maps around it so they are served without a round trip.
+    ID_BLOCK_SIZE = 1024 #ids of every kind reserved for a worker with each map it adopts.
+
+    def __init__(self, policy : PartitionPolicy, data_path : str, seed : int, allocator : IdAllocator, recovery_policy : RecoveryPolicy, use_stat_tables : bool = False):
+        self.policy = verifier.verify_type(policy, PartitionPolicy, "policy")
+        self.allocator = verifier.verify_type(allocator, IdAllocator, "allocator") #the engine's, worker ids are reserved from it.
+        context = multiprocessing.get_context("spawn") #workers never inherit the ui's threads.
+        self.clients = [PartitionClient(context = context, data_path = data_path, seed = seed, worker_index = worker_index, recovery_policy = recovery_policy, use_stat_tables = use_stat_tables) for worker_index in range(self.policy.workers)]
+        self.owners : dict[str, PartitionClient] = {} #map name -> worker owning it.
+        self.last_advance : int | None = None
+
+    def owns(self, map_name : str) -> bool:
+        return map_name.strip() in self.owners
+
+    def hand_off(self, game_map : Map, last_simulated : dict[str, int]) -> None:
+        #waited on, the engine only lets go of the map once a worker holds it.
+        client = min(self.clients, key = lambda client : len(client.map_names))
+        id_blocks = {kind : self.allocator.allocate(kind, self.ID_BLOCK_SIZE) for kind in IdAllocator.PREFIXES}
+        client.request("adopt_map", map_data = game_map.to_dict(), last_simulated = last_simulated, id_blocks = id_blocks)
+        client.map_names.add(game_map.name)
+        self.owners[game_map.name] = client
+
+    def take_back(self, map_name : str) -> dict:
+        #the released map is the worker's own state, whatever failed on it before is settled by taking it back.
+        map_name = map_name.strip()
+        client = self.owners.pop(map_name)
+        client.map_names.discard(map_name)
+        released = client.request("release_map", map_name = map_name)
+        client.failed_maps.pop(map_name, None)
+        return released
+
+    def send(self, map_name : str, message_type : str, **args) -> None:
+        self.owners[map_name.strip()].send(message_type, args, map_name = map_name.strip())
+
+    def request(self, map_name : str, message_type : str, **args) -> Any:
+        return self.owners[map_name.strip()].request(message_type, **args)
+
+    def take_failures(self) -> dict[str, str]:
+        #maps still owned by a worker that failed on a message sent without waiting, their state in the engine and in the worker may have drifted apart.
+        failures = {}
+        for client in self.clients:
+            client.collect_failures()
+            failures.update({map_name : error for map_name, error in client.failed_maps.items() if map_name in client.map_names})
+            client.failed_maps.clear()
+        return failures
+
+    def advance(self, world_ticks : int) -> None:
+        if self.last_advance is not None and world_ticks - self.last_advance < self.policy.advance_interval:
+            return
+        self.last_advance = world_ticks
+        for client in self.clients:
+            if client.map_names:
+                client.send("advance", {"world_ticks" : world_ticks})
+
+    def write_maps(self, folder_path : str) -> dict[str, int]:
+        #every worker is asked before any reply is read, so they write their maps at the same time. Returns when the sublocations of those maps were last simulated.
+        busy_clients = [client for client in self.clients if client.map_names]
+        for client in busy_clients:
+            client.connection.send(({"type" : "write_maps", "args" : {"folder_path" : folder_path}}, True, None))
+        last_simulated = {}
+        for client in busy_clients:
+            last_simulated.update(client.receive("write_maps"))
+        return last_simulated
+
+    def stop(self) -> None:
+        for client in self.clients:
+            client.stop()
+        self.owners.clear()
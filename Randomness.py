@@ -0,0 +1,65 @@
+import random
+import hashlib
+
+import numpy as np
+
+from GeneralVerifier import verifier
+
+class RandomStreams():
+    #every subsystem draws from its own stream derived from one seed, so a run is reproduced by its seed and saved stream states. Sessions (eg: a combat) get a fresh stream each, numbered in the order they were started.
+    def __init__(self, seed : int | None = None, streams : dict[str, list] | None = None, generators : dict[str, dict] | None = None, sessions : dict[str, int] | None = None):
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy)
+        self.seed = verifier.verify_non_negative(verifier.verify_type(seed, int, "seed"), "seed")
+        self.saved_streams = dict(verifier.verify_type(streams, dict, "streams", True) or {}) #states not yet applied, a stream picks up its state when it is first asked for.
+        self.saved_generators = dict(verifier.verify_type(generators, dict, "generators", True) or {})
+        self.sessions = dict(verifier.verify_type(sessions, dict, "sessions", True) or {}) #session name -> sessions started.
+        self.streams : dict[str, random.Random] = {}
+        self.generators : dict[str, np.random.Generator] = {}
+
+    def _seed_sequence(self, name : str) -> np.random.SeedSequence:
+        #the name is hashed rather than numbered so adding a stream never shifts the others.
+        key = int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size = 8).digest(), "little")
+        return np.random.SeedSequence(self.seed, spawn_key = (key, ))
+
+    def _new_stream(self, name : str) -> random.Random:
+        return random.Random(int.from_bytes(self._seed_sequence(name).generate_state(4, np.uint64).tobytes(), "little"))
+
+    def get(self, name : str) -> random.Random:
+        verifier.verify_type(name, str, "name")
+        if not name in self.streams:
+            stream = self._new_stream(name)
+            if name in self.saved_streams:
+                version, internal_state, gauss_next = self.saved_streams.pop(name)
+                stream.setstate((version, tuple(internal_state), gauss_next))
+            self.streams[name] = stream
+        return self.streams[name]
+
+    def get_generator(self, name : str) -> np.random.Generator:
+        #numpy streams for batched draws, kept apart from the random.Random streams of the same name.
+        verifier.verify_type(name, str, "name")
+        if not name in self.generators:
+            generator = np.random.Generator(np.random.PCG64(self._seed_sequence(f"numpy/{name}")))
+            if name in self.saved_generators:
+                generator.bit_generator.state = self.saved_generators.pop(name)
+            self.generators[name] = generator
+        return self.generators[name]
+
+    def session(self, name : str, index : int | None = None) -> random.Random:
+        #a stream for one session, never saved. Without an index the next one is handed out, an explicit index gives the same stream every time (eg: one per simulation run in a worker process).
+        verifier.verify_type(name, str, "name")
+        if index is None:
+            index = self.sessions.get(name, 0)
+            self.sessions[name] = index + 1
+        index = verifier.verify_non_negative(verifier.verify_type(index, int, "index"), "index")
+        return self._new_stream(f"{name}#{index}")
+
+    def to_dict(self) -> dict:
+        streams = dict(self.saved_streams)
+        for name, stream in self.streams.items():
+            version, internal_state, gauss_next = stream.getstate()
+            streams[name] = [version, list(internal_state), gauss_next]
+        generators = dict(self.saved_generators)
+        for name, generator in self.generators.items():
+            generators[name] = generator.bit_generator.state
+        return {"seed" : self.seed, "streams" : streams, "generators" : generators, "sessions" : dict(self.sessions)}
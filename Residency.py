@@ -0,0 +1,166 @@
+import os
+import json
+import weakref
+from collections import OrderedDict
+from typing import Callable, TYPE_CHECKING
+
+from GeneralVerifier import verifier
+from JSONStream import JSONStreamWriter
+from Map import get_paths_within, WorldIndex
+
+if TYPE_CHECKING:
+    from Map import Map, Location, SubLocation
+    from Entities import Entity
+
+class ResidencyPolicy():
+    def __init__(self, enabled : bool = False, max_resident_sublocations : int = 64, keep_distance : int = 2):
+        self.enabled = verifier.verify_type(enabled, bool, "enabled")
+        self.max_resident_sublocations = verifier.verify_positive(max_resident_sublocations, "max_resident_sublocations")
+        self.keep_distance = verifier.verify_non_negative(keep_distance, "keep_distance") #sublocations this many exits away from the player are never evicted.
+
+    def to_dict(self) -> dict:
+        return {"enabled" : self.enabled, "max_resident_sublocations" : self.max_resident_sublocations, "keep_distance" : self.keep_distance}
+
+class SubLocationResidency():
+    #keeps only recently visited sublocations close to the player in memory, the rest are written to cache_path and restored on their next lookup. cache_path is created here and belongs to this residency alone.
+    def __init__(self, policy : ResidencyPolicy, cache_path : str, maps : dict[str, Map], load_sub_location : Callable[[str, dict], SubLocation], world_index : WorldIndex | None = None):
+        self.policy = verifier.verify_type(policy, ResidencyPolicy, "policy")
+        self.cache_path = verifier.verify_type(cache_path, str, "cache_path")
+        self.maps = verifier.verify_type(maps, dict, "maps")
+        if not callable(load_sub_location):
+            raise TypeError(f"load_sub_location must be callable, not \"{type(load_sub_location).__name__}\".")
+        self.load_sub_location = load_sub_location
+        self.world_index = verifier.verify_type(world_index, WorldIndex, "world_index", True) #kept in step as sublocations leave and come back.
+        self.resident : OrderedDict[str, None] = OrderedDict() #sublocation paths, least recently used first.
+        self.evicted_exits : dict[str, dict[str, str]] = {} #exits of evicted sublocations, kept so distances can be measured without restoring them.
+        self.evicted_entities : dict[str, weakref.WeakValueDictionary[str, Entity]] = {} #entities of evicted sublocations that something else may still hold on to, they take the place of their reloaded copies on restore.
+        self.cache_files : dict[str, str] = {}
+        self.next_cache_id = 0
+        os.makedirs(self.cache_path, exist_ok = False) #an existing folder belongs to another session.
+
+    def clear_cache(self) -> None:
+        #only the files written by this residency are removed.
+        for cache_file in self.cache_files.values():
+            os.remove(cache_file)
+        self.cache_files.clear()
+        self.evicted_exits.clear()
+        self.evicted_entities.clear()
+
+    def close(self) -> None:
+        self.clear_cache()
+        os.rmdir(self.cache_path)
+
+    def _split_path(self, path : str) -> tuple[str, str, str]:
+        path_list = [part.strip() for part in path.split("/")]
+        if len(path_list) != 3:
+            raise ValueError(f"Sublocation path \"{path}\" is expected to look like \"map/location/sublocation\".")
+        return path_list[0], path_list[1], path_list[2]
+
+    def _get_location(self, path : str) -> Location:
+        map_name, location_name, _ = self._split_path(path)
+        return self.maps[map_name].locations[location_name]
+
+    def is_evicted(self, path : str) -> bool:
+        return path in self.cache_files
+
+    def register_map(self, game_map : Map) -> None:
+        #a freshly loaded map is entirely resident, its sublocations start out as the coldest ones.
+        for location_name, location in game_map.locations.items():
+            location.residency = self
+            for sub_location_name, _ in location.sub_locations.resident_items():
+                path = f"{game_map.name}/{location_name}/{sub_location_name}"
+                if not path in self.resident:
+                    self.resident[path] = None
+                    self.resident.move_to_end(path, last = False)
+
+    def add_resident(self, path : str) -> None:
+        #a sublocation that joined an already registered map (eg: parsed on its first lookup).
+        self.resident[path] = None
+
+    def unregister_map(self, game_map : Map) -> None:
+        #the map left the engine, its evicted sublocations were already read back by whoever took it.
+        prefix = f"{game_map.name}/"
+        for path in [path for path in self.resident if path.startswith(prefix)]:
+            self.resident.pop(path)
+        for path in [path for path in self.cache_files if path.startswith(prefix)]:
+            os.remove(self.cache_files.pop(path))
+            self.evicted_exits.pop(path)
+            self.evicted_entities.pop(path)
+        for location in game_map.locations.values():
+            location.residency = None
+            location.evicted_sub_locations.clear()
+
+    def touch(self, path : str) -> None:
+        if path in self.resident:
+            self.resident.move_to_end(path)
+
+    def _get_exits(self, path : str) -> dict[str, str]:
+        if path in self.evicted_exits:
+            return self.evicted_exits[path]
+        map_name, location_name, sub_location_name = self._split_path(path)
+        if not map_name in self.maps or not location_name in self.maps[map_name].locations:
+            return {}
+        sub_location = self.maps[map_name].locations[location_name].sub_locations.get_resident(sub_location_name)
+        return sub_location.exits if sub_location is not None else {}
+
+    def get_nearby(self, path : str) -> set[str]:
+        return get_paths_within(path = path, distance = self.policy.keep_distance, get_exits = self._get_exits)
+
+    def enforce(self, current_path : str) -> None:
+        if not self.policy.enabled or len(self.resident) <= self.policy.max_resident_sublocations:
+            return
+        self.touch(current_path)
+        nearby = self.get_nearby(current_path)
+        for path in list(self.resident.keys()):
+            if len(self.resident) <= self.policy.max_resident_sublocations:
+                return
+            if not path in nearby and not self._holds_player(path):
+                self.evict(path)
+
+    def _holds_player(self, path : str) -> bool:
+        _, _, sub_location_name = self._split_path(path)
+        sub_location = self._get_location(path).sub_locations[sub_location_name]
+        return sub_location.entities.has_tag("Player")
+
+    def evict(self, path : str) -> None:
+        _, _, sub_location_name = self._split_path(path)
+        location = self._get_location(path)
+        sub_location = location.sub_locations.pop(sub_location_name)
+        for entity in sub_location.entities.values():
+            if entity._stat_table is not None:
+                entity._stat_table.detach(entity)
+        cache_file = f"{self.cache_path}/{self.next_cache_id}.json"
+        self.next_cache_id += 1
+        with open(cache_file, "w", encoding = "utf-8") as sub_location_file:
+            sub_location.stream_to(JSONStreamWriter(sub_location_file))
+        self.cache_files[path] = cache_file
+        self.evicted_exits[path] = dict(sub_location.exits)
+        self.evicted_entities[path] = weakref.WeakValueDictionary(sub_location.entities)
+        location.evicted_sub_locations[sub_location_name] = path
+        self.resident.pop(path)
+        if self.world_index is not None:
+            self.world_index.invalidate(path)
+
+    def read_text(self, path : str) -> str:
+        with open(self.cache_files[path], encoding = "utf-8") as sub_location_file:
+            return sub_location_file.read()
+
+    def restore(self, path : str) -> SubLocation:
+        map_name, _, sub_location_name = self._split_path(path)
+        location = self._get_location(path)
+        sub_location = self.load_sub_location(sub_location_name, json.loads(self.read_text(path)))
+        for entity_id, entity in self.evicted_entities.pop(path).items():
+            if entity_id in sub_location.entities: #still referenced elsewhere (eg: a quest), the reloaded copy is dropped so both sides keep seeing the same entity.
+                sub_location.entities[entity_id] = entity
+        stat_table = self.maps[map_name].stat_table
+        if stat_table is not None:
+            for entity in sub_location.entities.values():
+                stat_table.attach(entity)
+        os.remove(self.cache_files.pop(path))
+        self.evicted_exits.pop(path)
+        location.evicted_sub_locations.pop(sub_location_name)
+        location.sub_locations[sub_location_name] = sub_location
+        self.resident[path] = None
+        if self.world_index is not None:
+            self.world_index.add_sub_location(path, sub_location)
+        return sub_location
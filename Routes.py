@@ -0,0 +1,158 @@
+from collections import deque
+from typing import TYPE_CHECKING
+
+from GeneralVerifier import verifier
+from Map import WorldIndex, MapFileIndex
+
+if TYPE_CHECKING:
+    from Map import Map, Location
+
+class ExitGraph():
+    #exits of every sublocation of every map, resolved or not, keyed by canonical path. Routes are the fewest exits taken, the breadth first tree of every origin asked for is cached until the graph changes.
+    def __init__(self, world_index : WorldIndex):
+        self.world_index = verifier.verify_type(world_index, WorldIndex, "world_index")
+        self.exits : dict[str, dict[str, str]] = {} #sublocation path -> exit name -> sublocation path.
+        self.locked : set[str] = set() #locked location and sublocation paths, routes never enter them.
+        self.trees : dict[str, dict[str, str | None]] = {} #origin -> reachable path -> previous path on the way there.
+        self.map_links : dict[str, set[str]] | None = None #map name -> maps one of its exits leads into, rebuilt when the graph changes.
+        self.version = 0
+
+    def _changed(self) -> None:
+        self.trees.clear()
+        self.map_links = None
+        self.version += 1
+
+    def set_exits(self, path : str, exits : dict[str, str]) -> None:
+        verifier.verify_type(exits, dict, "exits")
+        normalize = self.world_index.normalize
+        self.exits[normalize(path)] = {exit_name : normalize(exit_path) for exit_name, exit_path in exits.items()}
+        self._changed()
+
+    def add_exit(self, path : str, exit_name : str, exit_path : str) -> None:
+        exits = self.exits.setdefault(self.world_index.normalize(path), {})
+        if not exit_name in exits:
+            exits[exit_name] = self.world_index.normalize(exit_path)
+            self._changed()
+
+    def remove_exit(self, path : str, exit_name : str) -> None:
+        exits = self.exits.get(self.world_index.normalize(path), {})
+        if exit_name in exits:
+            exits.pop(exit_name)
+            self._changed()
+
+    def set_locked(self, path : str, locked : bool) -> None:
+        path = self.world_index.normalize(path)
+        if locked == (path in self.locked):
+            return
+        if locked:
+            self.locked.add(path)
+        else:
+            self.locked.discard(path)
+        self._changed()
+
+    def is_blocked(self, path : str) -> bool:
+        path = self.world_index.normalize(path)
+        map_name, location_name = self.world_index.split(path)[:2]
+        return path in self.locked or f"{map_name}/{location_name}" in self.locked
+
+    def add_map_index(self, map_index : MapFileIndex) -> None:
+        #a map that is not resolved yet, only the tags and exits of its sublocations are read from its file.
+        verifier.verify_type(map_index, MapFileIndex, "map_index")
+        with map_index.reader() as read:
+            for location_name, location_fields in map_index.locations.items():
+                location_path = self.world_index.normalize(f"{map_index.name}/{location_name}")
+                self._set_locked_quietly(location_path, "locked" in read(location_fields["tags"]))
+                for sub_location_name, sub_location_fields in map_index.sub_location_fields[location_name].items():
+                    path = self.world_index.normalize(f"{location_path}/{sub_location_name}")
+                    self._set_locked_quietly(path, "tags" in sub_location_fields and "locked" in read(sub_location_fields["tags"]))
+                    exits = read(sub_location_fields["exits"]) if "exits" in sub_location_fields else {}
+                    self.exits[path] = {exit_name : self.world_index.normalize(exit_path) for exit_name, exit_path in exits.items()}
+        self._changed()
+
+    def add_map(self, game_map : Map) -> None:
+        #a resolved map replaces whatever was read from its data.
+        for location_name, location in game_map.locations.items():
+            location_path = self.world_index.normalize(f"{game_map.name}/{location_name}")
+            self._set_locked_quietly(location_path, "locked" in location.tags)
+            for sub_location_name, sub_location in location.sub_locations.resident_items():
+                path = self.world_index.normalize(f"{location_path}/{sub_location_name}")
+                self._set_locked_quietly(path, "locked" in sub_location.tags)
+                self.exits[path] = {exit_name : self.world_index.normalize(exit_path) for exit_name, exit_path in sub_location.exits.items()}
+            if location.unparsed_sub_locations and location.source is not None:
+                self._add_unparsed_sub_locations(location_path, location_name, location)
+        self._changed()
+
+    def _add_unparsed_sub_locations(self, location_path : str, location_name : str, location : Location) -> None:
+        #sublocations that are not parsed yet are read from the map file they will be parsed from.
+        map_index = location.source.map_index
+        with map_index.reader() as read:
+            for sub_location_name in location.unparsed_sub_locations:
+                sub_location_fields = map_index.sub_location_fields[location_name][sub_location_name]
+                path = self.world_index.normalize(f"{location_path}/{sub_location_name}")
+                self._set_locked_quietly(path, "tags" in sub_location_fields and "locked" in read(sub_location_fields["tags"]))
+                exits = read(sub_location_fields["exits"]) if "exits" in sub_location_fields else {}
+                self.exits[path] = {exit_name : self.world_index.normalize(exit_path) for exit_name, exit_path in exits.items()}
+
+    def _set_locked_quietly(self, path : str, locked : bool) -> None:
+        if locked:
+            self.locked.add(path)
+        else:
+            self.locked.discard(path)
+
+    def _get_tree(self, origin : str) -> dict[str, str | None]:
+        if origin in self.trees:
+            return self.trees[origin]
+        tree = {origin : None}
+        frontier = deque([origin])
+        while frontier:
+            path = frontier.popleft()
+            for exit_path in self.exits.get(path, {}).values():
+                if not exit_path in tree and not self.is_blocked(exit_path):
+                    tree[exit_path] = path
+                    frontier.append(exit_path)
+        self.trees[origin] = tree
+        return tree
+
+    def get_route(self, origin : str, destination : str) -> list[str] | None:
+        #the sublocations passed through after origin, destination last. None if it can't be reached.
+        origin = self.world_index.normalize(origin)
+        destination = self.world_index.normalize(destination)
+        tree = self._get_tree(origin)
+        if not destination in tree:
+            return None
+        route = []
+        path = destination
+        while path != origin:
+            route.append(path)
+            path = tree[path]
+        route.reverse()
+        return route
+
+    def get_maps_within(self, map_name : str, distance : int) -> set[str]:
+        #maps reachable by crossing at most distance map borders, locks are ignored.
+        verifier.verify_non_negative(distance, "distance")
+        if self.map_links is None:
+            self.map_links = {}
+            for path, exits in self.exits.items():
+                path_map_name = self.world_index.get_map_name(path)
+                for exit_path in exits.values():
+                    exit_map_name = self.world_index.get_map_name(exit_path)
+                    if exit_map_name != path_map_name:
+                        self.map_links.setdefault(path_map_name, set()).add(exit_map_name)
+        map_name = map_name.strip()
+        reached = {map_name}
+        frontier = [map_name]
+        for _ in range(int(distance)):
+            frontier = [linked_map_name for frontier_map_name in frontier for linked_map_name in self.map_links.get(frontier_map_name, ()) if not linked_map_name in reached]
+            reached.update(frontier)
+        return reached
+
+    def find(self, name : str, visited : set[str]) -> list[str]:
+        #sublocation paths matching a full path or just a sublocation name, ignoring case. Only visited places and the places their exits lead to are known.
+        verifier.verify_type(name, str, "name")
+        verifier.verify_type(visited, set, "visited")
+        name = "/".join(part.strip() for part in name.split("/")).lower()
+        known = set(visited)
+        for path in visited:
+            known.update(self.exits.get(path, {}).values())
+        return sorted(path for path in known if path.lower() == name or self.world_index.split(path)[-1].lower() == name)
@@ -19,7 +19,7 @@ def perform_initial_verification():
             data_path = settings["data_path"]
             save_path = settings["save_path"]
     
-    for necessary_file in ["UIEngine.py", "Cultivation.py", "Engine.py", "Entities.py", "GeneralVerifier.py", "Inventory.py", "Items.py", "Loadout.py", "Map.py", "Money.py", "NameLoader.py", "Stats.py", "Skills.py", "TableLoader.py", "Techniques.py", "Trade.py", "Quests.py", "Conditionals.py", "WorldState.py", "WorldTime.py", "CommandSchedulers.py"]:
+    for necessary_file in ["UIEngine.py", "Cultivation.py", "Engine.py", "Entities.py", "GeneralVerifier.py", "Inventory.py", "Items.py", "Loadout.py", "Map.py", "Money.py", "NameLoader.py", "Stats.py", "Skills.py", "TableLoader.py", "Techniques.py", "Trade.py", "Quests.py", "Conditionals.py", "WorldState.py", "WorldTime.py", "CommandSchedulers.py", "JSONStream.py", "Autosave.py", "StatTable.py", "Schema.py", "Residency.py", "Simulation.py", "Identifiers.py", "Economy.py", "Randomness.py", "Routes.py", "Partitions.py"]:
         if not necessary_file in items:
             throw_error(f"File : {necessary_file} was expected to exist but was not found.")
     
@@ -27,10 +27,11 @@ def perform_initial_verification():
         if not os.path.isdir(directory):
             throw_error(f"Directory : \"{directory}\" was expected to exist but was not found.")
     
-perform_initial_verification()
-
-from Engine import run
-try:
-    run()
-except Exception as e:
-    input(f"Error encountered : {e}")
\ No newline at end of file
+if __name__ == "__main__": #partition workers are spawned processes, they import this file again and must not start another game.
+    perform_initial_verification()
+    
+    from Engine import run
+    try:
+        run()
+    except Exception as e:
+        input(f"Error encountered : {e}")
\ No newline at end of file
@@ -0,0 +1,121 @@
+from typing import Any, Callable
+
+from GeneralVerifier import verifier
+from JSONStream import JSONStreamWriter
+
+VALUE = "value" #json native, written as is.
+OBJECT = "object" #nested object written with its own to_dict.
+STREAM = "stream" #nested object that streams itself into the writer when saving.
+NAMES = "names" #list of named objects, only their names are written.
+KEYS = "keys" #dict of named objects, only the keys are written.
+
+class Schema():
+    #every persisted class lists its fields once, the encode, stream, decode and apply functions are generated from that list.
+    KINDS = (VALUE, OBJECT, STREAM, NAMES, KEYS)
+
+    def __init__(self, fields : tuple[tuple[str, str], ...], omit_none : bool = False):
+        verifier.verify_type(fields, tuple, "fields")
+        for field_name, kind in fields:
+            if not isinstance(field_name, str) or not field_name.isidentifier():
+                raise ValueError(f"Schema field name \"{field_name}\" is not a valid identifier.")
+            if not kind in self.KINDS:
+                raise ValueError(f"Schema field \"{field_name}\" has unknown kind \"{kind}\". Expected one of {list(self.KINDS)}.")
+        self.fields = fields
+        self.names = tuple(field_name for field_name, _ in fields)
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Schema fields are expected to be unique, got {list(self.names)}.")
+        self.omit_none = verifier.verify_type(omit_none, bool, "omit_none")
+        self.encode : Callable[[Any, dict], dict] = self._compile_encoder()
+        self.stream : Callable[[Any, JSONStreamWriter], None] = self._compile_stream_encoder()
+        self.apply : Callable[[Any, dict], Any] = self.compile_applier()
+        self.apply_delta : Callable[[Any, dict, Any], Any] = self._compile_delta_applier()
+
+    def extend(self, fields : tuple[tuple[str, str], ...]) -> Schema:
+        return Schema(fields = self.fields + fields, omit_none = self.omit_none)
+
+    @staticmethod
+    def _build(function_name : str, lines : list[str], namespace : dict | None = None) -> Callable:
+        namespace = dict(namespace or {})
+        exec("\n".join(lines), namespace)
+        return namespace[function_name]
+
+    def _compile_encoder(self) -> Callable[[Any, dict], dict]:
+        ENCODING_MAPPING = {VALUE : "value", OBJECT : "value.to_dict()", STREAM : "value.to_dict()", NAMES : "[element.name for element in value]", KEYS : "list(value.keys())"}
+        lines = ["def encode(obj, data):"]
+        for field_name, kind in self.fields:
+            lines.append(f"    value = obj.{field_name}")
+            if self.omit_none:
+                lines.append(f"    if value is not None:")
+                lines.append(f"        data[{field_name!r}] = {ENCODING_MAPPING[kind]}")
+            elif kind == VALUE:
+                lines.append(f"    data[{field_name!r}] = value")
+            else:
+                lines.append(f"    data[{field_name!r}] = None if value is None else {ENCODING_MAPPING[kind]}")
+        lines.append("    return data")
+        return self._build("encode", lines)
+
+    def _compile_stream_encoder(self) -> Callable[[Any, JSONStreamWriter], None]:
+        ENCODING_MAPPING = {VALUE : "value", OBJECT : "value.to_dict()", NAMES : "[element.name for element in value]", KEYS : "list(value.keys())"}
+        lines = ["def stream(obj, writer):"]
+        for field_name, kind in self.fields:
+            lines.append(f"    value = obj.{field_name}")
+            indent = "    "
+            if self.omit_none:
+                lines.append(f"    if value is not None:")
+                indent = "        "
+            elif kind != VALUE:
+                lines.append(f"    if value is None:")
+                lines.append(f"        writer.item({field_name!r}, None)")
+                lines.append(f"    else:")
+                indent = "        "
+            if kind == STREAM:
+                lines.append(f"{indent}writer.key({field_name!r})")
+                lines.append(f"{indent}value.stream_to(writer)")
+            else:
+                lines.append(f"{indent}writer.item({field_name!r}, {ENCODING_MAPPING[kind]})")
+        lines.append("    return None")
+        return self._build("stream", lines)
+
+    def compile_decoder(self, converters : dict[str, Callable[[Any], Any]] | None = None) -> Callable[[dict], dict]:
+        #returns the converted value of every field present in the data. Nested fields without a converter are left to the caller.
+        converters = verifier.verify_type(converters, dict, "converters", True) or {}
+        for field_name in converters:
+            if not field_name in self.names:
+                raise KeyError(f"Converter given for unknown schema field \"{field_name}\".")
+        lines = ["def decode(data):", "    values = {}"]
+        for field_name, kind in self.fields:
+            if field_name in converters:
+                value = f"convert_{field_name}(data[{field_name!r}])"
+            elif kind == VALUE:
+                value = f"data[{field_name!r}]"
+            else:
+                continue
+            lines.append(f"    if {field_name!r} in data:")
+            lines.append(f"        values[{field_name!r}] = {value}")
+        lines.append("    return values")
+        return self._build("decode", lines, {f"convert_{field_name}" : converter for field_name, converter in converters.items()})
+
+    def compile_applier(self, converters : dict[str, Callable[[Any], Any]] | None = None) -> Callable[[Any, dict], Any]:
+        #same as compile_decoder but assigns the values straight onto an existing object.
+        converters = verifier.verify_type(converters, dict, "converters", True) or {}
+        lines = ["def apply(obj, data):"]
+        for field_name, kind in self.fields:
+            if field_name in converters:
+                value = f"convert_{field_name}(data[{field_name!r}])"
+            elif kind == VALUE:
+                value = f"data[{field_name!r}]"
+            else:
+                continue
+            lines.append(f"    if {field_name!r} in data:")
+            lines.append(f"        obj.{field_name} = {value}")
+        lines.append("    return obj")
+        return self._build("apply", lines, {f"convert_{field_name}" : converter for field_name, converter in converters.items()})
+
+    def _compile_delta_applier(self) -> Callable[[Any, dict, Any], Any]:
+        #assigns only the values that differ from base, everything else keeps being read from it.
+        lines = ["def apply_delta(obj, data, base):"]
+        for field_name in self.names:
+            lines.append(f"    if {field_name!r} in data and data[{field_name!r}] != base.{field_name}:")
+            lines.append(f"        obj.{field_name} = data[{field_name!r}]")
+        lines.append("    return obj")
+        return self._build("apply_delta", lines)
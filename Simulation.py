@@ -0,0 +1,87 @@
+from typing import Callable, TYPE_CHECKING
+
+from GeneralVerifier import verifier
+from Map import get_paths_within
+from Entities import Player
+
+if TYPE_CHECKING:
+    from Map import SubLocation
+
+class SimulationPolicy():
+    def __init__(self, near_distance : int = 1, near_interval : int = 10):
+        self.near_distance = verifier.verify_non_negative(near_distance, "near_distance") #exits away from the player that still count as nearby.
+        self.near_interval = verifier.verify_positive(near_interval, "near_interval") #world ticks between two updates of nearby sublocations.
+
+    def to_dict(self) -> dict:
+        return {"near_distance" : self.near_distance, "near_interval" : self.near_interval}
+
+class RecoveryPolicy():
+    def __init__(self, hp_per_tick : int = 0, stamina_per_tick : int = 0):
+        self.hp_per_tick = verifier.verify_non_negative(verifier.verify_type(hp_per_tick, int, "hp_per_tick"), "hp_per_tick") #whole points npcs recover every world tick, 0 disables.
+        self.stamina_per_tick = verifier.verify_non_negative(verifier.verify_type(stamina_per_tick, int, "stamina_per_tick"), "stamina_per_tick")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.hp_per_tick or self.stamina_per_tick)
+
+    def to_dict(self) -> dict:
+        return {"hp_per_tick" : self.hp_per_tick, "stamina_per_tick" : self.stamina_per_tick}
+
+class RecoverySystem():
+    #entities kept in a stat table are already regenerated with their whole map.
+    def __init__(self, policy : RecoveryPolicy):
+        self.policy = verifier.verify_type(policy, RecoveryPolicy, "policy")
+
+    def __call__(self, sub_location : SubLocation, elapsed_ticks : int) -> None:
+        if elapsed_ticks <= 0 or not self.policy.enabled:
+            return
+        for entity in sub_location.entities.values():
+            if isinstance(entity, Player) or entity._stat_table is not None:
+                continue
+            entity.regenerate(ticks = elapsed_ticks, hp_per_tick = self.policy.hp_per_tick, stamina_per_tick = self.policy.stamina_per_tick)
+
+class SimulationScheduler():
+    #the player's sublocation is simulated every update, nearby ones every near_interval world ticks and the rest are caught up in one step when they are next accessed.
+    def __init__(self, policy : SimulationPolicy, get_loaded_sub_location : Callable[[str], SubLocation | None], last_simulated : dict[str, int] | None = None):
+        self.policy = verifier.verify_type(policy, SimulationPolicy, "policy")
+        if not callable(get_loaded_sub_location):
+            raise TypeError(f"get_loaded_sub_location must be callable, not \"{type(get_loaded_sub_location).__name__}\".")
+        self.get_loaded_sub_location = get_loaded_sub_location
+        self.systems : list[Callable[[SubLocation, int], None]] = [] #called with the sublocation and the world ticks elapsed since it was last simulated.
+        self.last_simulated : dict[str, int] = verifier.verify_type(last_simulated, dict, "last_simulated", True) if last_simulated is not None else {} #kept as given, so the owner of the dict (eg: the WorldState) always sees the latest ticks.
+        self.near_paths : set[str] = set()
+        self.near_paths_origin : str | None = None
+        self.last_near_update : int | None = None
+
+    def add_system(self, system : Callable[[SubLocation, int], None]) -> None:
+        if not callable(system):
+            raise TypeError(f"system must be callable, not \"{type(system).__name__}\".")
+        self.systems.append(system)
+
+    def simulate(self, path : str, sub_location : SubLocation, world_ticks : int) -> None:
+        last_simulated = self.last_simulated.get(path)
+        if last_simulated is not None and world_ticks <= last_simulated:
+            return
+        self.last_simulated[path] = world_ticks
+        elapsed_ticks = 0 if last_simulated is None else world_ticks - last_simulated
+        for system in self.systems:
+            system(sub_location, elapsed_ticks)
+
+    def _get_exits(self, path : str) -> dict[str, str]:
+        sub_location = self.get_loaded_sub_location(path)
+        return sub_location.exits if sub_location is not None else {}
+
+    def update(self, current_path : str, world_ticks : int) -> None:
+        current_sub_location = self.get_loaded_sub_location(current_path)
+        if current_sub_location is not None:
+            self.simulate(current_path, current_sub_location, world_ticks)
+        if self.near_paths_origin != current_path:
+            self.near_paths = get_paths_within(path = current_path, distance = self.policy.near_distance, get_exits = self._get_exits) - {current_path}
+            self.near_paths_origin = current_path
+        if self.last_near_update is not None and world_ticks - self.last_near_update < self.policy.near_interval:
+            return
+        self.last_near_update = world_ticks
+        for path in self.near_paths:
+            sub_location = self.get_loaded_sub_location(path) #sublocations of maps that are not loaded or that were evicted are caught up on access instead.
+            if sub_location is not None:
+                self.simulate(path, sub_location, world_ticks)
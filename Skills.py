@@ -4,6 +4,7 @@ from typing import TYPE_CHECKING
 
 from GeneralVerifier import verifier
 from Packets import ModifierPacket
+from Schema import Schema, VALUE, KEYS
 
 if TYPE_CHECKING:
     from Conditionals import Interpreter
@@ -16,6 +17,8 @@ class SkillState():
     DEFAULT_QI_CULTIVATION_SPEED = 0.01
     DEFAULT_SOUL_CULTIVATION_SPEED = 0.001
     DEFAULT_ESSENCE_CULTIVATION_SPEED = 0.001
+    SCHEMA = Schema(tuple((field_name, VALUE) for field_name in ("level", "skill_points", "current_xp", "physical_technique_points", "qi_technique_points", "soul_technique_points", "strength_mult", "agility_mult", "stamina_regen_mult", "qi_regen_mult", "soul_regen_mult", "essence_regen_mult", "melee_weapons_damage", "ranged_weapons_damage")) + (("static_skills", KEYS), ("dynamic_skills", KEYS)))
+    
     def __init__(self):
         self.level = 0
         self.skill_points = 0
@@ -39,23 +42,13 @@ class SkillState():
         return ((self.level + 1) ** self.DEFAULT_GROWTH_FACTOR) *  self.DEFAULT_XP_REQUIRED
     
     def to_dict(self) -> dict:
-        serialized_dict = {}
-        for attribute in vars(self):
-            if attribute in {"static_skills", "dynamic_skills"}:
-                serialized_dict[attribute] = list(getattr(self, attribute).keys())
-                continue
-            serialized_dict[attribute] = getattr(self, attribute)
-        return serialized_dict
+        return self.SCHEMA.encode(self, {})
 
     def load(self, data : dict, skill_loader : SkillsLoader) -> None:
-        for attribute in data.keys():
-            if attribute in ["static_skills", "dynamic_skills"]:
-                skills = {}
-                for skill in data[attribute]:
-                    skills[skill] = skill_loader.get(skill)
-                setattr(self, attribute, skills)
-            else:
-                setattr(self, attribute, data[attribute])
+        self.SCHEMA.apply(self, data)
+        for attribute in ("static_skills", "dynamic_skills"):
+            if attribute in data:
+                setattr(self, attribute, {skill : skill_loader.get(skill) for skill in data[attribute]})
     
     def get(self, attribute : str, interpreter : Interpreter) -> int | float:
         attribute = attribute.strip().lower()
@@ -0,0 +1,197 @@
+from collections.abc import MutableMapping
+from typing import Iterator, TYPE_CHECKING
+
+import numpy as np
+
+from GeneralVerifier import verifier
+from Stats import CombatStats, OtherStats, BasicStatCalculator
+
+if TYPE_CHECKING:
+    from Entities import Entity
+
+def _python_number(value : np.floating) -> int | float:
+    #keeps saves and ui output identical to entities that are not backed by a table.
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+class StatTable():
+    STAT_COLUMNS = ("vitality", "strength", "agility", "endurance", "charisma", "luck")
+    VALUE_COLUMNS = ("hp", "stamina") + STAT_COLUMNS
+    COLUMN_INDEX = {column : index for index, column in enumerate(VALUE_COLUMNS)}
+    MODIFIER_INDEX = {column : index for index, column in enumerate(STAT_COLUMNS)}
+
+    def __init__(self, capacity : int = 64):
+        capacity = int(verifier.verify_positive(capacity, "capacity"))
+        self.values = np.zeros((capacity, len(self.VALUE_COLUMNS)), dtype = np.float64)
+        self.mult = np.ones((capacity, len(self.STAT_COLUMNS)), dtype = np.float64)
+        self.add = np.zeros((capacity, len(self.STAT_COLUMNS)), dtype = np.float64)
+        self.alive = np.zeros(capacity, dtype = bool)
+        self.used = np.zeros(capacity, dtype = bool)
+        self.entities : list[Entity | None] = [None] * capacity
+        self.free_rows : list[int] = list(range(capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return int(self.used.sum())
+
+    def _grow(self) -> None:
+        old_capacity = len(self.entities)
+        self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+        self.mult = np.concatenate([self.mult, np.ones_like(self.mult)])
+        self.add = np.concatenate([self.add, np.zeros_like(self.add)])
+        self.alive = np.concatenate([self.alive, np.zeros_like(self.alive)])
+        self.used = np.concatenate([self.used, np.zeros_like(self.used)])
+        self.entities.extend([None] * old_capacity)
+        self.free_rows.extend(range((old_capacity * 2) - 1, old_capacity - 1, -1))
+
+    def get(self, row : int, column : str) -> int | float:
+        return _python_number(self.values[row, self.COLUMN_INDEX[column]])
+
+    def set(self, row : int, column : str, value : int | float) -> None:
+        self.values[row, self.COLUMN_INDEX[column]] = value
+
+    def attach(self, entity : Entity) -> int:
+        if entity._stat_table is self:
+            return entity._stat_row
+        if entity._stat_table is not None:
+            entity._stat_table.detach(entity)
+        if not self.free_rows:
+            self._grow()
+        row = self.free_rows.pop()
+        combat_stats = entity.stats.combat_stats
+        other_stats = entity.stats.other_stats
+        self.values[row, self.COLUMN_INDEX["hp"]] = entity.hp
+        self.values[row, self.COLUMN_INDEX["stamina"]] = entity.stamina
+        for stats in (combat_stats, other_stats):
+            for stat in stats.STAT_KEYS:
+                self.values[row, self.COLUMN_INDEX[stat]] = getattr(stats, stat)
+                self.mult[row, self.MODIFIER_INDEX[stat]] = stats.modifiers["mult"].get(stat, 1)
+                self.add[row, self.MODIFIER_INDEX[stat]] = stats.modifiers["add"].get(stat, 0)
+        self.alive[row] = entity.is_alive
+        self.used[row] = True
+        self.entities[row] = entity
+        entity._stat_table = self
+        entity._stat_row = row
+        entity.stats.combat_stats = CombatStatsView(table = self, row = row)
+        entity.stats.other_stats = OtherStatsView(table = self, row = row)
+        return row
+
+    def detach(self, entity : Entity) -> None:
+        if entity._stat_table is not self:
+            raise ValueError(f"Entity \"{entity.id}\" is not stored in this stat table.")
+        row = entity._stat_row
+        combat_stats = CombatStats(**{stat : self.get(row, stat) for stat in CombatStats.STAT_KEYS})
+        other_stats = OtherStats(**{stat : self.get(row, stat) for stat in OtherStats.STAT_KEYS})
+        for stats in (combat_stats, other_stats):
+            stats.modifiers = {"mult" : {stat : _python_number(self.mult[row, self.MODIFIER_INDEX[stat]]) for stat in stats.STAT_KEYS}, "add" : {stat : _python_number(self.add[row, self.MODIFIER_INDEX[stat]]) for stat in stats.STAT_KEYS}}
+        hp, stamina, is_alive = self.get(row, "hp"), self.get(row, "stamina"), bool(self.alive[row])
+        entity._stat_table = None
+        entity._stat_row = None
+        entity.hp, entity.stamina, entity.is_alive = hp, stamina, is_alive
+        entity.stats.combat_stats = combat_stats
+        entity.stats.other_stats = other_stats
+        self.used[row] = False
+        self.alive[row] = False
+        self.entities[row] = None
+        self.free_rows.append(row)
+
+    def effective(self, stat : str) -> np.ndarray:
+        #same as Stats.get, for every row at once.
+        modifier_index = self.MODIFIER_INDEX[stat]
+        return (self.values[:, self.COLUMN_INDEX[stat]] * self.mult[:, modifier_index]) + self.add[:, modifier_index]
+
+    def max_hp(self) -> np.ndarray:
+        return BasicStatCalculator.HP_MULT * self.effective("vitality")
+
+    def max_stamina(self) -> np.ndarray:
+        return BasicStatCalculator.STAMINA_MULT * self.effective("endurance")
+
+    def _recover(self, column : str, maximum : np.ndarray, amount : int) -> None:
+        #recovers whole points, same as Entity.regenerate. Values already above their maximum (such as the narrator's infinite hp) are never lowered.
+        current = self.values[:, self.COLUMN_INDEX[column]]
+        recovering = self.used & self.alive & (current < maximum)
+        current[recovering] = np.maximum(np.floor(np.minimum(current + amount, maximum)), current)[recovering]
+
+    def regenerate(self, ticks : int, hp_per_tick : int, stamina_per_tick : int) -> None:
+        #same as calling Entity.regenerate on every living entity of the table.
+        verifier.verify_non_negative(ticks, "ticks")
+        verifier.verify_non_negative(hp_per_tick, "hp_per_tick")
+        verifier.verify_non_negative(stamina_per_tick, "stamina_per_tick")
+        if ticks == 0:
+            return
+        if hp_per_tick:
+            self._recover("hp", self.max_hp(), hp_per_tick * ticks)
+        if stamina_per_tick:
+            self._recover("stamina", self.max_stamina(), stamina_per_tick * ticks)
+
+class ModifierRowView(MutableMapping):
+    __slots__ = ("_array", "_row", "_keys")
+
+    def __init__(self, array : np.ndarray, row : int, keys : tuple[str, ...]):
+        self._array = array
+        self._row = row
+        self._keys = keys
+
+    def __getitem__(self, key : str) -> int | float:
+        if not key in self._keys:
+            raise KeyError(key)
+        return _python_number(self._array[self._row, StatTable.MODIFIER_INDEX[key]])
+
+    def __setitem__(self, key : str, value : int | float) -> None:
+        if not key in self._keys:
+            raise KeyError(f"\"{key}\" is not a modifier column. Expected one of {list(self._keys)}.")
+        self._array[self._row, StatTable.MODIFIER_INDEX[key]] = value
+
+    def __delitem__(self, key : str) -> None:
+        raise TypeError("Modifier columns of a stat table can not be removed.")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+def _column_property(column : str) -> property:
+    index = StatTable.COLUMN_INDEX[column]
+
+    def getter(self : CombatStatsView | OtherStatsView) -> int | float:
+        return _python_number(self._table.values[self._row, index])
+
+    def setter(self : CombatStatsView | OtherStatsView, value : int | float) -> None:
+        self._table.values[self._row, index] = verifier.verify_non_negative(value, column)
+
+    return property(getter, setter)
+
+class _StatsViewMixin():
+    __slots__ = ()
+
+    @property
+    def modifiers(self) -> dict[str, ModifierRowView]:
+        #the table's arrays are looked up on every access as they are replaced when the table grows.
+        return {"mult" : ModifierRowView(self._table.mult, self._row, self.VIEW_KEYS), "add" : ModifierRowView(self._table.add, self._row, self.VIEW_KEYS)}
+
+    def to_dict(self) -> dict:
+        stats_data = {stat : getattr(self, stat) for stat in self.VIEW_KEYS}
+        stats_data["modifiers"] = {modifier_type : dict(modifier_view) for modifier_type, modifier_view in self.modifiers.items()}
+        return stats_data
+
+class CombatStatsView(_StatsViewMixin, CombatStats):
+    __slots__ = ("_table", "_row")
+    VIEW_KEYS = ("vitality", "strength", "agility", "endurance")
+    vitality = _column_property("vitality")
+    strength = _column_property("strength")
+    agility = _column_property("agility")
+    endurance = _column_property("endurance")
+
+    def __init__(self, table : StatTable, row : int):
+        self._table = verifier.verify_type(table, StatTable, "table")
+        self._row = row
+
+class OtherStatsView(_StatsViewMixin, OtherStats):
+    __slots__ = ("_table", "_row")
+    VIEW_KEYS = ("charisma", "luck")
+    charisma = _column_property("charisma")
+    luck = _column_property("luck")
+
+    def __init__(self, table : StatTable, row : int):
+        self._table = verifier.verify_type(table, StatTable, "table")
+        self._row = row
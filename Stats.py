@@ -1,7 +1,9 @@
 from GeneralVerifier import verifier
+from Schema import Schema, VALUE
 
 class CombatStats():
-    
+    __slots__ = ("vitality", "strength", "agility", "endurance", "modifiers")
+    SCHEMA = Schema(tuple((field_name, VALUE) for field_name in __slots__))
     STAT_KEYS = {"vitality", "strength", "agility", "endurance"}
     
     def __init__(self, vitality : int = 0, strength : int = 0, agility : int = 0, endurance : int = 0):
@@ -14,13 +16,11 @@ class CombatStats():
             "add" : {"vitality" : 0, "strength" : 0, "agility" : 0, "endurance" : 0}}
     
     def to_dict(self) -> dict:
-        item_data = {}
-        for item_attribute in vars(self):
-            item_data[item_attribute] = getattr(self, item_attribute)
-        return item_data
+        return self.SCHEMA.encode(self, {})
         
 class OtherStats():
-    
+    __slots__ = ("charisma", "luck", "modifiers")
+    SCHEMA = Schema(tuple((field_name, VALUE) for field_name in __slots__))
     STAT_KEYS = {"charisma", "luck"}
     
     def __init__(self, charisma : int = 0, luck : int = 0):
@@ -31,19 +31,17 @@ class OtherStats():
             "add" : {"charisma" : 0, "luck" : 0}}
     
     def to_dict(self) -> dict:
-        item_data = {}
-        for item_attribute in vars(self):
-            item_data[item_attribute] = getattr(self, item_attribute)
-        return item_data
+        return self.SCHEMA.encode(self, {})
         
 class Stats():
+    __slots__ = ("combat_stats", "other_stats")
+    
     def __init__(self, combat_stats : CombatStats, other_stats : OtherStats):
         self.combat_stats : CombatStats = verifier.verify_type(combat_stats, CombatStats, "combat_stats")
         self.other_stats : OtherStats = verifier.verify_type(other_stats, OtherStats, "other_stats")
     
     def get(self, stat : str) -> int | float:
-        for stats in vars(self):
-            stats = getattr(self, stats)
+        for stats in (self.combat_stats, self.other_stats):
             if stat in stats.STAT_KEYS:
                 return (getattr(stats, stat) * stats.modifiers["mult"].get(stat, 1)) + stats.modifiers["add"].get(stat, 0)
                 
@@ -1,6 +1,7 @@
 import os
 import json
-import random
+
+import numpy as np
 
 from GeneralVerifier import verifier
 from Items import ItemsLoader, ItemsSpawner, Item, Stack
@@ -34,6 +35,18 @@ class TablesLoader():
                 if not 0 < chance <= 1:
                     raise ValueError(f"Chance must be between 0 and 1. ( 0 < chance <= 1 ). Not \"{chance}\"")
         
+    def _verify_pick_format(self, pick : dict) -> None:
+        #"__pick__" : {"rolls" : 2, "entries" : {"Iron Sword" : {"item_type" : "MeleeWeapon", "amount" : 1, "weight" : 3}, "__nothing__" : {"weight" : 5}}}
+        verifier.verify_positive(verifier.verify_type(pick.get("rolls", 1), int, "rolls"), "rolls")
+        entries = verifier.verify_not_empty(verifier.verify_type(pick.get("entries"), dict, "entries"), "entries")
+        for item_name, entry_keys in entries.items():
+            verifier.verify_type(entry_keys, dict, "entry_keys")
+            required_keys = ["weight", ] if item_name == "__nothing__" else ["item_type", "amount", "weight"]
+            for required_key in required_keys:
+                if not required_key in entry_keys:
+                    raise KeyError(f"\"{required_key}\" is expected to be in \"{item_name}\" : \"{entry_keys}\"")
+            verifier.verify_positive(entry_keys["weight"], "weight")
+    
     def _verify_table_format(self, table_type : str, table : dict) -> dict:
         if table_type == "StaticTables":
             required_keys = ["item_type", "amount"]
@@ -49,6 +62,10 @@ class TablesLoader():
                 self._verify_money_format(table_type = table_type, money = table["__money__"])
                 continue
             
+            if item_name == "__pick__":
+                self._verify_pick_format(pick = table["__pick__"])
+                continue
+            
             for required_key in required_keys:
                 if not required_key in item_keys:
                     raise KeyError(f"\"{required_key}\" is expected to be in \"{item_name}\" : \"{item_keys}\"")
@@ -80,73 +97,141 @@ class TablesLoader():
                     self._verify_table_format(table_dir, table)
                     all_tables[tables_name_mapping[table_dir]][table_name.split(".")[0]] = table
         self.tables = all_tables
+        self.compiled_tables = {table_type : {table_name : CompiledTable(table_type = table_type, table = table) for table_name, table in tables.items()} for table_type, tables in all_tables.items()}
+
+def build_alias_table(weights : list[int | float]) -> tuple[np.ndarray, np.ndarray]:
+    #Vose's alias method, a weighted pick is then one uniform column and one biased coin.
+    count = len(weights)
+    scaled = np.asarray(weights, dtype = np.float64) * count / sum(weights)
+    probability = np.ones(count, dtype = np.float64)
+    alias = np.arange(count)
+    small = [index for index in range(count) if scaled[index] < 1]
+    large = [index for index in range(count) if scaled[index] >= 1]
+    while small and large:
+        small_index = small.pop()
+        large_index = large.pop()
+        probability[small_index] = scaled[small_index]
+        alias[small_index] = large_index
+        scaled[large_index] -= 1 - scaled[small_index]
+        if scaled[large_index] < 1:
+            small.append(large_index)
+        else:
+            large.append(large_index)
+    return probability, alias
+
+class CompiledTable():
+    #a table turned into sampling arrays once at load time. Every entry keeps its independent chance (1 in static tables), "__pick__" entries become an alias table.
+    def __init__(self, table_type : str, table : dict):
+        if not table_type in ["static", "dynamic"]:
+            raise TypeError(f"Only static and dynamic tables are supported, not \"{table_type}\"")
+        verifier.verify_type(table, dict, "table")
+        self.table_type = table_type
+        self.entries : list[tuple[str, str | None, int]] = [] #item name, item type and amount in table order, "__money__" has no type or amount.
+        chances = []
+        self.currencies : list[tuple[str, int]] = []
+        currency_chances = []
+        self.pick_entries : list[tuple[str, str, int] | None] = [] #None for "__nothing__".
+        self.pick_rolls = 0
+        for item_name, item_keys in table.items():
+            if item_name == "__pick__":
+                self.pick_rolls = item_keys.get("rolls", 1)
+                weights = []
+                for pick_name, pick_keys in item_keys["entries"].items():
+                    self.pick_entries.append(None if pick_name == "__nothing__" else (pick_name, pick_keys["item_type"], verifier.verify_positive(pick_keys["amount"], "amount")))
+                    weights.append(pick_keys["weight"])
+                self.pick_probability, self.pick_alias = build_alias_table(weights)
+                continue
+            if item_name == "__money__":
+                self.entries.append((item_name, None, 0))
+                chances.append(1)
+                for currency, currency_keys in item_keys.items():
+                    self.currencies.append((currency, currency_keys["amount"]))
+                    currency_chances.append(currency_keys["chance"] if table_type == "dynamic" else 1)
+                continue
+            self.entries.append((item_name, item_keys["item_type"], verifier.verify_positive(item_keys["amount"], "amount")))
+            chances.append(item_keys["chance"] if table_type == "dynamic" else 1)
+        self.chances = np.asarray(chances, dtype = np.float64)
+        self.currency_chances = np.asarray(currency_chances, dtype = np.float64)
+        self.certain = bool((self.chances >= 1).all() and (self.currency_chances >= 1).all()) #nothing to roll.
 
 class TableResolver():
-    def __init__(self, table_loader : TablesLoader, item_loader : ItemsLoader, item_spawner : ItemsSpawner, money_loader : MoneyLoader):
+    def __init__(self, table_loader : TablesLoader, item_loader : ItemsLoader, item_spawner : ItemsSpawner, money_loader : MoneyLoader, rng : np.random.Generator | None = None):
         self.table_loader = verifier.verify_type(table_loader, TablesLoader, "table_loader")
         self.item_loader = verifier.verify_type(item_loader, ItemsLoader, "item_loader")
         self.item_spawner = verifier.verify_type(item_spawner, ItemsSpawner, "item_spawner")
         self.money_loader = verifier.verify_type(money_loader, MoneyLoader, "money_loader")
+        self.rng = np.random.default_rng() if rng is None else verifier.verify_type(rng, np.random.Generator, "rng")
     
-    def _resolve_item(self, table_type : str, table : dict, item_name : str) -> list[Item | Stack | Money]:
-        
-        if item_name == "__money__":
-            corrected_money_dict = {}
-            for currency in table[item_name].keys():
-                if table_type == "dynamic":
-                    chance = table[item_name][currency]["chance"]
-                else:
-                    chance = 1
-                    
-                if random.random() <= chance:
-                    corrected_money_dict[currency] = table[item_name][currency]["amount"]
-                
-            return [self.money_loader.load_money(corrected_money_dict)]
-        
-        items = []
-        item_type = table[item_name]["item_type"]
-        amount = verifier.verify_positive(table[item_name]["amount"], "amount")
+    def _spawn_hits(self, item_name : str, item_type : str, amount : int, hit_rolls : np.ndarray, rolls : list[list[Item | Stack | Money]]) -> None:
+        #one spawn call for every roll that hit the entry.
+        hit_count = len(hit_rolls)
+        if hit_count == 0:
+            return
         default_item = self.item_loader.get_default(item_type = item_type, item_name = item_name)
         if default_item.stackable:
-            stack = self.item_spawner.spawn_new_stack(item_type = item_type, item_name = item_name, amount = amount)
-            items.append(stack)
+            for roll, base in zip(hit_rolls, self.item_spawner.spawn_many(item_type = item_type, item_name = item_name, amount = hit_count)):
+                rolls[roll].append(Stack(base = base, amount = amount))
+            return
+        spawned = self.item_spawner.spawn_many(item_type = item_type, item_name = item_name, amount = hit_count * amount)
+        for hit_number, roll in enumerate(hit_rolls):
+            rolls[roll].extend(spawned[hit_number * amount : (hit_number + 1) * amount])
+
+    def roll_many(self, table : CompiledTable, n : int) -> list[list[Item | Stack | Money]]:
+        #n independent rolls of table, all the randomness of a kind is drawn in one call.
+        verifier.verify_type(table, CompiledTable, "table")
+        n = int(verifier.verify_non_negative(n, "n"))
+        rolls : list[list[Item | Stack | Money]] = [[] for _ in range(n)]
+        if n == 0:
+            return rolls
+        if table.certain:
+            hits = np.ones((n, len(table.entries)), dtype = bool)
+            currency_hits = np.ones((n, len(table.currencies)), dtype = bool)
         else:
-            for _ in range(amount):
-                new_item = self.item_spawner.spawn_new_item(item_type = item_type, item_name = item_name)
-                items.append(new_item)
-        return items
+            hits = self.rng.random((n, len(table.entries))) <= table.chances
+            currency_hits = self.rng.random((n, len(table.currencies))) <= table.currency_chances
+        for column, (item_name, item_type, amount) in enumerate(table.entries):
+            hit_rolls = np.flatnonzero(hits[:, column])
+            if item_name != "__money__":
+                self._spawn_hits(item_name = item_name, item_type = item_type, amount = amount, hit_rolls = hit_rolls, rolls = rolls)
+                continue
+            currencies = self.money_loader.currency_loader.currencies
+            for currency, _ in table.currencies:
+                if not currency in currencies:
+                    raise KeyError(f"There is no such currency as \"{currency}\" in the currency loader.")
+            currency_ids = [currencies[currency].id for currency, _ in table.currencies]
+            currency_amounts = np.asarray([currency_amount for _, currency_amount in table.currencies], dtype = np.int64)
+            for roll in hit_rolls:
+                money = Money()
+                np.add.at(money.amounts, currency_ids, currency_hits[roll] * currency_amounts)
+                rolls[roll].append(money)
+        if table.pick_rolls:
+            columns = self.rng.integers(0, len(table.pick_entries), size = (n, table.pick_rolls))
+            keep = self.rng.random((n, table.pick_rolls)) < table.pick_probability[columns]
+            picked = np.where(keep, columns, table.pick_alias[columns])
+            for index, pick_entry in enumerate(table.pick_entries):
+                if pick_entry is None:
+                    continue
+                hit_rolls = np.repeat(np.arange(n), (picked == index).sum(axis = 1))
+                self._spawn_hits(item_name = pick_entry[0], item_type = pick_entry[1], amount = pick_entry[2], hit_rolls = hit_rolls, rolls = rolls)
+        return rolls
+
+    def get_compiled(self, table_type : str, table_name : str) -> CompiledTable:
+        table_name = verifier.verify_type(table_name, str, "table_name")
+        if not table_name in self.table_loader.compiled_tables[table_type]:
+            raise KeyError(f"There is no such table as \"{table_name}\" in {table_type} tables in the loader.")
+        return self.table_loader.compiled_tables[table_type][table_name]
+
+    def roll_many_by_name(self, table_type : str, table_name : str, n : int) -> list[list[Item | Stack | Money]]:
+        return self.roll_many(self.get_compiled(table_type = table_type, table_name = table_name), n)
     
     def resolve_static(self, table : dict) -> list[Item | Stack | Money]:
-        table = verifier.verify_type(table, dict, "table")
-        
-        items = []
-        for item_name in table.keys():
-            items.extend(self._resolve_item(table_type = "static", table = table, item_name = item_name))
-        return items
+        return self.roll_many(CompiledTable(table_type = "static", table = table), 1)[0]
 
     def resolve_dynamic(self, table : dict) -> list[Item | Stack | Money]:
-        table = verifier.verify_type(table, dict, "table")
-
-        items = []
-        for item_name in table.keys():
-            if item_name == "__money__":
-                chance = 1
-            else:
-                chance = table[item_name]["chance"]
-            if (random.random() <= chance):
-                items.extend(self._resolve_item(table_type = "dynamic", table = table, item_name = item_name))
-        return items
+        return self.roll_many(CompiledTable(table_type = "dynamic", table = table), 1)[0]
     
     def resolve_static_by_name(self, table_name : str) -> list[Item | Stack | Money]:
-        table_name = verifier.verify_type(table_name, str, "table_name")
-        if not table_name in self.table_loader.tables["static"]:
-            raise KeyError(f"There is no such table as \"{table_name}\" in static tables in the loader.")
-        table = self.table_loader.tables["static"][table_name]
-        return self.resolve_static(table)
+        return self.roll_many_by_name(table_type = "static", table_name = table_name, n = 1)[0]
 
     def resolve_dynamic_by_name(self, table_name : str) -> list[Item | Stack | Money]:
-        table_name = verifier.verify_type(table_name, str, "table_name")
-        if not table_name in self.table_loader.tables["dynamic"]:
-            raise KeyError(f"There is no such table as \"{table_name}\" in dynamic tables in the loader.")
-        table = self.table_loader.tables["dynamic"][table_name]
-        return self.resolve_dynamic(table)
\ No newline at end of file
+        return self.roll_many_by_name(table_type = "dynamic", table_name = table_name, n = 1)[0]
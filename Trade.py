@@ -1,11 +1,14 @@
-from typing import TYPE_CHECKING
+import heapq
+from contextlib import contextmanager
+from typing import Callable, Iterator, TYPE_CHECKING
 
 from GeneralVerifier import verifier
+from Items import Item, Stack
+from Inventory import Inventory
 
 if TYPE_CHECKING:
-    from Items import Item, Stack
-    from Inventory import Inventory
     from Entities import Entity, Player
+    from Economy import MerchantEconomy
     
 class TraderProfile():
     def __init__(self, accepted_currencies : list, price_multiplier : float, accepted_item_tags : list[str]):
@@ -15,49 +18,182 @@ class TraderProfile():
         self.accepted_currencies = accepted_currencies
         self.price_multiplier = price_multiplier
         self.accepted_item_tags = accepted_item_tags
+    
+    def to_dict(self) -> dict:
+        return {"accepted_currencies" : self.accepted_currencies, "price_multiplier" : self.price_multiplier, "accepted_item_tags" : self.accepted_item_tags}
+
+class InventoryListing():
+    #short ids ("Iron_Sword_2", "Arrow") for the items and stacks of an inventory. The listing follows the inventory's change events, so it is built once instead of every time it is shown.
+    def __init__(self, inventory : Inventory, accepted_item_tags : list[str] | None = None):
+        self.inventory = verifier.verify_type(inventory, Inventory, "inventory")
+        verifier.verify_type(accepted_item_tags, list, "accepted_item_tags", True)
+        self.accepted_item_tags = None if accepted_item_tags is None or "__any__" in accepted_item_tags else set(accepted_item_tags) #None lists everything.
+        self.id_to_item : dict[str, Item] = {}
+        self.id_to_stack : dict[str, Stack] = {}
+        self.item_id_to_listing_id : dict[str, str] = {}
+        self.item_numbers : dict[str, int] = {} #highest number handed out for each item name.
+        self.free_numbers : dict[str, list[int]] = {} #heaps of numbers freed by removed items, reused lowest first.
+        self.pending_changes : list[tuple[str, Item | Stack]] | None = None
+        if self.accepted_item_tags is None:
+            elements = inventory.iter_items()
+        else:
+            elements = inventory.find(tags = self.accepted_item_tags)
+        for element in elements:
+            self._list(element)
+        inventory.subscribe(self.on_change)
+
+    def close(self) -> None:
+        self.inventory.unsubscribe(self.on_change)
+
+    def _accepts(self, element : Item | Stack) -> bool:
+        if self.accepted_item_tags is None:
+            return True
+        tags = element.tags if isinstance(element, Item) else element.base.tags
+        return not self.accepted_item_tags.isdisjoint(tags)
+
+    def _take_number(self, item_name : str) -> int:
+        free_numbers = self.free_numbers.get(item_name)
+        if free_numbers:
+            return heapq.heappop(free_numbers)
+        item_number = self.item_numbers.get(item_name, 0) + 1
+        self.item_numbers[item_name] = item_number
+        return item_number
+
+    def _list(self, element : Item | Stack, item_number : int | None = None) -> str:
+        if isinstance(element, Item):
+            #numbers freed by removed items of the same name are reused, so ids stay short however long the listing lives.
+            if item_number is None:
+                item_number = self._take_number(element.name)
+            listing_id = f"{element.name}_{item_number}".replace(" ", "_")
+            self.id_to_item[listing_id] = element
+            self.item_id_to_listing_id[element.id] = listing_id
+        else:
+            listing_id = f"{element.base.name}".replace(" ", "_")
+            self.id_to_stack[listing_id] = element
+        return listing_id
+
+    def _unlist(self, element : Item | Stack, free_number : bool = True) -> str | None:
+        if isinstance(element, Item):
+            listing_id = self.item_id_to_listing_id.pop(element.id, None)
+            if listing_id is not None:
+                del self.id_to_item[listing_id]
+                if free_number:
+                    heapq.heappush(self.free_numbers.setdefault(element.name, []), int(listing_id.rsplit("_", 1)[1]))
+            return listing_id
+        listing_id = f"{element.base.name}".replace(" ", "_")
+        return listing_id if self.id_to_stack.pop(listing_id, None) is not None else None
+
+    def _apply(self, change : str, element : Item | Stack) -> None:
+        if change == "removed":
+            self._unlist(element)
+        elif change == "added" and self._accepts(element):
+            self._list(element)
+        elif change == "changed" and self._accepts(element):
+            listing_id = self._unlist(element, free_number = False) #a changed item keeps its number.
+            item_number = int(listing_id.rsplit("_", 1)[1]) if listing_id is not None and isinstance(element, Item) else None
+            self._list(element, item_number = item_number)
+
+    def on_change(self, change : str, element : Item | Stack) -> None:
+        if self.pending_changes is not None:
+            self.pending_changes.append((change, element))
+        else:
+            self._apply(change, element)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        #changes made inside are applied together when it ends, nested transactions join the outer one.
+        if self.pending_changes is not None:
+            yield
+            return
+        self.pending_changes = []
+        try:
+            yield
+        finally:
+            pending_changes = self.pending_changes
+            self.pending_changes = None
+            for change, element in pending_changes:
+                self._apply(change, element)
+
+class TradeLedger(InventoryListing):
+    #an inventory listing that also keeps the price of every listed item under profile's price multiplier, or the one get_price_multiplier gives for the item.
+    def __init__(self, inventory : Inventory, profile : TraderProfile, accepted_item_tags : list[str] | None = None, get_price_multiplier : Callable[[Item], float] | None = None):
+        self.profile = verifier.verify_type(profile, TraderProfile, "profile")
+        if get_price_multiplier is not None and not callable(get_price_multiplier):
+            raise TypeError(f"get_price_multiplier must be callable, not \"{type(get_price_multiplier).__name__}\".")
+        self.get_price_multiplier = get_price_multiplier
+        self.sell_id_to_price : dict[str, int] = {}
+        super().__init__(inventory = inventory, accepted_item_tags = accepted_item_tags)
+        self.sell_id_to_item = self.id_to_item
+        self.sell_id_to_stack = self.id_to_stack
+
+    def _get_price(self, element : Item | Stack) -> int:
+        item = element if isinstance(element, Item) else element.base
+        if self.get_price_multiplier is None:
+            return int(item.get_trade_price() * self.profile.price_multiplier)
+        return int(item.get_trade_price() * self.get_price_multiplier(item))
+
+    def _list(self, element : Item | Stack, item_number : int | None = None) -> str:
+        sell_id = super()._list(element, item_number = item_number)
+        self.sell_id_to_price[sell_id] = self._get_price(element)
+        return sell_id
+
+    def refresh_prices(self) -> None:
+        for sell_id, item in self.sell_id_to_item.items():
+            self.sell_id_to_price[sell_id] = self._get_price(item)
+        for sell_id, stack in self.sell_id_to_stack.items():
+            self.sell_id_to_price[sell_id] = self._get_price(stack)
+
+    def _unlist(self, element : Item | Stack, free_number : bool = True) -> str | None:
+        sell_id = super()._unlist(element, free_number = free_number)
+        if sell_id is not None:
+            del self.sell_id_to_price[sell_id]
+        return sell_id
+
+    def get_same_items(self, sell_id : str, amount : int) -> list[Item]:
+        #the item listed under sell_id followed by other listed items of the same name, at most amount of them.
+        item = self.sell_id_to_item[sell_id]
+        items = [item]
+        for same_item in self.inventory.instanced[item.name].values():
+            if len(items) >= amount:
+                break
+            if same_item is not item and same_item.id in self.item_id_to_listing_id:
+                items.append(same_item)
+        return items
 
 class TradeSession():
-    def __init__(self, merchant : Entity, player : Player):
+    def __init__(self, merchant : Entity, player : Player, economy : MerchantEconomy | None = None):
         self.merchant = merchant
         self.player = player
-        self.merchant_sell_id_to_price : dict[str, int] = {}
-        self.merchant_sell_id_to_item : dict[str, Item] = {}
-        self.merchant_sell_id_to_stack : dict[str, Stack] = {}
-        self.player_sell_id_to_price : dict[str, int] = {}
-        self.player_sell_id_to_item : dict[str, Item] = {}
-        self.player_sell_id_to_stack : dict[str, Stack] = {}
-    
-    def get_dicts_using(self, inventory : Inventory, profile : TraderProfile) -> dict[str, dict]:
-        sell_id_to_price = {}
-        sell_id_to_item = {}
-        sell_id_to_stack = {}
-        for item_type in ["instanced", "stacked"]:
-            item_type_inventory : dict[str , list[Item]] | dict[str, Stack] = getattr(inventory, item_type)
-            for item_name in item_type_inventory.keys():
-                if item_type == "instanced":
-                    item_number = 0
-                    for item in item_type_inventory[item_name]:
-                        item_number += 1
-                        sell_id = f"{item_name}_{item_number}".replace(" ", "_")
-                        sell_id_to_item[sell_id] = item
-                        sell_id_to_price[sell_id] = int(item.get_trade_price() * profile.price_multiplier)
-                else:
-                    stack = item_type_inventory[item_name]
-                    sell_id = f"{stack.base.name}".replace(" ", "_")
-                    sell_id_to_stack[sell_id] = stack
-                    sell_id_to_price[sell_id] = int(stack.base.get_trade_price() * profile.price_multiplier)
-        return {"sell_id_to_price" : sell_id_to_price, "sell_id_to_item" : sell_id_to_item, "sell_id_to_stack" : sell_id_to_stack}
+        self.economy = economy
+        self.economy_version : int | None = None
+        self.merchant_ledger : TradeLedger | None = None
+        self.player_ledger : TradeLedger | None = None
     
     def build(self) -> None:
-        trader_inventory = self.merchant.inventory
-        player_inventory = self.player.inventory
         self.trader_profile = self.merchant.trader_profile
         self.player_trader_profile = TraderProfile(accepted_currencies = ["__any__", ], price_multiplier = 0.5, accepted_item_tags = ["__any__", ])
-        trader_dicts = self.get_dicts_using(inventory = trader_inventory, profile = self.trader_profile)
-        player_dicts = self.get_dicts_using(inventory = player_inventory, profile = self.player_trader_profile)
-        self.merchant_sell_id_to_price = trader_dicts["sell_id_to_price"]
-        self.merchant_sell_id_to_item = trader_dicts["sell_id_to_item"]
-        self.merchant_sell_id_to_stack = trader_dicts["id_to_stack"]
-        self.player_sell_id_to_price = player_dicts["sell_id_to_price"]
-        self.player_sell_id_to_item = player_dicts["sell_id_to_item"]
-        self.player_sell_id_to_stack = player_dicts["id_to_stack"]
\ No newline at end of file
+        merchant_price_multiplier = None
+        player_price_multiplier = None
+        if self.economy is not None:
+            self.economy_version = self.economy.version
+            merchant_price_multiplier = lambda item : self.economy.get_multiplier(self.merchant, item)
+            player_price_multiplier = lambda item : self.player_trader_profile.price_multiplier * self.economy.get_relative_multiplier(self.merchant, item) #the merchant pays more for what it is short of.
+        self.merchant_ledger = TradeLedger(inventory = self.merchant.inventory, profile = self.trader_profile, get_price_multiplier = merchant_price_multiplier)
+        self.player_ledger = TradeLedger(inventory = self.player.inventory, profile = self.player_trader_profile, accepted_item_tags = self.trader_profile.accepted_item_tags, get_price_multiplier = player_price_multiplier) #the player is only offered what the merchant buys.
+
+    def refresh_prices(self) -> None:
+        #prices only change when the economy updated since the last refresh.
+        if self.economy is None or self.economy.version == self.economy_version:
+            return
+        self.economy_version = self.economy.version
+        self.merchant_ledger.refresh_prices()
+        self.player_ledger.refresh_prices()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self.merchant_ledger.transaction(), self.player_ledger.transaction():
+            yield
+
+    def close(self) -> None:
+        self.merchant_ledger.close()
+        self.player_ledger.close()
@@ -1,11 +1,14 @@
 from typing import TYPE_CHECKING
 
+from JSONStream import JSONStreamWriter
+
 if TYPE_CHECKING:
     from WorldTime import WorldTime
     from CommandSchedulers import TimedScheduler
     from Quests import QuestConditionPool
     from Entities import Player
     from Map import Map
+    from Randomness import RandomStreams
 
 class WorldState():
     def __init__(self):
@@ -14,6 +17,23 @@ class WorldState():
         self.quest_condition_pool : QuestConditionPool = None #instance of QuestConditionPool
         self.player : Player = None #instance of Player (hopefully only one unless the game is bugged beyond belief.)
         self.maps : dict[str, Map] = {} #str : Map
+        self.partitioned_maps : set[str] = set() #names of maps owned by partition worker processes, not in maps but still part of the world and its saves.
+        self.random_streams : RandomStreams = None #instance of RandomStreams, saved so a loaded game keeps rolling the same numbers.
+        self.last_simulated : dict[str, int] = {} #sublocation path -> world ticks it was last simulated at, shared with the SimulationScheduler and saved so sublocations away from the player still catch up after a load.
+        self.visited : set[str] = set() #sublocation paths the player has been to, travel only knows of these and the places their exits lead to.
     
     def to_dict(self):
-        return {"world_time" : self.world_time.to_dict(), "timed_scheduler" : self.timed_scheduler.to_dict(), "quest_condition_pool" : self.quest_condition_pool.to_dict(), "player" : self.player.to_dict(), "maps" : list(self.maps.keys())}
\ No newline at end of file
+        return {"world_time" : self.world_time.to_dict(), "timed_scheduler" : self.timed_scheduler.to_dict(), "quest_condition_pool" : self.quest_condition_pool.to_dict(), "player" : self.player.to_dict(), "maps" : list(self.maps.keys()) + sorted(self.partitioned_maps), "random_streams" : self.random_streams.to_dict(), "last_simulated" : self.last_simulated, "visited" : sorted(self.visited)}
+    
+    def stream_to(self, writer : JSONStreamWriter) -> None:
+        writer.begin_object()
+        writer.item("world_time", self.world_time.to_dict())
+        writer.item("timed_scheduler", self.timed_scheduler.to_dict())
+        writer.item("quest_condition_pool", self.quest_condition_pool.to_dict())
+        writer.key("player")
+        self.player.stream_to(writer)
+        writer.item("maps", list(self.maps.keys()) + sorted(self.partitioned_maps))
+        writer.item("random_streams", self.random_streams.to_dict())
+        writer.item("last_simulated", self.last_simulated)
+        writer.item("visited", sorted(self.visited))
+        writer.end_object()
\ No newline at end of file
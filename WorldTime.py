@@ -10,6 +10,11 @@ class WorldTimeStamp():
     def get_time_id(self) -> int:
         return int(f"{self.year:04}{self.day:03}{self.hour:02}{self.tick:02}")
 
+    def get_total_ticks(self) -> int:
+        #unlike the time id, differences between total ticks are real elapsed ticks.
+        days = self.year * 365 + (self.year + 3) // 4 + self.day
+        return (days * 24 + self.hour) * 60 + self.tick
+
     def to_dict(self) -> dict:
         return {"tick" : self.tick, "hour" : self.hour, "day" : self.day, "year" : self.year}
     
@@ -108,6 +113,9 @@ class WorldTime():
     
     def to_world_timestamp(self) -> WorldTimeStamp:
         return WorldTimeStamp(self.tick, self.hour, self.day, self.year)
+    
+    def get_total_ticks(self) -> int:
+        return self.to_world_timestamp().get_total_ticks()
         
     def to_dict(self) -> dict:
         return {"tick" : self.tick, "hour" : self.hour, "day" : self.day, "year" : self.year}